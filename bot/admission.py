@@ -0,0 +1,192 @@
+import asyncio
+import collections
+import datetime
+import heapq
+import itertools
+import logging
+import os
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_ORDER = 0      # order confirmations / cancellations
+PRIORITY_WRITE = 1      # anything that changes state
+PRIORITY_READ = 2       # read-only commands and refreshes
+
+# Commands whose answer only reflects current data, so an old request is worthless
+READ_ONLY_COMMANDS = {
+    'quote', 'q', 'watchlist', 'movers', 'gainers', 'losers', 'chart', 'chain', 'news',
+    'portfolio', 'positions', 'balance', 'risk', 'backtest', 'export', 'orders', 'alerts', 'help', 'start', 'lag',
+}
+READ_ONLY_CALLBACKS = ('quote_refresh_', 'watch_refresh', 'portfolio_')
+ORDER_CALLBACKS = ('order_confirm_', 'order_cancel')
+SHED_ANSWER = "Busy, try again"
+
+
+class _Entry:
+    __slots__ = ('update', 'priority', 'user', 'key', 'idempotent', 'sent_at', 'go', 'dropped')
+
+    def __init__(self, update, priority, user, key, idempotent, sent_at):
+        self.update = update
+        self.priority = priority
+        self.user = user
+        self.key = key
+        self.idempotent = idempotent
+        self.sent_at = sent_at
+        self.go = asyncio.Event()
+        self.dropped = None  # reason, if the entry was shed while queued
+
+
+def classify(update):
+    """(priority, collapse key or None, idempotent, time the user sent it or None)
+
+    Button taps carry no send time, so read-only ones are stamped when they arrive and
+    age from there like commands.
+    """
+    if not isinstance(update, Update):
+        return PRIORITY_WRITE, None, False, None
+
+    query = update.callback_query
+    if query is not None:
+        data = query.data or ""
+        if data.startswith(ORDER_CALLBACKS):
+            return PRIORITY_ORDER, None, False, None
+        if data.startswith(READ_ONLY_CALLBACKS):
+            # Repeated taps on the same button of the same message collapse into the last one
+            message = query.message
+            key = (message.chat.id, message.message_id, data) if message else (query.from_user.id, data)
+            return PRIORITY_READ, key, True, datetime.datetime.now(datetime.timezone.utc)
+        return PRIORITY_WRITE, None, False, None
+
+    message = update.message
+    if message is not None and message.text and message.text.startswith('/'):
+        command = message.text.split()[0][1:].split('@')[0].lower()
+        if command in READ_ONLY_COMMANDS:
+            return PRIORITY_READ, (message.chat.id, message.text.strip()), True, message.date
+        return PRIORITY_WRITE, None, False, message.date
+
+    return PRIORITY_WRITE, None, False, None
+
+
+class AdmissionProcessor(BaseUpdateProcessor):
+    """
+    Admission control in front of the handlers. Every update is accepted off the queue
+    immediately and scheduled here: order confirmations first, then other writes, then
+    read-only commands. Read-only requests older than max_age are dropped, repeated
+    identical ones collapse into the latest, and once the backlog passes a threshold
+    each user may only have a few updates waiting.
+    """
+
+    def __init__(self, concurrency: int = None, max_age: float = None,
+                 backlog_threshold: int = None, per_user_limit: int = None):
+        # The semaphore in the base class only bounds how many updates are held here
+        super().__init__(max_concurrent_updates=10000)
+        self.concurrency = concurrency or int(os.getenv("UPDATE_CONCURRENCY", "8"))
+        self.max_age = max_age or float(os.getenv("ADMISSION_MAX_AGE", "60"))
+        self.backlog_threshold = backlog_threshold or int(os.getenv("ADMISSION_BACKLOG", "50"))
+        self.per_user_limit = per_user_limit or int(os.getenv("ADMISSION_USER_LIMIT", "5"))
+        self.shed = collections.Counter()  # {reason: count} since start
+        self._burst_shed = collections.Counter()
+        self._queue = []  # heap of (priority, seq, entry)
+        self._seq = itertools.count()
+        self._latest = {}  # {collapse key: newest queued entry}
+        self._per_user = collections.Counter()  # queued updates per user
+        self._active = 0
+        self._answers = set()  # pending answers to shed callback queries
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def backlog(self) -> int:
+        return len(self._queue)
+
+    def _stale(self, idempotent, sent_at) -> bool:
+        if not idempotent or sent_at is None:
+            return False
+        age = (datetime.datetime.now(datetime.timezone.utc) - sent_at).total_seconds()
+        return age > self.max_age
+
+    def _shed(self, update, reason):
+        self.shed[reason] += 1
+        self._burst_shed[reason] += 1
+        logger.debug("Shed update %s: %s", getattr(update, 'update_id', '?'), reason)
+        query = update.callback_query if isinstance(update, Update) else None
+        if query is not None:
+            # Otherwise the button keeps spinning; a superseded tap is answered by its successor
+            text = None if reason == "duplicate" else SHED_ANSWER
+            task = asyncio.get_running_loop().create_task(self._answer(query, text))
+            self._answers.add(task)
+            task.add_done_callback(self._answers.discard)
+
+    @staticmethod
+    async def _answer(query, text):
+        try:
+            await query.answer(text)
+        except Exception as e:
+            logger.debug("Could not answer shed callback query: %s", e)
+
+    async def do_process_update(self, update, coroutine):
+        priority, key, idempotent, sent_at = classify(update)
+        user = update.effective_user.id if isinstance(update, Update) and update.effective_user else None
+
+        if self._stale(idempotent, sent_at):
+            self._shed(update, "stale")
+            coroutine.close()
+            return
+        if (self.backlog >= self.backlog_threshold and priority != PRIORITY_ORDER
+                and user is not None and self._per_user[user] >= self.per_user_limit):
+            self._shed(update, "user limit")
+            coroutine.close()
+            return
+
+        entry = _Entry(update, priority, user, key, idempotent, sent_at)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None and previous.dropped is None:
+                previous.dropped = "duplicate"
+            self._latest[key] = entry
+        self._per_user[user] += 1
+        heapq.heappush(self._queue, (priority, next(self._seq), entry))
+        self._dispatch()
+
+        await entry.go.wait()
+        if entry.dropped:
+            self._shed(update, entry.dropped)
+            coroutine.close()
+            self._dispatch()
+            return
+        try:
+            await coroutine
+        finally:
+            self._active -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        """Release the highest-priority queued updates into free slots"""
+        while self._queue and self._active < self.concurrency:
+            _, _, entry = heapq.heappop(self._queue)
+            self._per_user[entry.user] -= 1
+            if not self._per_user[entry.user]:
+                del self._per_user[entry.user]
+            if entry.key is not None and self._latest.get(entry.key) is entry:
+                del self._latest[entry.key]
+            if entry.dropped is None and self._stale(entry.idempotent, entry.sent_at):
+                # Went stale while waiting behind other work
+                entry.dropped = "stale"
+            if entry.dropped is None:
+                self._active += 1
+            entry.go.set()
+        if not self._queue and self._burst_shed:
+            details = ", ".join(f"{reason} {count}" for reason, count in self._burst_shed.items())
+            logger.warning("Backlog drained; shed %s updates (%s)", sum(self._burst_shed.values()), details)
+            self._burst_shed.clear()
+
+    def summary(self) -> str:
+        details = ", ".join(f"{reason} {count}" for reason, count in self.shed.items()) or "none"
+        return f"queued {self.backlog}, running {self._active}, shed {sum(self.shed.values())} ({details})"
@@ -0,0 +1,57 @@
+# Indicator windows are preallocated, so periods are bounded both ways
+MAX_PERIOD = 1000
+
+
+class RuleError(ValueError):
+    """A rule that parses but makes no sense (the message is shown to the user)"""
+
+
+def _period(value, name="Period"):
+    period = int(value)
+    if not 1 <= period <= MAX_PERIOD:
+        raise RuleError(f"{name} must be between 1 and {MAX_PERIOD}")
+    return period
+
+
+def _positive(value, name):
+    number = float(value)
+    if not number > 0 or number == float('inf'):
+        raise RuleError(f"{name} must be a positive number")
+    return number
+
+
+def parse_rule(symbol, args):
+    """Build an alert/backtest rule dict from the (lower-cased) arguments after the symbol"""
+    kind = args[0]
+    if kind in ('sma', 'ema'):
+        return {'symbol': symbol, 'type': kind, 'period': _period(args[1]), 'last_side': None}
+    if kind == 'rsi':
+        period = _period(args[1])
+        condition = args[2] if len(args) > 2 else '>70'
+        if condition[0] not in '<>':
+            raise ValueError(condition)
+        level = float(condition[1:])
+        if not 0 < level < 100:
+            raise RuleError("RSI level must be between 0 and 100")
+        return {'symbol': symbol, 'type': 'rsi', 'period': period,
+                'above': condition[0] == '>', 'level': level}
+    if kind == 'move':
+        return {'symbol': symbol, 'type': 'move', 'percent': _positive(args[1], "Percent"),
+                'period': _period(args[2], "Minutes")}
+    if kind == 'volume':
+        period = _period(args[2]) if len(args) > 2 else 20
+        return {'symbol': symbol, 'type': 'volume', 'multiple': _positive(args[1], "Multiple"), 'period': period}
+    return {'symbol': symbol, 'type': 'price', 'target_price': _positive(kind, "Price")}
+
+
+def describe_rule(rule):
+    kind = rule.get('type', 'price')
+    if kind == 'price':
+        return f"@ ${rule['target_price']:.2f}"
+    if kind in ('sma', 'ema'):
+        return f"crosses {kind.upper()}({rule['period']})"
+    if kind == 'rsi':
+        return f"RSI({rule['period']}) {'>' if rule['above'] else '<'} {rule['level']:g}"
+    if kind == 'move':
+        return f"moves {rule['percent']:g}% within {rule['period']} min"
+    return f"volume {rule['multiple']:g}x its {rule['period']}-tick average"
@@ -1,8 +1,59 @@
+import collections
+import math
 import os
 from dotenv import load_dotenv
+from telegram import Update
+from bot.ratelimit import TokenBucket
 
 load_dotenv()
 
+ADMIN, USER, LIMITED = "admin", "user", "limited"
+ROLES = (ADMIN, USER, LIMITED)
+
+# Commands grouped by what they cost upstream; anything else is 'other'
+COMMAND_CLASSES = {
+    'quote': {'quote', 'q', 'live', 'watchlist', 'movers', 'gainers', 'losers', 'news'},
+    'account': {'portfolio', 'positions', 'balance', 'orders', 'account', 'risk', 'export'},
+    'heavy': {'chart', 'chain', 'backtest'},
+    'order': {'order', 'buy', 'sell', 'cancel'},
+}
+CALLBACK_CLASSES = (
+    ('order_confirm_', 'order'),
+    ('quote_refresh_', 'quote'),
+    ('watch_refresh', 'quote'),
+    ('portfolio_', 'account'),
+)
+QUOTA_CLASSES = (*COMMAND_CLASSES, 'other')
+
+# {role: {class: (tokens per second, burst)}}; admins are not limited
+ROLE_QUOTAS = {
+    USER: {'quote': (0.5, 10), 'account': (0.2, 5), 'heavy': (0.05, 3), 'order': (0.2, 5), 'other': (1.0, 20)},
+    LIMITED: {'quote': (0.1, 3), 'account': (0.05, 2), 'heavy': (0.01, 1), 'order': (0.0, 0), 'other': (0.5, 10)},
+}
+
+
+def command_class(update) -> str:
+    """Quota class of a command, button or inline query (None for anything else)"""
+    if not isinstance(update, Update):
+        return None
+    if update.inline_query is not None:
+        return 'quote'
+    query = update.callback_query
+    if query is not None:
+        data = query.data or ""
+        for prefix, quota_class in CALLBACK_CLASSES:
+            if data.startswith(prefix):
+                return quota_class
+        return 'other'
+    message = update.message
+    if message is None or not message.text or not message.text.startswith('/'):
+        return None
+    command = message.text.split()[0][1:].split('@')[0].lower()
+    for quota_class, commands in COMMAND_CLASSES.items():
+        if command in commands:
+            return quota_class
+    return 'other'
+
 
 class AuthManager:
     def __init__(self):
@@ -11,12 +62,114 @@ class AuthManager:
         auth_users = os.getenv("AUTHORIZED_USERS", "")
         if auth_users:
             self.authorized_users.update(map(int, auth_users.split(",")))
-    
+        admin_users = os.getenv("ADMIN_USERS", "")
+        self.admins = set(map(int, admin_users.split(","))) if admin_users else set()
+        # In production, use a database
+        self.roles = {}  # {user_id: role} set by admins
+        self.overrides = {}  # {user_id: {class: (rate, burst)}} set by admins
+        self.buckets = {}  # {(user_id, class): TokenBucket}
+        self.allowed = collections.defaultdict(collections.Counter)  # {user_id: {class: count}}
+        self.throttled = collections.defaultdict(collections.Counter)
+
     def is_authorized(self, user_id: int) -> bool:
-        return user_id in self.authorized_users or len(self.authorized_users) == 0
-    
+        return (user_id in self.authorized_users or user_id in self.admins
+                or len(self.authorized_users) == 0)
+
     def add_user(self, user_id: int):
         self.authorized_users.add(user_id)
-    
+
     def remove_user(self, user_id: int):
         self.authorized_users.discard(user_id)
+
+    def role(self, user_id: int) -> str:
+        if user_id in self.roles:
+            return self.roles[user_id]
+        return ADMIN if user_id in self.admins else USER
+
+    def is_admin(self, user_id: int) -> bool:
+        return self.role(user_id) == ADMIN
+
+    def quota(self, user_id: int, quota_class: str):
+        """(rate, burst) for a user's command class, or None if unlimited"""
+        override = self.overrides.get(user_id, {}).get(quota_class)
+        if override is not None:
+            return override
+        quotas = ROLE_QUOTAS.get(self.role(user_id))
+        return None if quotas is None else quotas.get(quota_class, quotas['other'])
+
+    def check(self, user_id: int, quota_class: str) -> float:
+        """Take one token: 0 if the request may go ahead, else seconds to wait (inf: never)"""
+        quota = self.quota(user_id, quota_class)
+        if quota is not None:
+            bucket = self.buckets.get((user_id, quota_class))
+            if bucket is None:
+                bucket = self.buckets[(user_id, quota_class)] = TokenBucket(*quota)
+            if not bucket.try_acquire():
+                self.throttled[user_id][quota_class] += 1
+                return bucket.retry_after()
+        self.allowed[user_id][quota_class] += 1
+        return 0.0
+
+    def _reset_buckets(self, user_id: int):
+        for key in [key for key in self.buckets if key[0] == user_id]:
+            del self.buckets[key]
+
+    def set_role(self, user_id: int, role: str):
+        if role not in ROLES:
+            raise ValueError(f"Unknown role {role}; use one of {', '.join(ROLES)}")
+        self.roles[user_id] = role
+        self._reset_buckets(user_id)
+
+    def set_quota(self, user_id: int, quota_class: str, rate: float, burst: float = None):
+        """Admin override of one class for one user"""
+        if quota_class not in QUOTA_CLASSES:
+            raise ValueError(f"Unknown class {quota_class}; use one of {', '.join(QUOTA_CLASSES)}")
+        if rate < 0 or (burst is not None and burst < 0):
+            raise ValueError("Rate and burst must not be negative")
+        self.overrides.setdefault(user_id, {})[quota_class] = (rate, burst if burst is not None else max(rate, 1.0))
+        self._reset_buckets(user_id)
+
+    def reset_user(self, user_id: int):
+        """Drop a user's role and overrides, back to the defaults"""
+        self.roles.pop(user_id, None)
+        self.overrides.pop(user_id, None)
+        self._reset_buckets(user_id)
+
+    def quota_lines(self, user_id: int):
+        lines = []
+        for quota_class in QUOTA_CLASSES:
+            quota = self.quota(user_id, quota_class)
+            if quota is None:
+                limit = "unlimited"
+            elif quota[0] <= 0 or quota[1] <= 0:
+                limit = "blocked"
+            else:
+                limit = f"{quota[0] * 60:g}/min, burst {quota[1]:g}"
+            lines.append(f"{quota_class:<8} {limit:<24} used {self.allowed[user_id][quota_class]:>5}  "
+                         f"throttled {self.throttled[user_id][quota_class]:>4}")
+        return lines
+
+    def usage_summary(self, top: int = 10) -> str:
+        """The heaviest users by requests let through, with their throttled counts"""
+        totals = {user_id: sum(counts.values()) for user_id, counts in self.allowed.items()}
+        if not totals:
+            return "No requests yet"
+        lines = []
+        for user_id, total in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+            throttled = sum(self.throttled[user_id].values())
+            lines.append(f"{user_id:<12} {self.role(user_id):<8} used {total:>6}  throttled {throttled:>5}")
+        return "\n".join(lines)
+
+    def state(self):
+        """Admin-set roles and overrides, for snapshots"""
+        return {'roles': self.roles, 'overrides': self.overrides}
+
+    def restore(self, state):
+        self.roles.update(state.get('roles', {}))
+        self.overrides.update(state.get('overrides', {}))
+
+
+def describe_wait(wait: float, quota_class: str) -> str:
+    if math.isinf(wait):
+        return f"⛔ {quota_class.title()} requests are not available for your account."
+    return f"🐢 Slow down: too many {quota_class} requests. Try again in {math.ceil(wait)}s."
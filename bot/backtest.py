@@ -0,0 +1,127 @@
+import numpy as np
+from scipy.signal import lfilter
+
+# Forward-return horizons, in bars
+HORIZONS = (1, 5, 20)
+
+
+def rolling_mean(x, n):
+    """Mean of the last n values at every index (NaN until n values exist)"""
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        csum = np.cumsum(np.insert(x, 0, 0.0))
+        out[n - 1:] = (csum[n:] - csum[:-n]) / n
+    return out
+
+
+def _smooth(x, alpha, seed):
+    """y[k] = alpha * x[k] + (1 - alpha) * y[k-1], starting from seed, as one filter call"""
+    return lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * seed])[0]
+
+
+def ema(x, n):
+    """EMA seeded with the SMA of the first n values, like indicators.EMA"""
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        seed = x[:n].mean()
+        out[n - 1] = seed
+        out[n:] = _smooth(x[n:], 2.0 / (n + 1), seed)
+    return out
+
+
+def rsi(x, n):
+    """Wilder's RSI, like indicators.RSI"""
+    out = np.full(len(x), np.nan)
+    change = np.diff(x)
+    if len(change) < n:
+        return out
+    gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+    avg_gain = np.empty(len(change) - n + 1)
+    avg_loss = np.empty(len(change) - n + 1)
+    avg_gain[0], avg_loss[0] = gain[:n].mean(), loss[:n].mean()
+    avg_gain[1:] = _smooth(gain[n:], 1.0 / n, avg_gain[0])
+    avg_loss[1:] = _smooth(loss[n:], 1.0 / n, avg_loss[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    out[n:] = value
+    return out
+
+
+def rule_condition(rule, bars, bar_minutes: float):
+    """
+    Boolean array: where the rule's condition holds on each bar. Alerts fire on the bars
+    where it becomes true (see fire_indices).
+    """
+    close = bars['close']
+    kind = rule.get('type', 'price')
+    if kind == 'price':
+        target = rule['target_price']
+        return (bars['low'] <= target) & (bars['high'] >= target)
+    if kind in ('sma', 'ema'):
+        average = rolling_mean(close, rule['period']) if kind == 'sma' else ema(close, rule['period'])
+        side = close >= average
+        valid = ~np.isnan(average)
+        # A cross: the side flips between two bars that both have an average
+        crossed = np.zeros(len(close), dtype=bool)
+        crossed[1:] = valid[1:] & valid[:-1] & (side[1:] != side[:-1])
+        return crossed
+    if kind == 'rsi':
+        value = rsi(close, rule['period'])
+        with np.errstate(invalid='ignore'):
+            return value > rule['level'] if rule['above'] else value < rule['level']
+    if kind == 'move':
+        # A move "within N minutes" becomes a move over the matching number of bars
+        lag = max(1, int(round(rule['period'] / bar_minutes)))
+        moved = np.zeros(len(close), dtype=bool)
+        if len(close) > lag:
+            pct = (close[lag:] / close[:-lag] - 1.0) * 100.0
+            moved[lag:] = np.abs(pct) >= rule['percent']
+        return moved
+    # volume: this bar against the average of the previous `period` bars
+    volume = bars['volume'].astype(np.float64)
+    average = np.full(len(volume), np.nan)
+    average[1:] = rolling_mean(volume, rule['period'])[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return volume / average >= rule['multiple']
+
+
+def fire_indices(condition):
+    """Bars where the condition turns true (a live alert would fire there)"""
+    if condition.dtype != bool:
+        condition = condition.astype(bool)
+    previous = np.zeros(len(condition), dtype=bool)
+    previous[1:] = condition[:-1]
+    return np.flatnonzero(condition & ~previous)
+
+
+def backtest(rule, bars, bar_minutes: float = 390.0, horizons=HORIZONS):
+    """Replay one rule over one symbol's bars"""
+    if len(bars) < 2:
+        return {'bars': len(bars), 'fires': 0, 'dates': [], 'forward': {}}
+    fires = fire_indices(rule_condition(rule, bars, bar_minutes))
+    close = bars['close']
+    forward = {}
+    for h in horizons:
+        ahead = fires[fires + h < len(close)]
+        if len(ahead) == 0:
+            continue
+        returns = close[ahead + h] / close[ahead] - 1.0
+        forward[h] = {
+            'count': int(len(returns)),
+            'mean': float(returns.mean()),
+            'median': float(np.median(returns)),
+            'hit_rate': float((returns > 0).mean()),
+        }
+    return {
+        'bars': int(len(bars)),
+        'first': int(bars['datetime'][0]),
+        'last': int(bars['datetime'][-1]),
+        'fires': int(len(fires)),
+        'dates': bars['datetime'][fires].tolist(),
+        'forward': forward,
+    }
+
+
+def backtest_many(rule, bars_by_symbol, bar_minutes: float = 390.0):
+    """The same rule across many symbols in one call (one trip to the compute pool)"""
+    return {symbol: backtest(rule, bars, bar_minutes) for symbol, bars in bars_by_symbol.items()}
@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """In-memory cache whose entries expire a fixed number of seconds after they are set"""
+
+    def __init__(self, ttl: float, maxsize: int = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # {key: (expires_at, value)}
+        self._stale = {}  # {key: value} restored from a snapshot, served until revalidated
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def get_stale(self, key, default=None):
+        """A restored entry that has not been revalidated yet"""
+        return self._stale.get(key, default)
+
+    def set(self, key, value, ttl: float = None):
+        self._stale.pop(key, None)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when no key is given"""
+        if key is None:
+            self._data.clear()
+            self._stale.clear()
+        else:
+            self._data.pop(key, None)
+            self._stale.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drop every key for which predicate(key) is true"""
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
+        for key in [k for k in self._stale if predicate(k)]:
+            del self._stale[key]
+
+    def items(self):
+        """[(key, value)] of unexpired entries, for snapshots"""
+        now = time.monotonic()
+        return [(key, value) for key, (expires_at, value) in self._data.items() if expires_at >= now]
+
+    def restore(self, items):
+        """Load snapshot entries as stale: usable, but due for revalidation"""
+        for key, value in items:
+            if key not in self._data:
+                self._stale[key] = value
+
+    def stale_keys(self):
+        return list(self._stale)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._data)
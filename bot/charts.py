@@ -0,0 +1,156 @@
+import asyncio
+import concurrent.futures
+import datetime
+import io
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    """Pool initializer: load matplotlib with the Agg backend and warm the font cache"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(1, 1))
+    ax.set_title("warm-up")
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def _warm():
+    return os.getpid()
+
+
+def render_chart(bars: np.ndarray, symbol: str, title: str, style: str = 'candle') -> bytes:
+    """Render price (candles or line) over volume and return PNG bytes. Runs in a pool worker."""
+    import matplotlib.pyplot as plt
+
+    x = np.arange(len(bars))
+    opens, highs, lows, closes = bars['open'], bars['high'], bars['low'], bars['close']
+    up = closes >= opens
+
+    fig, (price_ax, volume_ax) = plt.subplots(
+        2, 1, figsize=(10, 6), sharex=True, gridspec_kw={'height_ratios': [3, 1]}
+    )
+    try:
+        if style == 'candle':
+            colors = np.where(up, '#26a69a', '#ef5350')
+            price_ax.vlines(x, lows, highs, colors=colors, linewidth=0.8)
+            price_ax.bar(x, np.abs(closes - opens), bottom=np.minimum(opens, closes),
+                         color=colors, width=0.6, linewidth=0)
+        else:
+            price_ax.plot(x, closes, color='#1f77b4', linewidth=1.2)
+        volume_ax.bar(x, bars['volume'], color=np.where(up, '#26a69a', '#ef5350'), width=0.8)
+
+        price_ax.set_title(f"{symbol} · {title}")
+        price_ax.grid(alpha=0.3)
+        volume_ax.grid(alpha=0.3)
+        volume_ax.set_ylabel("Volume")
+
+        ticks = np.linspace(0, len(bars) - 1, num=min(6, len(bars)), dtype=int)
+        intraday = len(bars) > 1 and (bars['datetime'][-1] - bars['datetime'][0]) < 7 * 86_400_000
+        fmt = '%m/%d %H:%M' if intraday else '%Y-%m-%d'
+        volume_ax.set_xticks(ticks)
+        volume_ax.set_xticklabels([
+            datetime.datetime.fromtimestamp(bars['datetime'][i] / 1000).strftime(fmt) for i in ticks
+        ])
+        fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=100)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class ChartRenderer:
+    """
+    Renders charts in a pre-warmed process pool and keeps a size-bounded PNG cache plus the
+    Telegram file_id of every chart already uploaded.
+    """
+
+    def __init__(self, max_workers: int = None, max_cache_bytes: int = 64 * 1024 * 1024):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.max_cache_bytes = max_cache_bytes
+        self.pool = None
+        # At most this many charts are rendering or waiting in the pool; the rest queue here
+        self._slots = asyncio.Semaphore(self.max_workers * 2)
+        self._png_cache = OrderedDict()  # {key: png bytes}, least recently used first
+        self._cache_bytes = 0
+        self.file_ids = {}  # {key: telegram file_id}
+        self._pending = {}  # {key: asyncio.Future} so identical requests render once
+
+    async def start(self):
+        """Create the pool and make every worker run its initializer before the first request"""
+        if self.pool is not None:
+            return
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*[
+            loop.run_in_executor(self.pool, _warm) for _ in range(self.max_workers)
+        ])
+        logger.info("Chart pool ready with %s worker(s)", len(set(pids)))
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def get_cached(self, key):
+        png = self._png_cache.get(key)
+        if png is not None:
+            self._png_cache.move_to_end(key)
+        return png
+
+    def _store(self, key, png: bytes):
+        self._png_cache[key] = png
+        self._cache_bytes += len(png)
+        while self._cache_bytes > self.max_cache_bytes and len(self._png_cache) > 1:
+            old_key, old_png = self._png_cache.popitem(last=False)
+            self._cache_bytes -= len(old_png)
+            self.file_ids.pop(old_key, None)
+
+    async def render(self, key, bars: np.ndarray, symbol: str, title: str, style: str) -> bytes:
+        png = self.get_cached(key)
+        if png is not None:
+            return png
+        if key in self._pending:
+            try:
+                return await asyncio.shield(self._pending[key])
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                # The request rendering it was cancelled, not this one: render it here
+                return await self.render(key, bars, symbol, title, style)
+
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            async with self._slots:
+                # Copy out of the memory map so only the window is pickled to the worker
+                png = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, render_chart, np.array(bars), symbol, title, style
+                )
+            self._store(key, png)
+            future.set_result(png)
+            return png
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved for waiters that never showed up
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+            # Cancelled before a result: release the waiters rather than leave them hanging
+            if not future.done():
+                future.cancel()
@@ -0,0 +1,459 @@
+"""
+Multi-process mode: a front process polls Telegram and routes each update by chat to one
+of N worker processes running the handlers, while a single market-data process owns the
+Schwab session (and its rate limits), serves requests from the workers over Unix sockets
+and keeps a shared-memory quote table current for them to read.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import struct
+import tempfile
+import time
+from bot.logs import configure_logging, request_context
+from bot.market_hours import MarketCalendar
+from bot.quotetable import QuoteTable
+from bot.scheduler import get_scheduler
+from bot.symbols import SymbolIndex
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+
+# Manager methods workers may call in the market-data process
+REMOTE_METHODS = {
+    'get_quote', 'get_quotes', 'get_cached_quotes', 'get_movers', 'get_option_chain',
+    'search_instruments', 'get_price_history', 'get_accounts', 'get_account_details',
+    'get_all_account_details', 'get_account_hash', 'get_order_events', 'get_market_hours', 'get_api_usage',
+    'authorize_url', 'link_account', 'unlink_account', 'is_linked',
+    'invalidate_account',
+    'activity.watch_account',
+}
+
+
+async def send_message(writer, message):
+    """Write one length-prefixed pickled message"""
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def read_message(reader):
+    """Read one message; raises asyncio.IncompleteReadError when the peer goes away"""
+    header = await reader.readexactly(_HEADER.size)
+    return pickle.loads(await reader.readexactly(_HEADER.unpack(header)[0]))
+
+
+async def open_connection(path: str, timeout: float = 30):
+    """Connect to a Unix socket, waiting for the other process to start listening"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await asyncio.open_unix_connection(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+class MarketDataServer:
+    """Runs in the market-data process: answers worker RPCs and keeps subscribed quotes fresh"""
+
+    def __init__(self, schwab, socket_path: str, publish_interval: float = 5):
+        self.schwab = schwab
+        self.socket_path = socket_path
+        self.publish_interval = publish_interval
+        self.subscriptions = {}  # {writer: set of symbols}
+
+    async def serve(self):
+        server = await asyncio.start_unix_server(self._client, path=self.socket_path)
+        logger.info("Market data listening on %s", self.socket_path)
+        # Nothing to refresh while every subscribed symbol's market is closed
+        get_scheduler().every("quote-publish", self.publish_interval, self._publish,
+                              gate=self.schwab.calendar.gate(self.subscribed_symbols))
+        async with server:
+            await server.serve_forever()
+
+    async def _client(self, reader, writer):
+        self.subscriptions[writer] = set()
+        try:
+            while True:
+                message = await read_message(reader)
+                if 'subscribe' in message:
+                    self.subscriptions[writer].update(message['subscribe'])
+                elif 'unsubscribe' in message:
+                    self.subscriptions[writer].difference_update(message['unsubscribe'])
+                else:
+                    asyncio.create_task(self._answer(writer, message))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscriptions.pop(writer, None)
+            writer.close()
+
+    async def _answer(self, writer, message):
+        reply = {'id': message.get('id')}
+        try:
+            method = message['method']
+            if method not in REMOTE_METHODS:
+                raise ValueError(f"Method {method} is not available remotely")
+            # Calls are charged to the worker's user in the shared request budget
+            request_context.set(message.get('context'))
+            target = self.schwab
+            for name in method.split('.'):
+                target = getattr(target, name)
+            result = target(*message.get('args', ()), **message.get('kwargs', {}))
+            if asyncio.iscoroutine(result):
+                result = await result
+            reply['result'] = result
+        except Exception as e:
+            reply['error'] = str(e)
+        if message.get('id') is not None and writer in self.subscriptions:
+            try:
+                await send_message(writer, reply)
+            except ConnectionError:
+                pass
+
+    def subscribed_symbols(self):
+        return set().union(*self.subscriptions.values()) if self.subscriptions else set()
+
+    async def _publish(self):
+        """One batched quote request per interval refreshes every worker's symbols in the quote table"""
+        symbols = {symbol for symbol in self.subscribed_symbols() if self.schwab.calendar.symbol_active(symbol)}
+        if symbols:
+            await self.schwab.get_quotes(sorted(symbols))
+
+
+class _RemoteActivity:
+    """Stand-in for AccountActivityStream; the stream itself runs in the market-data process"""
+
+    def __init__(self, remote):
+        self.remote = remote
+
+    async def start(self, bot=None):
+        pass
+
+    def stop(self):
+        pass
+
+    def watch_account(self, account_hash, chat_id):
+        self.remote.notify('activity.watch_account', account_hash, chat_id)
+
+
+class RemoteSchwabManager:
+    """
+    Drop-in SchwabManager for worker processes. Calls are forwarded to the market-data
+    process; quotes for symbols a worker has asked about are kept fresh there and read
+    from the shared quote table here.
+    """
+
+    def __init__(self, socket_path: str, quote_table_name: str, quote_ttl: float = 10, subscription_ttl: float = None):
+        self.socket_path = socket_path
+        self.quote_table_name = quote_table_name
+        self.quote_ttl = quote_ttl
+        self.subscription_ttl = subscription_ttl or float(os.getenv("SUBSCRIPTION_TTL", "600"))
+        self.client = None
+        self.activity = _RemoteActivity(self)
+        self.symbols = SymbolIndex()
+        self.calendar = MarketCalendar(self)
+        self.quote_table = None
+        self.subscribed = {}  # {symbol: time of last read}
+        self._ids = itertools.count()
+        self._waiting = {}  # {request id: Future}
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+
+    async def initialize(self):
+        self.quote_table = QuoteTable.attach(self.quote_table_name)
+        self._reader, self._writer = await open_connection(self.socket_path)
+        self._reader_task = asyncio.create_task(self._read_loop())
+        logger.info("Connected to market data at %s", self.socket_path)
+        get_scheduler().every("quote-unsubscribe", 60, self._expire_subscriptions)
+
+    async def load_symbols(self):
+        """The market-data process maintains the symbol file; workers re-read it daily"""
+        try:
+            await asyncio.to_thread(self.symbols.load_file)
+        except Exception as e:
+            logger.error("Failed to load symbol master: %s", e)
+        get_scheduler().every("symbol-reload", 24 * 3600, lambda: asyncio.to_thread(self.symbols.load_file),
+                              kind="prefetch")
+
+    async def _read_loop(self):
+        try:
+            while True:
+                message = await read_message(self._reader)
+                future = self._waiting.pop(message.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in message:
+                    future.set_exception(RuntimeError(message['error']))
+                else:
+                    future.set_result(message.get('result'))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.error("Lost connection to market data process")
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Market data process unavailable"))
+            self._waiting.clear()
+
+    async def call(self, method: str, *args, **kwargs):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        await send_message(self._writer, {'id': request_id, 'method': method, 'args': args, 'kwargs': kwargs,
+                                          'context': request_context.get()})
+        return await future
+
+    def notify(self, method: str, *args, **kwargs):
+        """Fire-and-forget call for methods whose result nobody waits for"""
+        asyncio.create_task(send_message(self._writer, {'id': None, 'method': method, 'args': args, 'kwargs': kwargs,
+                                                        'context': request_context.get()}))
+
+    def _subscribe(self, symbols):
+        now = time.monotonic()
+        new = [symbol for symbol in symbols if symbol not in self.subscribed]
+        self.subscribed.update(dict.fromkeys(symbols, now))
+        if new:
+            asyncio.create_task(send_message(self._writer, {'subscribe': sorted(new)}))
+
+    async def _expire_subscriptions(self):
+        """Stop the market-data process refreshing symbols nobody here has read lately"""
+        cutoff = time.monotonic() - self.subscription_ttl
+        idle = [symbol for symbol, last_read in self.subscribed.items() if last_read < cutoff]
+        if idle:
+            for symbol in idle:
+                del self.subscribed[symbol]
+            await send_message(self._writer, {'unsubscribe': idle})
+
+    async def _table_quotes(self, method: str, symbols, max_age: float):
+        """Served from the quote table when fresh; only the rest cost a round-trip"""
+        symbols = list(dict.fromkeys(symbols))
+        self._subscribe(symbols)
+        quotes, missing = self.quote_table.get_quotes(symbols, max_age)
+        if missing:
+            quotes.update(await self.call(method, missing) or {})
+        return quotes
+
+    async def get_quote(self, symbol: str):
+        return await self.call('get_quote', symbol)
+
+    async def get_quotes(self, symbols):
+        return await self._table_quotes('get_quotes', symbols, self.quote_ttl)
+
+    async def get_cached_quotes(self, symbols, max_age: float = 5):
+        return await self._table_quotes('get_quotes', symbols, max_age)
+
+    async def get_option_chain(self, symbol: str, expiry: str = None):
+        return await self.call('get_option_chain', symbol, expiry)
+
+    async def search_instruments(self, symbol: str, projection: str = "symbol-search"):
+        return await self.call('search_instruments', symbol, projection)
+
+    async def get_movers(self, index: str):
+        return await self.call('get_movers', index)
+
+    async def get_price_history(self, symbol: str, start, end=None, frequency: str = "daily"):
+        return await self.call('get_price_history', symbol, start, end, frequency)
+
+    async def get_accounts(self):
+        return await self.call('get_accounts')
+
+    async def get_account_details(self, account_hash: str, fields: str = None):
+        return await self.call('get_account_details', account_hash, fields)
+
+    async def get_all_account_details(self, fields: str = None):
+        return await self.call('get_all_account_details', fields)
+
+    async def get_account_hash(self, account_number: str):
+        return await self.call('get_account_hash', account_number)
+
+    async def get_order_events(self, after: int = 0, limit: int = 500):
+        return await self.call('get_order_events', after, limit)
+
+    async def get_api_usage(self):
+        return await self.call('get_api_usage')
+
+    async def authorize_url(self):
+        return await self.call('authorize_url')
+
+    async def link_account(self, user_id: int, redirect_url: str):
+        return await self.call('link_account', user_id, redirect_url)
+
+    async def unlink_account(self, user_id: int):
+        return await self.call('unlink_account', user_id)
+
+    async def is_linked(self, user_id: int):
+        return await self.call('is_linked', user_id)
+
+    async def get_market_hours(self, markets, date):
+        return await self.call('get_market_hours', markets, date)
+
+    def invalidate_account(self, account_hash: str = None):
+        self.notify('invalidate_account', account_hash)
+
+    def snapshot_state(self):
+        # Caches and account activity live in the market-data process
+        return {}, {}
+
+    def restore_snapshot(self, state, arrays):
+        pass
+
+    async def revalidate(self, rate: float = 2.0):
+        pass
+
+    def close(self):
+        if self.quote_table is not None:
+            self.quote_table.close()
+
+
+def market_data_process(socket_path, quote_table_name, telegram_token, app_key, app_secret, callback_url):
+    configure_logging("market")
+    asyncio.run(_market_data_main(socket_path, quote_table_name, telegram_token, app_key, app_secret, callback_url))
+
+
+async def _market_data_main(socket_path, quote_table_name, telegram_token, app_key, app_secret, callback_url):
+    from telegram import Bot
+    from bot.schwab_client import SchwabManager
+
+    # The single writer of the shared quote table
+    schwab = SchwabManager(app_key, app_secret, callback_url, quote_table=QuoteTable.attach(quote_table_name))
+    await schwab.initialize()
+    await schwab.calendar.start()
+    await schwab.load_symbols()
+    # Order/account notifications go straight to Telegram from here
+    bot = Bot(telegram_token)
+    await bot.initialize()
+    await schwab.activity.start(bot)
+    await MarketDataServer(schwab, socket_path).serve()
+
+
+def worker_process(index, socket_path, market_socket, quote_table_name, telegram_token):
+    configure_logging(f"worker-{index}")
+    asyncio.run(_worker_main(index, socket_path, market_socket, quote_table_name, telegram_token))
+
+
+async def _worker_main(index, socket_path, market_socket, quote_table_name, telegram_token):
+    from telegram import Update
+    from telegram.ext import Application
+    from main import TradingBot
+
+    remote = RemoteSchwabManager(market_socket, quote_table_name)
+    # Each worker keeps its own chats' state, so it snapshots to its own directory
+    snapshot_dir = os.path.join(os.getenv("SNAPSHOT_DIR", "data/snapshot"), f"worker-{index}")
+    trading_bot = TradingBot(telegram_token, None, None, None, schwab_manager=remote, snapshot_dir=snapshot_dir)
+    # No updater: updates arrive from the front process instead of getUpdates
+    application = (
+        Application.builder().token(telegram_token).updater(None)
+        .concurrent_updates(trading_bot.admission).build()
+    )
+    trading_bot.application = application
+    await trading_bot.initialize()
+    trading_bot.setup_handlers(application)
+
+    async def receive(reader, writer):
+        try:
+            while True:
+                data = await read_message(reader)
+                await application.update_queue.put(Update.de_json(data, application.bot))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async with application:
+        await application.start()
+        server = await asyncio.start_unix_server(receive, path=socket_path)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+        await application.stop()
+    await trading_bot.shutdown()
+
+
+class FrontRouter:
+    """Runs in the front process: polls Telegram and forwards each update to its chat's worker"""
+
+    def __init__(self, worker_sockets):
+        self.worker_sockets = worker_sockets
+        self.writers = {}  # {worker index: StreamWriter}
+
+    def worker_for(self, update) -> int:
+        """Same chat (or user, for inline queries) always lands on the same worker"""
+        if update.effective_chat:
+            key = update.effective_chat.id
+        elif update.effective_user:
+            key = update.effective_user.id
+        else:
+            key = update.update_id
+        return key % len(self.worker_sockets)
+
+    async def route(self, update, context):
+        index = self.worker_for(update)
+        try:
+            writer = self.writers.get(index)
+            if writer is None or writer.is_closing():
+                _, writer = await open_connection(self.worker_sockets[index])
+                self.writers[index] = writer
+            await send_message(writer, update.to_dict())
+        except Exception as e:
+            self.writers.pop(index, None)
+            logger.error("Could not route update %s to worker %s: %s", update.update_id, index, e)
+
+
+def run_cluster(telegram_token, app_key, app_secret, callback_url, workers: int):
+    """
+    Start the market-data process and N workers, then poll Telegram in this process.
+    Schwab tokens must already exist (run single-process once to authorize), since child
+    processes cannot complete the interactive login.
+    """
+    from telegram import Update
+    from telegram.ext import Application, TypeHandler
+
+    socket_dir = os.getenv("CLUSTER_SOCKET_DIR") or tempfile.mkdtemp(prefix="tradingbot-")
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    # Anyone who can reach the sockets can place orders, so only this user may
+    os.chmod(socket_dir, 0o700)
+    market_socket = os.path.join(socket_dir, "market.sock")
+    worker_sockets = [os.path.join(socket_dir, f"worker-{i}.sock") for i in range(workers)]
+    for path in [market_socket] + worker_sockets:
+        if os.path.exists(path):
+            os.unlink(path)
+
+    # Created (and unlinked) here so it outlives any one child process
+    quote_table = QuoteTable.create()
+
+    ctx = multiprocessing.get_context("spawn")
+    # Not daemonic: workers start their own chart rendering pools
+    processes = [ctx.Process(
+        target=market_data_process, name="market-data",
+        args=(market_socket, quote_table.name, telegram_token, app_key, app_secret, callback_url)
+    )]
+    processes += [
+        ctx.Process(target=worker_process, name=f"worker-{i}",
+                    args=(i, worker_sockets[i], market_socket, quote_table.name, telegram_token))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        router = FrontRouter(worker_sockets)
+        application = Application.builder().token(telegram_token).build()
+        application.add_handler(TypeHandler(Update, router.route))
+        print(f"🤖 Starting Telegram Stock Bot with {workers} workers...")
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=10)
+        quote_table.close()
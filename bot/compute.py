@@ -0,0 +1,34 @@
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def get_pool():
+    """Shared process pool for CPU-heavy analytics (option pricing, risk, backtests)"""
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv("COMPUTE_WORKERS", max(1, min(4, (os.cpu_count() or 2) - 1))))
+        _pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        logger.info("Compute pool started with %s worker(s)", workers)
+    return _pool
+
+
+async def run_in_pool(fn, *args):
+    """Run fn(*args) in the compute pool without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), fn, *args)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
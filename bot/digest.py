@@ -0,0 +1,84 @@
+import asyncio
+import datetime
+import logging
+from telegram.error import Forbidden, RetryAfter
+from bot.market_hours import MARKET_TZ
+from bot.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Digest kind -> (local market time it is sent, title)
+SCHEDULES = {
+    'premarket': (datetime.time(9, 0), "🌅 Pre-market digest"),
+    'open': (datetime.time(9, 35), "🔔 Market open digest"),
+    'close': (datetime.time(16, 5), "🌇 Market close digest"),
+}
+
+
+def render_digest(kind: str, symbols, quotes, portfolio_line: str = None) -> str:
+    """One user's digest from the shared quote fetch"""
+    lines = [f"*{SCHEDULES[kind][1]}*", ""]
+    for symbol in symbols:
+        data = quotes.get(symbol)
+        if not data:
+            lines.append(f"❓ *{symbol}*: Quote unavailable")
+            continue
+        quote = data.get('quote', data)
+        price = quote.get('lastPrice', 0) or 0
+        change_pct = quote.get('netPercentChangeInDouble', 0) or 0
+        emoji = "📈" if change_pct >= 0 else "📉"
+        lines.append(f"{emoji} *{symbol}*: ${price:.2f} ({change_pct:+.2f}%)")
+    if not symbols:
+        lines.append("👀 Your watchlist is empty")
+    if portfolio_line:
+        lines += ["", portfolio_line]
+    return "\n".join(lines)
+
+
+def retry_seconds(error: RetryAfter) -> float:
+    """RetryAfter carries a timedelta or plain seconds depending on the library version"""
+    delay = error.retry_after
+    return delay.total_seconds() if hasattr(delay, 'total_seconds') else float(delay)
+
+
+class FanoutSender:
+    """
+    Sends many messages under Telegram's broadcast limit (about 30 messages per second).
+    Honors RetryAfter, and reports chats that blocked the bot so they can be unsubscribed.
+    """
+
+    def __init__(self, bot, rate: float = 25.0, concurrency: int = 10):
+        self.bot = bot
+        self.limiter = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(self, chat_id, text: str, **kwargs) -> bool:
+        async with self.semaphore:
+            for _ in range(3):
+                await self.limiter.acquire()
+                try:
+                    await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                    return True
+                except RetryAfter as e:
+                    delay = retry_seconds(e)
+                    logger.warning("Telegram flood limit, retrying in %ss", delay)
+                    await asyncio.sleep(delay)
+                except Forbidden:
+                    raise
+                except Exception as e:
+                    logger.error("Error sending to %s: %s", chat_id, e)
+                    return False
+            return False
+
+    async def send_all(self, messages, **kwargs):
+        """messages: [(chat_id, text)]; returns the chat ids that have blocked the bot"""
+        blocked = []
+
+        async def deliver(chat_id, text):
+            try:
+                await self.send(chat_id, text, **kwargs)
+            except Forbidden:
+                blocked.append(chat_id)
+
+        await asyncio.gather(*[deliver(chat_id, text) for chat_id, text in messages])
+        return blocked
@@ -0,0 +1,46 @@
+import csv
+import datetime
+from openpyxl import Workbook
+
+FORMATS = ('csv', 'xlsx')
+
+COLUMNS = {
+    'positions': ('Account', 'Symbol', 'Quantity', 'Average Price', 'Market Value'),
+    'orders': ('Time (UTC)', 'Order ID', 'Account', 'Event', 'Symbol', 'Side', 'Type',
+               'Quantity', 'Limit/Stop', 'Fill Price', 'Status'),
+    'alerts': ('Triggered (UTC)', 'Alert ID', 'Symbol', 'Condition', 'Price'),
+}
+
+
+def utc(timestamp):
+    """Epoch seconds -> naive UTC datetime (Excel has no time zones)"""
+    if not timestamp:
+        return None
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).replace(tzinfo=None)
+
+
+def write_export(path, fmt: str, title: str, columns, rows) -> int:
+    """
+    Stream rows (any iterable of tuples) to a CSV or XLSX file and return the row count.
+    One row is held at a time: csv writes straight through, and openpyxl's write-only
+    mode streams worksheet XML to a temporary file, so memory is flat in the row count.
+    Blocking; run it in a thread.
+    """
+    count = 0
+    if fmt == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
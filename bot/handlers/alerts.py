@@ -1,18 +1,30 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-import asyncio
+import collections
 import logging
+import os
+import time
 from typing import Dict, List
+from bot.alert_rules import RuleError, describe_rule, parse_rule
+from bot.indicators import TICK_INTERVAL, IndicatorRegistry
+from bot.scheduler import get_scheduler
 
 logger = logging.getLogger(__name__)
 
+# Triggered alerts kept per user for /export; older ones are dropped
+ALERT_HISTORY_LIMIT = int(os.getenv("ALERT_HISTORY_LIMIT", "1000"))
+
 class AlertHandler:
     def __init__(self, schwab_manager, auth_manager):
         self.schwab = schwab_manager
         self.auth = auth_manager
         # In production, use a database
         self.alerts = {}  # {user_id: [alerts]}
-        self.alert_task = None
+        self.history = {}  # {user_id: deque of recent triggered alerts} for /export
+        self.alert_job = None
+        self.bot = None
+        # Indicator state shared by every alert on the same symbol and parameters
+        self.indicators = IndicatorRegistry()
     
     async def create_alert(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
@@ -21,42 +33,60 @@ class AlertHandler:
         if len(context.args) < 2:
             await update.message.reply_text(
                 "Usage: /alert SYMBOL PRICE\n"
-                "Example: /alert AAPL 150.00"
+                "Example: /alert AAPL 150.00\n\n"
+                "Indicator alerts:\n"
+                "/alert SYMBOL sma|ema PERIOD - price crosses the average\n"
+                "/alert SYMBOL rsi PERIOD >70|<30 - RSI threshold\n"
+                "/alert SYMBOL move PERCENT MINUTES - move within N minutes\n"
+                "/alert SYMBOL volume MULTIPLE [PERIOD] - volume spike vs average\n\n"
+                "PERIOD counts price checks (one every 30 s), not bars; indicators warm up\n"
+                "from the first check after the alert is set"
             )
             return
         
         symbol = context.args[0].upper()
+        if not self.schwab.symbols.is_valid(symbol):
+            await update.message.reply_text(self.schwab.symbols.rejection(symbol))
+            return
+        
         try:
-            target_price = float(context.args[1])
             user_id = update.effective_user.id
+            alert = self._parse_alert(symbol, [a.lower() for a in context.args[1:]])
+            alert['chat_id'] = update.effective_chat.id
             
             # Add alert
             if user_id not in self.alerts:
                 self.alerts[user_id] = []
             
             alert_id = len(self.alerts[user_id]) + 1
-            alert = {
-                'id': alert_id,
-                'symbol': symbol,
-                'target_price': target_price,
-                'chat_id': update.effective_chat.id
-            }
+            alert['id'] = alert_id
+            if alert['type'] != 'price':
+                alert['indicator'] = self.indicators.acquire(symbol, alert['type'], alert['period'])
             
             self.alerts[user_id].append(alert)
             
             await update.message.reply_text(
                 f"✅ Alert created!\n"
                 f"Symbol: {symbol}\n"
-                f"Target: ${target_price:.2f}\n"
+                f"Condition: {self._describe(alert)}\n"
                 f"Alert ID: {alert_id}"
             )
             
-        except ValueError:
-            await update.message.reply_text("❌ Invalid price format")
+        except RuleError as e:
+            await update.message.reply_text(f"❌ {e}")
+        except (ValueError, IndexError):
+            await update.message.reply_text("❌ Invalid alert format. Send /alert for usage.")
         except Exception as e:
-            logger.error(f"Error creating alert: {e}")
+            logger.error("Error creating alert: %s", e)
             await update.message.reply_text(f"❌ Error creating alert: {str(e)}")
     
+    def _parse_alert(self, symbol, args):
+        """Build an alert dict from the arguments after the symbol"""
+        return parse_rule(symbol, args)
+    
+    def _describe(self, alert):
+        return describe_rule(alert)
+    
     async def list_alerts(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
             return
@@ -69,7 +99,7 @@ class AlertHandler:
         
         message = "🔔 *Your Active Alerts*\n\n"
         for alert in self.alerts[user_id]:
-            message += f"• ID: {alert['id']} - {alert['symbol']} @ ${alert['target_price']:.2f}\n"
+            message += f"• ID: {alert['id']} - {alert['symbol']} {self._describe(alert)}\n"
         
         await update.message.reply_text(message, parse_mode='Markdown')
     
@@ -86,6 +116,9 @@ class AlertHandler:
             user_id = update.effective_user.id
             
             if user_id in self.alerts:
+                for alert in self.alerts[user_id]:
+                    if alert['id'] == alert_id and 'indicator' in alert:
+                        self.indicators.release(alert['indicator'])
                 self.alerts[user_id] = [a for a in self.alerts[user_id] if a['id'] != alert_id]
                 await update.message.reply_text(f"✅ Alert {alert_id} deleted")
             else:
@@ -94,52 +127,96 @@ class AlertHandler:
         except ValueError:
             await update.message.reply_text("❌ Invalid alert ID")
         except Exception as e:
-            logger.error(f"Error deleting alert: {e}")
+            logger.error("Error deleting alert: %s", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
     
-    async def start_alert_system(self):
+    async def start_alert_system(self, bot=None):
         """Start the alert monitoring system"""
-        if self.alert_task is None:
-            self.alert_task = asyncio.create_task(self._monitor_alerts())
+        self.bot = bot
+        if self.alert_job is None:
+            # Check alerts every 30 seconds while any alerted symbol's market is open
+            self.alert_job = get_scheduler().every(
+                "alerts", TICK_INTERVAL, self._check_alerts, gate=self.schwab.calendar.gate(self._alert_symbols)
+            )
     
-    async def _monitor_alerts(self):
-        """Monitor alerts and send notifications"""
-        while True:
+    def _alert_symbols(self):
+        return {alert['symbol'] for user_alerts in self.alerts.values() for alert in user_alerts}
+    
+    async def _check_alerts(self):
+        """One tick: a batched quote fetch, one indicator update per symbol, then evaluate"""
+        # Prices of symbols whose market is closed cannot have moved
+        symbols = [symbol for symbol in self._alert_symbols() if self.schwab.calendar.symbol_active(symbol)]
+        if not symbols:
+            return
+        
+        quotes = await self.schwab.get_quotes(symbols)
+        now = time.time()
+        prices = {}
+        for symbol, data in quotes.items():
+            quote = data.get('quote', data)
+            price = quote.get('lastPrice')
+            if price is None:
+                continue
+            prices[symbol] = price
+            # One bad series must not stop every other symbol's alerts
             try:
-                for user_id, user_alerts in self.alerts.items():
-                    for alert in user_alerts[:]:  # Copy to avoid modification during iteration
-                        try:
-                            quote_data = self.schwab.get_quote(alert['symbol'])
-                            if quote_data and alert['symbol'] in quote_data:
-                                current_price = quote_data[alert['symbol']]['quote']['lastPrice']
-                                
-                                # Check if alert should trigger (simple price crossing)
-                                if abs(current_price - alert['target_price']) <= 0.01:
-                                    # Send alert notification
-                                    message = f"""
-🚨 *Price Alert Triggered!*
+                self.indicators.update(symbol, price, quote.get('totalVolume', 0), now)
+            except Exception as e:
+                logger.error("Error updating indicators for %s: %s", symbol, e)
+        
+        for user_id, user_alerts in list(self.alerts.items()):
+            for alert in user_alerts[:]:  # Copy to avoid modification during iteration
+                try:
+                    current_price = prices.get(alert['symbol'])
+                    if current_price is None or not self._is_triggered(alert, current_price):
+                        continue
+                    
+                    message = f"""
+🚨 *Alert Triggered!*
 
 Symbol: {alert['symbol']}
-Target: ${alert['target_price']:.2f}
+Condition: {self._describe(alert)}
 Current: ${current_price:.2f}
-                                    """
-                                    
-                                    # In production, you'd use the bot instance to send messages
-                                    # For now, just log the alert
-                                    logger.info(f"Alert triggered for {alert['symbol']} @ {current_price}")
-                                    
-                                    # Remove triggered alert
-                                    user_alerts.remove(alert)
-                                    
-                        except Exception as e:
-                            logger.error(f"Error checking alert: {e}")
-                
-                # Check alerts every 30 seconds
-                await asyncio.sleep(30)
-                
-            except Exception as e:
-                logger.error(f"Error in alert monitoring: {e}")
-                await asyncio.sleep(60)
+                    """
+                    logger.info("Alert triggered for %s @ %s", alert['symbol'], current_price)
+                    if self.bot is not None:
+                        await self.bot.send_message(chat_id=alert['chat_id'], text=message, parse_mode='Markdown')
+                    
+                    self.history.setdefault(user_id, collections.deque(maxlen=ALERT_HISTORY_LIMIT)).append({
+                        'id': alert['id'],
+                        'symbol': alert['symbol'],
+                        'condition': self._describe(alert),
+                        'price': current_price,
+                        'triggered_at': now,
+                    })
+                    
+                    # Remove triggered alert
+                    user_alerts.remove(alert)
+                    if 'indicator' in alert:
+                        self.indicators.release(alert['indicator'])
+                    
+                except Exception as e:
+                    logger.error("Error checking alert %s: %s", alert.get('id'), e)
+    
+    def _is_triggered(self, alert, price):
+        kind = alert.get('type', 'price')
+        if kind == 'price':
+            # Simple price crossing
+            return abs(price - alert['target_price']) <= 0.01
+        
+        value = self.indicators.get(alert['indicator'])
+        if value is None:
+            return False
+        if kind in ('sma', 'ema'):
+            side = price >= value
+            crossed = alert['last_side'] is not None and side != alert['last_side']
+            alert['last_side'] = side
+            return crossed
+        if kind == 'rsi':
+            return value > alert['level'] if alert['above'] else value < alert['level']
+        if kind == 'move':
+            return abs(value) >= alert['percent']
+        return value >= alert['multiple']
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
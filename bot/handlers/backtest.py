@@ -0,0 +1,140 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import asyncio
+import datetime
+import logging
+import re
+from bot.alert_rules import RuleError, describe_rule, parse_rule
+from bot.backtest import HORIZONS, backtest_many
+from bot.compute import run_in_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_YEARS = 5
+MAX_YEARS = 20
+# Concurrent price-history requests while a watchlist's bars are first cached
+HISTORY_CONCURRENCY = 8
+
+
+def _date(ms):
+    return datetime.datetime.fromtimestamp(ms / 1000, datetime.timezone.utc).strftime('%Y-%m-%d')
+
+
+class BacktestHandler:
+    def __init__(self, schwab_manager, auth_manager, watchlists):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        self.watchlists = watchlists  # WatchlistHandler.watchlists, shared
+
+    async def run_backtest(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+
+        args = [a.lower() for a in context.args]
+        years = DEFAULT_YEARS
+        if args and re.fullmatch(r"\d+y", args[-1]):
+            years = max(1, min(int(args.pop()[:-1]), MAX_YEARS))
+        if len(args) < 2:
+            await update.message.reply_text(
+                "Usage: /backtest SYMBOL|watchlist RULE [YEARSy]\n"
+                "Rules are the same as /alert:\n"
+                "/backtest AAPL 150\n"
+                "/backtest AAPL rsi 14 <30\n"
+                "/backtest watchlist sma 50 10y\n"
+                "/backtest TSLA move 5 390 (percent, minutes; a trading day is 390)"
+            )
+            return
+
+        target = args[0].upper()
+        if target == "WATCHLIST":
+            symbols = list(self.watchlists.get(update.effective_user.id, []))
+            if not symbols:
+                await update.message.reply_text("👀 Your watchlist is empty")
+                return
+        else:
+            if not self.schwab.symbols.is_valid(target):
+                await update.message.reply_text(self.schwab.symbols.rejection(target))
+                return
+            symbols = [target]
+
+        try:
+            rule = parse_rule(target, args[1:])
+        except RuleError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+        except (ValueError, IndexError):
+            await update.message.reply_text("❌ Invalid rule. Send /backtest for usage.")
+            return
+
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+
+        try:
+            # Completed daily bars from the local cache; only gaps go to the network
+            end = datetime.datetime.combine(datetime.date.today(), datetime.time(), tzinfo=datetime.timezone.utc)
+            start = end - datetime.timedelta(days=365 * years)
+            bars = await self._histories(symbols, start, end)
+            if not bars:
+                await update.message.reply_text("❌ No price history available")
+                return
+
+            results = await run_in_pool(backtest_many, rule, bars)
+            if len(symbols) == 1:
+                # Keyed by the real symbol, also when it came from a one-symbol watchlist
+                message = self._format_single(symbols[0], rule, results[symbols[0]], years)
+            else:
+                message = self._format_batch(rule, results, years)
+            missing = [symbol for symbol in symbols if symbol not in bars]
+            if missing:
+                message += f"\n_No history for: {', '.join(missing[:10])}_"
+            await update.message.reply_text(message, parse_mode='Markdown')
+
+        except Exception as e:
+            logger.error("Error running backtest: %s", e)
+            await update.message.reply_text(f"❌ Error: {str(e)}")
+
+    async def _histories(self, symbols, start, end):
+        semaphore = asyncio.Semaphore(HISTORY_CONCURRENCY)
+
+        async def load(symbol):
+            async with semaphore:
+                return await self.schwab.get_price_history(symbol, start, end, frequency="daily")
+
+        results = await asyncio.gather(*[load(symbol) for symbol in symbols], return_exceptions=True)
+        bars = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.error("Error loading history for %s: %s", symbol, result)
+            elif result is not None and len(result):
+                bars[symbol] = result.copy()
+        return bars
+
+    def _format_single(self, symbol, rule, result, years):
+        message = f"🧪 *Backtest: {symbol}* {describe_rule(rule)}\n"
+        if not result['fires']:
+            return message + f"\nWould not have fired in {result['bars']} daily bars ({years}y)"
+        message += (
+            f"\nFired *{result['fires']}* times in {result['bars']} daily bars "
+            f"({_date(result['first'])} → {_date(result['last'])})\n"
+            f"Last: {', '.join(_date(ms) for ms in result['dates'][-5:])}\n\n"
+            "*Forward returns:*\n```\n"
+            f"{'Bars':>4} {'N':>4} {'Mean':>7} {'Median':>7} {'Up%':>5}\n"
+        )
+        for h in HORIZONS:
+            stats = result['forward'].get(h)
+            if stats:
+                message += (f"{h:>4} {stats['count']:>4} {stats['mean'] * 100:>6.2f}% "
+                            f"{stats['median'] * 100:>6.2f}% {stats['hit_rate'] * 100:>4.0f}%\n")
+        return message + "```"
+
+    def _format_batch(self, rule, results, years):
+        horizon = HORIZONS[1]
+        rows = sorted(results.items(), key=lambda item: item[1]['fires'], reverse=True)
+        message = f"🧪 *Backtest: watchlist* {describe_rule(rule)} ({years}y daily)\n```\n"
+        message += f"{'Symbol':<7} {'Fires':>5} {f'{horizon}d avg':>7} {'Up%':>5}\n"
+        for symbol, result in rows[:30]:
+            stats = result['forward'].get(horizon)
+            if stats:
+                message += f"{symbol:<7} {result['fires']:>5} {stats['mean'] * 100:>6.2f}% {stats['hit_rate'] * 100:>4.0f}%\n"
+            else:
+                message += f"{symbol:<7} {result['fires']:>5} {'-':>7} {'-':>5}\n"
+        return message + "```"
@@ -16,34 +16,51 @@ class BaseHandler:
 
 📊 *Quotes & Data:*
 • `/quote SYMBOL` - Get stock quote
+• `/live SYMBOL [minutes]` - Self-updating quote
+• `/chart SYMBOL [range] [interval]` - Price chart
+• `/chain SYMBOL [expiry]` - Option chain with Greeks
+• `@botname AAP…` - Inline symbol search in any chat
 • `/movers` - Market movers
 • `/gainers` - Top gainers
 • `/losers` - Top losers
 
 💼 *Portfolio:*
 • `/portfolio` - Portfolio summary
-• `/positions` - Current positions
+• `/positions [breakdown]` - Positions across all accounts
+• `/risk [days]` - VaR, beta, concentration and correlation
+• `/export positions|orders|alerts [csv|xlsx]` - Download as a file
 • `/balance` - Account balance
 
 🛒 *Trading:*
 • `/order` - Place order
-• `/buy SYMBOL SHARES` - Quick buy
-• `/sell SYMBOL SHARES` - Quick sell
+• `/buy SYMBOL SHARES [limit|stop PRICE]` - Quick buy
+• `/sell SYMBOL SHARES [limit|stop PRICE]` - Quick sell
 • `/orders` - View orders
+• `/cancel ID` - Cancel a paper order
+• `/account` - Choose the account for orders
+• `/paper on|off|reset` - Simulated trading account
+Confirming a Schwab order also sends this chat every fill, cancel and reject on that account, not only for that order.
 
 🔔 *Alerts:*
 • `/alert SYMBOL PRICE` - Price alert
+• `/alert SYMBOL sma|ema|rsi|move|volume ...` - Indicator alert
 • `/alerts` - List alerts
 • `/delalert ID` - Delete alert
+• `/backtest SYMBOL|watchlist RULE` - Replay an alert rule on history
 
 👀 *Watchlist:*
 • `/watchlist` - Show watchlist
 • `/addwatch SYMBOL` - Add to watchlist
 • `/delwatch SYMBOL` - Remove from watchlist
+• `/digest premarket|open|close` - Scheduled watchlist digest
 
 📰 *News:*
 • `/news SYMBOL` - Get news
 
+⚙️ *Account:*
+• `/quota` - Your request quotas and usage
+• `/link` / `/unlink` - Connect your own Schwab account (multi-tenant mode)
+
 ⚠️ *Educational use only. Verify all trades.*
         """
         await update.message.reply_text(welcome_message, parse_mode='Markdown')
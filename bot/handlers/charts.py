@@ -0,0 +1,113 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import datetime
+import logging
+import time
+from bot.charts import ChartRenderer
+from bot.history import FREQUENCIES
+
+logger = logging.getLogger(__name__)
+
+# range: (days of history, default interval)
+RANGES = {
+    '1d': (1, '5min'),
+    '5d': (5, '15min'),
+    '1m': (30, '30min'),
+    '3m': (90, 'daily'),
+    '6m': (182, 'daily'),
+    '1y': (365, 'daily'),
+    '5y': (1825, 'weekly'),
+}
+
+# Longest range for each intraday interval: Schwab serves intraday history ten days per
+# request, so e.g. a year of minute bars would take dozens of calls for an unreadable chart
+MAX_INTRADAY_DAYS = {
+    'minute': 5,
+    '5min': 30,
+    '15min': 30,
+    '30min': 90,
+}
+
+# Above this many bars candles become unreadable, so fall back to a line
+MAX_CANDLES = 150
+
+# A chart whose last bar is still forming is reused for this long at most
+FORMING_BAR_TTL = 60
+
+
+class ChartHandler:
+    def __init__(self, schwab_manager, auth_manager):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        self.renderer = ChartRenderer()
+
+    async def start(self):
+        """Pre-warm the render pool so the first /chart does not pay for process startup"""
+        await self.renderer.start()
+
+    def shutdown(self):
+        self.renderer.shutdown()
+
+    async def get_chart(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+
+        if not context.args:
+            await update.message.reply_text(
+                "Usage: /chart SYMBOL [range] [interval]\n"
+                f"Ranges: {', '.join(RANGES)}\n"
+                f"Intervals: {', '.join(FREQUENCIES)}\n"
+                "Example: /chart AAPL 3m daily"
+            )
+            return
+
+        symbol = context.args[0].upper()
+        chart_range = context.args[1].lower() if len(context.args) > 1 else '3m'
+        if chart_range not in RANGES:
+            await update.message.reply_text(f"❌ Unknown range. Use one of: {', '.join(RANGES)}")
+            return
+        days, interval = RANGES[chart_range]
+        if len(context.args) > 2:
+            interval = context.args[2].lower()
+        if interval not in FREQUENCIES:
+            await update.message.reply_text(f"❌ Unknown interval. Use one of: {', '.join(FREQUENCIES)}")
+            return
+        max_days = MAX_INTRADAY_DAYS.get(interval)
+        if max_days is not None and days > max_days:
+            longest = max((name for name in RANGES if RANGES[name][0] <= max_days), key=lambda name: RANGES[name][0])
+            await update.message.reply_text(
+                f"❌ {interval} charts go back at most {max_days} days; use a range up to {longest} "
+                "or a longer interval"
+            )
+            return
+
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="upload_photo")
+
+        try:
+            start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+            bars = await self.schwab.get_price_history(symbol, start, frequency=interval)
+            if len(bars) == 0:
+                await update.message.reply_text(f"❌ No price history for {symbol}")
+                return
+
+            last_bar = int(bars['datetime'][-1])
+            key = (symbol, chart_range, interval, last_bar)
+            if last_bar + FREQUENCIES[interval][4] > time.time() * 1000:
+                # The last bar is still forming, so the image goes stale without its key changing
+                key += (int(time.time() // FORMING_BAR_TTL),)
+            caption = f"📈 {symbol} · {chart_range} · {interval}"
+
+            file_id = self.renderer.file_ids.get(key)
+            if file_id is not None:
+                await update.message.reply_photo(photo=file_id, caption=caption)
+                return
+
+            style = 'candle' if len(bars) <= MAX_CANDLES else 'line'
+            png = await self.renderer.render(key, bars, symbol, f"{chart_range} · {interval}", style)
+            message = await update.message.reply_photo(photo=png, caption=caption)
+            if message.photo:
+                self.renderer.file_ids[key] = message.photo[-1].file_id
+
+        except Exception as e:
+            logger.error("Error rendering chart for %s: %s", symbol, e)
+            await update.message.reply_text(f"❌ Error creating chart: {str(e)}")
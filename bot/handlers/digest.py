@@ -0,0 +1,124 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import asyncio
+import datetime
+import logging
+from bot.digest import SCHEDULES, MARKET_TZ, FanoutSender, render_digest
+from bot.logs import bind_request
+from bot.portfolio import aggregate_accounts
+from bot.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class DigestHandler:
+    def __init__(self, schwab_manager, auth_manager, watchlists):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        self.watchlists = watchlists  # WatchlistHandler.watchlists, shared
+        # In production, use a database
+        self.subscriptions = {}  # {user_id: {'chat_id': int, 'kinds': set}}
+        self.sender = None
+        self.digest_jobs = []
+
+    async def manage_digest(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/digest, /digest KIND [off], /digest off"""
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+
+        user_id = update.effective_user.id
+        args = [a.lower() for a in context.args]
+        subscription = self.subscriptions.setdefault(user_id, {'chat_id': update.effective_chat.id, 'kinds': set()})
+        subscription['chat_id'] = update.effective_chat.id
+
+        if args == ['off']:
+            subscription['kinds'].clear()
+        elif args and args[0] in SCHEDULES:
+            if len(args) > 1 and args[1] == 'off':
+                subscription['kinds'].discard(args[0])
+            else:
+                subscription['kinds'].add(args[0])
+        elif args:
+            await update.message.reply_text(
+                "Usage: /digest [premarket|open|close] [off]\n"
+                "Example: /digest close\n"
+                "/digest off - stop all digests"
+            )
+            return
+
+        if not subscription['kinds']:
+            del self.subscriptions[user_id]
+            await update.message.reply_text(
+                "📬 You have no digests scheduled\n"
+                "Use `/digest premarket`, `/digest open` or `/digest close` to subscribe",
+                parse_mode='Markdown'
+            )
+            return
+
+        lines = ["📬 *Your digests* (US Eastern, weekdays)"]
+        for kind in SCHEDULES:
+            if kind in subscription['kinds']:
+                at, title = SCHEDULES[kind]
+                lines.append(f"• {title} at {at.strftime('%H:%M')}")
+        await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+
+    async def start(self, bot):
+        self.sender = FanoutSender(bot)
+        if not self.digest_jobs:
+            for kind, (at, _) in SCHEDULES.items():
+                self.digest_jobs.append(get_scheduler().cron(
+                    f"digest-{kind}", f"{at.minute} {at.hour} * * 1-5",
+                    lambda kind=kind: self.send_digests(kind), tz=MARKET_TZ, kind="digest",
+                ))
+
+    async def send_digests(self, kind: str):
+        """One batched quote fetch for the union of all subscribers' watchlists, then fan out"""
+        # The cron fires every weekday; exchange holidays have nothing to digest
+        if not self.schwab.calendar.is_trading_day(datetime.datetime.now(MARKET_TZ).date()):
+            return
+        subscribers = [(user_id, sub) for user_id, sub in self.subscriptions.items() if kind in sub['kinds']]
+        if not subscribers:
+            return
+
+        symbols = set()
+        for user_id, _ in subscribers:
+            symbols.update(self.watchlists.get(user_id, []))
+        quotes = await self.schwab.get_quotes(sorted(symbols)) if symbols else {}
+        if await self.schwab.authorize_url() is None:
+            # One shared Schwab account: a single fetch serves every digest in this run
+            portfolio_lines = [await self._portfolio_line(kind, None)] * len(subscribers)
+        else:
+            portfolio_lines = await asyncio.gather(*[self._portfolio_line(kind, user_id) for user_id, _ in subscribers])
+
+        messages = [
+            (sub['chat_id'], render_digest(kind, self.watchlists.get(user_id, []), quotes, portfolio_line))
+            for (user_id, sub), portfolio_line in zip(subscribers, portfolio_lines)
+        ]
+        blocked = await self.sender.send_all(messages, parse_mode='Markdown')
+        if blocked:
+            blocked = set(blocked)
+            for user_id, sub in subscribers:
+                if sub['chat_id'] in blocked:
+                    self.subscriptions.pop(user_id, None)
+        logger.info(
+            "Sent %s %s digests covering %s symbols (%s blocked chats unsubscribed)",
+            len(messages) - len(blocked), kind, len(symbols), len(blocked),
+        )
+
+    async def _portfolio_line(self, kind, user_id):
+        """Positions summary fetched as one subscriber, so multi-tenant mode reads their own account"""
+        # Runs in its own task under asyncio.gather, so the binding stays with this subscriber
+        bind_request(None, f"digest-{kind}", user_id)
+        try:
+            results = await self.schwab.get_all_account_details(fields="positions")
+            if not results:
+                return None
+            portfolio = aggregate_accounts(results)
+            held = sum(1 for pos in portfolio['positions'].values() if pos['quantity'] != 0)
+            return f"💼 Portfolio: ${portfolio['balances']['liquidationValue']:,.2f} across {held} positions"
+        except PermissionError:
+            # No linked account (multi-tenant mode): the digest goes out without the line
+            return None
+        except Exception as e:
+            logger.error("Error building digest portfolio summary: %s", e)
+            return None
@@ -0,0 +1,136 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import asyncio
+import datetime
+import logging
+import os
+import tempfile
+from bot.export import COLUMNS, FORMATS, utc, write_export
+from bot.portfolio import account_label
+
+logger = logging.getLogger(__name__)
+
+# Exports writing files at the same time; the rest wait their turn
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))
+# Order events fetched per request while an export is being written
+EVENT_PAGE_SIZE = 500
+
+
+def _position_rows(results):
+    for account, details in results:
+        if not details:
+            continue
+        data = details.get('securitiesAccount', details)
+        label = account_label(account.get('accountNumber', data.get('accountNumber', '')))
+        for pos in data.get('positions', []) or []:
+            yield (
+                label,
+                pos.get('instrument', {}).get('symbol', 'N/A'),
+                pos.get('longQuantity', 0) - pos.get('shortQuantity', 0),
+                pos.get('averagePrice'),
+                pos.get('marketValue'),
+            )
+
+
+def _paper_order_rows(orders):
+    for order in orders:
+        yield (utc(order.created), order.id, 'PAPER', '', order.symbol, order.side, order.type,
+               order.quantity, order.price, order.fill_price, order.status)
+
+
+def _activity_rows(events):
+    for event in events:
+        yield (utc(event.get('received_at')), event['order_id'], account_label(event['account']),
+               event['message_type'], event['symbol'], '', '', event['quantity'], None,
+               event['price'], event['kind'])
+
+
+def _event_pages(page, loop, fetch):
+    """
+    Order events page by page, for the writer thread: the next page is fetched on the
+    event loop only once the previous one has been written
+    """
+    while page:
+        yield from page
+        if len(page) < EVENT_PAGE_SIZE:
+            return
+        page = asyncio.run_coroutine_threadsafe(fetch(page[-1]['seq'], EVENT_PAGE_SIZE), loop).result()
+
+
+def _alert_rows(history):
+    for alert in history:
+        yield (utc(alert['triggered_at']), alert['id'], alert['symbol'], alert['condition'], alert['price'])
+
+
+class ExportHandler:
+    def __init__(self, schwab_manager, auth_manager, paper, alert_history):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        self.paper = paper  # PaperBroker, shared with OrderHandler
+        self.alert_history = alert_history  # AlertHandler.history, shared
+        self.semaphore = asyncio.Semaphore(EXPORT_CONCURRENCY)
+
+    async def export(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+
+        args = [a.lower() for a in context.args]
+        if not args or args[0] not in COLUMNS or (len(args) > 1 and args[1] not in FORMATS):
+            await update.message.reply_text(
+                "Usage: /export positions|orders|alerts [csv|xlsx]\n"
+                "Example: /export orders xlsx"
+            )
+            return
+        kind = args[0]
+        fmt = args[1] if len(args) > 1 else 'csv'
+
+        try:
+            rows = await self._rows(kind, update.effective_user.id)
+            if rows is None:
+                await update.message.reply_text(f"📭 No {kind} to export")
+                return
+
+            await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="upload_document")
+            fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+            os.close(fd)
+            try:
+                async with self.semaphore:
+                    count = await asyncio.to_thread(write_export, path, fmt, kind.title(), COLUMNS[kind], rows)
+                filename = f"{kind}-{datetime.date.today().isoformat()}.{fmt}"
+                with open(path, 'rb') as f:
+                    await update.message.reply_document(
+                        document=f, filename=filename, caption=f"📤 {count:,} {kind} rows"
+                    )
+            finally:
+                os.remove(path)
+
+        except Exception as e:
+            logger.error("Error exporting %s: %s", kind, e)
+            await update.message.reply_text(f"❌ Error: {str(e)}")
+
+    async def _rows(self, kind, user_id):
+        """
+        A row generator over data already held locally (cached account details, the
+        paper book, alert history) or paged in from the activity log as it is written,
+        or None if there is nothing. Local containers are copied here, on the loop, so
+        the writer thread never iterates one that is being appended to.
+        """
+        paper = user_id in self.paper.enabled
+        if kind == 'positions':
+            if paper:
+                symbols = list(self.paper.account(user_id).positions)
+                quotes = await self.schwab.get_cached_quotes(symbols) if symbols else {}
+                results = [self.paper.account_details(user_id, quotes)]
+            else:
+                results = await self.schwab.get_all_account_details(fields="positions")
+            return _position_rows(results) if results else None
+        if kind == 'orders':
+            if paper:
+                orders = [order for order in self.paper.orders.values() if order.user_id == user_id]
+                return _paper_order_rows(orders) if orders else None
+            page = await self.schwab.get_order_events(0, EVENT_PAGE_SIZE)
+            if not page:
+                return None
+            return _activity_rows(_event_pages(page, asyncio.get_running_loop(), self.schwab.get_order_events))
+        history = list(self.alert_history.get(user_id, []))
+        return _alert_rows(history) if history else None
@@ -0,0 +1,75 @@
+from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from telegram.ext import ContextTypes
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Wait this long for the user to stop typing before answering
+DEBOUNCE_SECONDS = 0.15
+MAX_RESULTS = 10
+
+
+class InlineHandler:
+    def __init__(self, schwab_manager, auth_manager):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        self.pending = {}  # {user_id: asyncio.Task} latest in-flight answer per user
+
+    async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Registered with block=False, so keystrokes arrive while an earlier answer is pending"""
+        query = update.inline_query
+        user_id = query.from_user.id
+        if not self.auth.is_authorized(user_id):
+            await query.answer([], cache_time=300, is_personal=True)
+            return
+
+        previous = self.pending.pop(user_id, None)
+        if previous is not None:
+            previous.cancel()
+
+        task = asyncio.create_task(self._answer(query), name="inline query")
+        self.pending[user_id] = task
+        task.add_done_callback(lambda t: self._forget(user_id, t))
+
+    def _forget(self, user_id, task):
+        if self.pending.get(user_id) is task:
+            del self.pending[user_id]
+
+    async def _answer(self, query):
+        """Cancelled (during the debounce or the quote fetch) when a newer query arrives"""
+        try:
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+
+            symbols = self.schwab.symbols.search(query.query, limit=MAX_RESULTS)
+            if not symbols:
+                await query.answer([], cache_time=30)
+                return
+
+            quotes = await self.schwab.get_cached_quotes(symbols)
+            results = []
+            for symbol in symbols:
+                data = quotes.get(symbol, {})
+                quote = data.get('quote', data)
+                price = quote.get('lastPrice')
+                change_pct = quote.get('netPercentChangeInDouble', 0) or 0
+                name = self.schwab.symbols.name(symbol)
+
+                if price is None:
+                    title = symbol
+                    text = f"{symbol} {name}".strip()
+                else:
+                    emoji = "📈" if change_pct >= 0 else "📉"
+                    title = f"{symbol}  ${price:.2f}  {emoji} {change_pct:+.2f}%"
+                    text = f"{emoji} {symbol} ${price:.2f} ({change_pct:+.2f}%)"
+                results.append(InlineQueryResultArticle(
+                    id=symbol,
+                    title=title,
+                    description=name,
+                    input_message_content=InputTextMessageContent(text),
+                ))
+
+            await query.answer(results, cache_time=5)
+
+        except Exception as e:
+            logger.error("Error answering inline query '%s': %s", query.query, e)
@@ -0,0 +1,65 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LinkHandler:
+    def __init__(self, schwab_manager, auth_manager):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+
+    async def link(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/link shows the sign-in link; /link ADDRESS finishes linking with the address Schwab redirected to"""
+        user_id = update.effective_user.id
+        if not self.auth.is_authorized(user_id):
+            return
+
+        try:
+            url = await self.schwab.authorize_url()
+            if url is None:
+                await update.message.reply_text("ℹ️ This bot uses one shared Schwab account; there is nothing to link")
+                return
+
+            if not context.args:
+                linked = await self.schwab.is_linked(user_id)
+                await update.message.reply_text(
+                    ("✅ Your Schwab account is linked. Run these steps again to re-link it.\n\n" if linked else "")
+                    + "🔗 *Link your Schwab account*\n\n"
+                    f"1. Open {url} and sign in\n"
+                    "2. Approve access; you will land on a page that may not load\n"
+                    "3. Copy that page's full address and send `/link ADDRESS`",
+                    parse_mode='Markdown',
+                    disable_web_page_preview=True,
+                )
+                return
+
+            # The address carries a one-time code; don't leave it in the chat
+            try:
+                await update.message.delete()
+            except Exception:
+                pass
+            await self.schwab.link_account(user_id, context.args[0])
+            await update.effective_chat.send_message("✅ Schwab account linked. Try /portfolio")
+
+        except Exception as e:
+            logger.error("Error linking account for user %s: %s", user_id, e)
+            await update.effective_chat.send_message(f"❌ Error: {str(e)}")
+
+    async def unlink(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user_id = update.effective_user.id
+        if not self.auth.is_authorized(user_id):
+            return
+
+        try:
+            if await self.schwab.authorize_url() is None:
+                await update.message.reply_text("ℹ️ This bot uses one shared Schwab account; there is nothing to unlink")
+                return
+            if await self.schwab.unlink_account(user_id):
+                await update.message.reply_text("✅ Schwab account unlinked and its tokens deleted")
+            else:
+                await update.message.reply_text("📭 No Schwab account was linked")
+        except Exception as e:
+            logger.error("Error unlinking account for user %s: %s", user_id, e)
+            await update.message.reply_text(f"❌ Error: {str(e)}")
@@ -0,0 +1,173 @@
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+import datetime
+import logging
+import os
+import time
+from bot.live import EditFanout, render_live
+from bot.market_hours import MARKET_TZ
+from bot.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+LIVE_INTERVAL = float(os.getenv("LIVE_INTERVAL", "5"))
+LIVE_DEFAULT_MINUTES = 15
+LIVE_MAX_MINUTES = 240
+LIVE_MAX_PER_USER = int(os.getenv("LIVE_MAX_PER_USER", "5"))
+ENDED = "⏹ Live updates ended"
+
+
+class LiveHandler:
+    def __init__(self, schwab_manager, auth_manager):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        # In production, use a database
+        self.messages = {}  # {(chat_id, message_id): {'user_id', 'symbol', 'expires', 'text', 'quote'}}
+        self.editor = None
+        self.live_job = None
+        self.timers = {}  # {(chat_id, message_id): expiry Timer}
+        self.fetches = 0
+
+    async def start(self, bot):
+        self.editor = EditFanout(bot, on_gone=self._drop)
+        if self.live_job is None:
+            # One batched quote fetch per interval feeds every live message; none while markets are closed
+            self.live_job = get_scheduler().every(
+                "live-quotes", LIVE_INTERVAL, self._refresh, gate=self.schwab.calendar.gate(self._symbols)
+            )
+        # Messages restored from a snapshot keep their original end time
+        for key, message in self.messages.items():
+            self._arm_expiry(key, message['expires'])
+
+    def _symbols(self):
+        return {message['symbol'] for message in self.messages.values()}
+
+    async def live(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/live SYMBOL [minutes], /live (list), /live off"""
+        user_id = update.effective_user.id
+        if not self.auth.is_authorized(user_id):
+            return
+
+        args = context.args
+        mine = [key for key, message in self.messages.items() if message['user_id'] == user_id]
+        if not args:
+            if not mine:
+                await update.message.reply_text(
+                    "Usage: /live SYMBOL [MINUTES]\n"
+                    f"Example: /live AAPL 30 (default {LIVE_DEFAULT_MINUTES}, up to {LIVE_MAX_MINUTES})\n"
+                    "/live off - stop all your live quotes"
+                )
+                return
+            lines = ["🔴 *Your live quotes*"]
+            for key in mine:
+                message = self.messages[key]
+                lines.append(f"• {message['symbol']} until {self._until(message['expires'])}")
+            await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+            return
+        if args[0].lower() == 'off':
+            for key in mine:
+                self._end(key)
+            await update.message.reply_text(f"⏹ Stopped {len(mine)} live quote(s)")
+            return
+
+        symbol = args[0].upper().strip()
+        try:
+            minutes = int(args[1]) if len(args) > 1 else LIVE_DEFAULT_MINUTES
+        except ValueError:
+            await update.message.reply_text("❌ Minutes must be a whole number")
+            return
+        minutes = max(1, min(minutes, LIVE_MAX_MINUTES))
+        if not self.schwab.symbols.is_valid(symbol):
+            await update.message.reply_text(self.schwab.symbols.rejection(symbol))
+            return
+        if len(mine) >= LIVE_MAX_PER_USER:
+            await update.message.reply_text(
+                f"❌ You already have {len(mine)} live quotes; stop one first or use /live off"
+            )
+            return
+
+        try:
+            quotes = await self.schwab.get_cached_quotes([symbol])
+            if symbol not in quotes:
+                await update.message.reply_text(f"❌ Could not find quote for {symbol}")
+                return
+            expires = time.time() + minutes * 60
+            text = render_live(symbol, quotes[symbol], self._footer(expires))
+            sent = await update.message.reply_text(text, parse_mode='Markdown', reply_markup=self._keyboard())
+            key = (sent.chat_id, sent.message_id)
+            self.messages[key] = {
+                'user_id': user_id, 'symbol': symbol, 'expires': expires, 'text': text, 'quote': quotes[symbol],
+            }
+            self._arm_expiry(key, expires)
+        except Exception as e:
+            logger.error("Error starting live quote for %s: %s", symbol, e)
+            await update.message.reply_text(f"❌ Error: {str(e)}")
+
+    async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        if query.data != "live_stop" or query.message is None:
+            await query.answer()
+            return
+        key = (query.message.chat_id, query.message.message_id)
+        message = self.messages.get(key)
+        if message is not None and message['user_id'] != update.effective_user.id:
+            await query.answer("Only the person who started it can stop this live quote")
+            return
+        await query.answer("Stopped")
+        self._end(key)
+
+    async def _refresh(self):
+        """Re-render every live message from one shared fetch; queue edits only for changed text"""
+        if not self.messages or self.editor is None:
+            return
+        symbols = sorted(self._symbols())
+        quotes = await self.schwab.get_cached_quotes(symbols, max_age=LIVE_INTERVAL)
+        self.fetches += 1
+        keyboard = self._keyboard()
+        for (chat_id, message_id), message in list(self.messages.items()):
+            data = quotes.get(message['symbol'])
+            if not data:
+                continue
+            text = render_live(message['symbol'], data, self._footer(message['expires']))
+            message['quote'] = data
+            if text == message['text']:
+                self.editor.stats['skipped'] += 1
+                continue
+            message['text'] = text
+            self.editor.submit(chat_id, message_id, text, parse_mode='Markdown', reply_markup=keyboard)
+
+    def _arm_expiry(self, key, expires):
+        self.timers[key] = get_scheduler().call_later(expires - time.time(), self._end, key)
+
+    def _end(self, key):
+        """Stop updating a message and leave it showing its last price"""
+        message = self._drop(*key)
+        if message is not None and self.editor is not None:
+            self.editor.submit(*key, render_live(message['symbol'], message['quote'], ENDED), parse_mode='Markdown')
+
+    def _drop(self, chat_id, message_id):
+        key = (chat_id, message_id)
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if self.editor is not None:
+            self.editor.discard(chat_id, message_id)
+        return self.messages.pop(key, None)
+
+    @staticmethod
+    def _until(expires):
+        return datetime.datetime.fromtimestamp(expires, MARKET_TZ).strftime('%H:%M ET')
+
+    def _footer(self, expires):
+        return f"🔴 Live until {self._until(expires)}"
+
+    @staticmethod
+    def _keyboard():
+        return InlineKeyboardMarkup([[InlineKeyboardButton("⏹ Stop", callback_data="live_stop")]])
+
+    def summary(self) -> str:
+        stats = self.editor.stats if self.editor is not None else {}
+        return (f"{len(self.messages)} messages on {len(self._symbols())} symbols, {self.fetches} fetches, "
+                f"{stats.get('edits', 0)} edits, {stats.get('skipped', 0)} unchanged, "
+                f"{stats.get('coalesced', 0)} coalesced, "
+                f"{self.editor.backlog if self.editor is not None else 0} queued")
@@ -13,57 +13,49 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def get_market_movers_data(client, index, top_n=5):
+def normalize_index(index):
+    """Prepend '$' if it's not already there"""
+    return index if index.startswith('$') else '$' + index
+
+
+def parse_movers(data, top_n=5):
     """
-    Fetch and return the top N movers by % change and volume from a specified index.
+    Reduce a movers() response to the top N movers by % change and volume.
     Args:
-        client: API client instance (must have .movers() method).
-        index (str): Market index symbol, e.g. "$DJI".
+        data (dict): Decoded movers response.
         top_n (int): Number of top movers to return for each category.
 
     Returns:
         dict: Dictionary containing two lists — 'top_percent' and 'top_volume'.
     """
-    if not index:
-        return {"error": "No index provided"}
-
-    # Prepend '$' if it's not already there
-    if not index.startswith('$'):
-        index = '$' + index
-
-    try:
-        # Call the API
-        data = client.movers(index).json()  # note the () after json
-        # Extract the list of movers
-        screeners = data.get("screeners", [])
-        if not screeners:
-            return {"error": "No movers found for this index"}
-
-        # Pull only important fields
-        movers_list = [
-            {
-                'symbol': s['symbol'],
-                'company': s['description'],
-                'price': s['lastPrice'],
-                'netChange': s['netChange'],
-                'percentChange': s['netPercentChange'] * 100,  # convert decimal to %
-                'volume': s['volume'],
-                'trades': s['trades'],
-                'marketShare': s['marketShare']
-            }
-            for s in screeners
-        ]
-
-        # Sort for top N movers
-        top_percent = sorted(movers_list, key=lambda x: abs(x['percentChange']), reverse=True)[:top_n]
-        top_volume = sorted(movers_list, key=lambda x: x['volume'], reverse=True)[:top_n]
-
-        return {
-            "top_percent": top_percent,
-            "top_volume": top_volume
+    # Extract the list of movers
+    screeners = (data or {}).get("screeners", [])
+    if not screeners:
+        return {"error": "No movers found for this index"}
+
+    # Pull only important fields
+    movers_list = [
+        {
+            'symbol': s['symbol'],
+            'company': s['description'],
+            'price': s['lastPrice'],
+            'netChange': s['netChange'],
+            'percentChange': s['netPercentChange'] * 100,  # convert decimal to %
+            'volume': s['volume'],
+            'trades': s['trades'],
+            'marketShare': s['marketShare']
         }
-    except Exception as e:
-        return {"error": f"Error fetching movers: {e}"}
+        for s in screeners
+    ]
+
+    # Sort for top N movers
+    top_percent = sorted(movers_list, key=lambda x: abs(x['percentChange']), reverse=True)[:top_n]
+    top_volume = sorted(movers_list, key=lambda x: x['volume'], reverse=True)[:top_n]
+
+    return {
+        "top_percent": top_percent,
+        "top_volume": top_volume
+    }
 
 
 class MoversHandler:
@@ -82,7 +74,8 @@ class MoversHandler:
             index = "SPX"  # Default index
 
         try:
-            movers_data = get_market_movers_data(self.schwab.client, index)
+            # Through the manager so the blocking HTTP call runs off the event loop
+            movers_data = parse_movers(await self.schwab.get_movers(normalize_index(index)))
 
             if "error" in movers_data:
                 await update.message.reply_text(f"❌ Error: {movers_data['error']}")
@@ -105,7 +98,7 @@ class MoversHandler:
             await update.message.reply_text(message, parse_mode='Markdown')
 
         except Exception as e:
-            logger.error(f"Error getting market movers: {e}")
+            logger.error("Error getting market movers: %s", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
 
 
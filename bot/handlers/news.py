@@ -1,6 +1,8 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 import logging
+import re
+from bot.news import NewsService, load_providers
 
 logger = logging.getLogger(__name__)
 
@@ -8,6 +10,12 @@ class NewsHandler:
     def __init__(self, schwab_manager, auth_manager):
         self.schwab = schwab_manager
         self.auth = auth_manager
+        self.news = NewsService(load_providers())
+    
+    async def start_prefetch(self, tracked_symbols):
+        """Prefetch headlines in the background for symbols users watch or alert on"""
+        # Headlines still arrive when markets are closed, just less urgently: hourly then
+        await self.news.start_prefetch(tracked_symbols, gate=self.schwab.calendar.gate(idle=3600))
     
     async def get_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
@@ -20,25 +28,31 @@ class NewsHandler:
         symbol = context.args[0].upper()
         
         try:
-            # Note: schwabdev might not have direct news endpoint
-            # You might need to use a different API like Alpha Vantage, NewsAPI, etc.
-            # This is a placeholder implementation
+            if not self.news.providers:
+                await update.message.reply_text(
+                    f"📰 *News for {symbol}*\n\n"
+                    "🔍 No news providers are configured.",
+                    parse_mode='Markdown'
+                )
+                return
             
-            message = f"""
-📰 *News for {symbol}*
-
-🔍 News integration requires additional API setup.
-Consider integrating with:
-• NewsAPI
-• Alpha Vantage News
-• Yahoo Finance News
-• Financial Modeling Prep
-
-For now, you can search for {symbol} news manually.
-            """
+            items = await self.news.get(symbol)
+            if not items:
+                await update.message.reply_text(f"📰 No recent news for {symbol}")
+                return
+            
+            message = f"📰 *News for {symbol}*\n\n"
+            for item in items:
+                # Drop characters that would break Markdown formatting
+                title = re.sub(r'[*_`\[\]]', '', item.get('title') or 'Untitled')
+                if item.get('url'):
+                    message += f"• [{title}]({item['url']})"
+                else:
+                    message += f"• {title}"
+                message += f" — _{re.sub(r'[*_`]', '', item.get('source', ''))}_\n"
             
-            await update.message.reply_text(message, parse_mode='Markdown')
+            await update.message.reply_text(message, parse_mode='Markdown', disable_web_page_preview=True)
             
         except Exception as e:
-            logger.error(f"Error getting news: {e}")
+            logger.error("Error getting news: %s", e)
             await update.message.reply_text(f"❌ Error getting news: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,82 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import logging
+from bot.cache import TTLCache
+from bot.compute import run_in_pool
+from bot.options import analyze_chain
+
+logger = logging.getLogger(__name__)
+
+
+class OptionsHandler:
+    def __init__(self, schwab_manager, auth_manager):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        # Priced ladders live as long as the chain they were computed from
+        self.ladders = TTLCache(ttl=30, maxsize=200)
+
+    async def get_chain(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+
+        if not context.args:
+            await update.message.reply_text(
+                "Usage: /chain SYMBOL [YYYY-MM-DD]\n"
+                "Example: /chain AAPL\n"
+                "Example: /chain AAPL 2025-01-17"
+            )
+            return
+
+        symbol = context.args[0].upper()
+        expiry = context.args[1] if len(context.args) > 1 else None
+
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+
+        try:
+            result = self.ladders.get((symbol, expiry))
+            if result is None:
+                chain = await self.schwab.get_option_chain(symbol, expiry)
+                if not chain or chain.get('status') == 'FAILED':
+                    await update.message.reply_text(f"❌ No option chain found for {symbol}")
+                    return
+                result = await run_in_pool(analyze_chain, chain, expiry)
+                self.ladders.set((symbol, expiry), result)
+
+            if 'error' in result:
+                expirations = ", ".join(result['expirations'][:8]) or "none"
+                await update.message.reply_text(
+                    f"❌ No contracts for {symbol}{f' expiring {expiry}' if expiry else ''}\n"
+                    f"Available: {expirations}"
+                )
+                return
+
+            await update.message.reply_text(self._format_ladder(symbol, result), parse_mode='Markdown')
+
+        except Exception as e:
+            logger.error("Error getting option chain for %s: %s", symbol, e)
+            await update.message.reply_text(f"❌ Error getting option chain: {str(e)}")
+
+    def _format_ladder(self, symbol, result):
+        def side(data):
+            if not data:
+                return f"{'-':>18}"
+            iv = f"{data['iv'] * 100:5.1f}" if data['iv'] is not None else "  n/a"
+            return f"{data['bid']:6.2f} {iv} {data['delta']:+.2f}"
+
+        atm = min((row['strike'] for row in result['ladder']), key=lambda k: abs(k - result['underlying']))
+        lines = [
+            f"{'CALLS':^18} | {'':^8} | {'PUTS':^18}",
+            f"{'Bid':>6} {'IV%':>5} {'Δ':>5} | {'Strike':^8} | {'Bid':>6} {'IV%':>5} {'Δ':>5}",
+        ]
+        for row in result['ladder']:
+            marker = "*" if row['strike'] == atm else " "
+            lines.append(f"{side(row.get('call'))} |{marker}{row['strike']:^8.2f}{marker}| {side(row.get('put'))}")
+
+        others = [e for e in result['expirations'] if e != result['expiry']][:4]
+        ladder = "\n".join(lines)
+        return (
+            f"📊 *{symbol} Options* — {result['expiry']} ({result['days']}d)\n"
+            f"Underlying: ${result['underlying']:.2f} · {result['contracts']} contracts priced\n"
+            f"```\n{ladder}\n```\n"
+            f"Other expiries: {', '.join(others) or 'none'}"
+        )
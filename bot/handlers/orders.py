@@ -1,15 +1,68 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import logging
+import math
+import os
+import time
+from bot.paper import CANCELLED, FILLED, LIMIT, MARKET, OPEN, STOP
+from bot.portfolio import account_label
+from bot.scheduler import get_scheduler
 
 logger = logging.getLogger(__name__)
 
+ORDER_TYPES = {'limit': LIMIT, 'stop': STOP}
+NOT_PAPER = "❌ Limit and stop orders are only available in paper trading (/paper on)"
+# Seconds between quote polls for symbols with resting paper orders
+PAPER_TICK_INTERVAL = float(os.getenv("PAPER_TICK_INTERVAL", "5"))
+
 class OrderHandler:
-    def __init__(self, schwab_manager, auth_manager):
+    def __init__(self, schwab_manager, auth_manager, paper):
         self.schwab = schwab_manager
         self.auth = auth_manager
+        self.paper = paper  # PaperBroker, shared with PortfolioHandler
         # Store order sessions temporarily (use database in production)
         self.order_sessions = {}
+        self.selected_accounts = {}  # {user_id: account_number} target account for orders
+        self.paper_chats = {}  # {user_id: chat_id} where paper fills are reported
+        self.paper_job = None
+        self.bot = None
+    
+    async def _target_account(self, user_id):
+        """The account the user picked with /account, else the first linked account"""
+        accounts = await self.schwab.get_accounts()
+        if not accounts:
+            return None
+        selected = self.selected_accounts.get(user_id)
+        for account in accounts:
+            if account['accountNumber'] == selected:
+                return account
+        return accounts[0]
+    
+    async def select_account(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+        
+        try:
+            accounts = await self.schwab.get_accounts()
+            if not accounts:
+                await update.message.reply_text("❌ No linked accounts found")
+                return
+            
+            current = await self._target_account(update.effective_user.id)
+            keyboard = [
+                [InlineKeyboardButton(
+                    f"{'✅ ' if account is current else ''}{account_label(account['accountNumber'])}",
+                    callback_data=f"order_account_{index}"
+                )]
+                for index, account in enumerate(accounts)
+            ]
+            await update.message.reply_text(
+                f"🏦 Orders go to {account_label(current['accountNumber'])}. Select an account:",
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+        except Exception as e:
+            logger.error("Error listing accounts: %s", e)
+            await update.message.reply_text(f"❌ Error: {str(e)}")
     
     async def place_order_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
@@ -32,55 +85,94 @@ class OrderHandler:
         if not self.auth.is_authorized(update.effective_user.id):
             return
         
-        if len(context.args) < 2:
-            await update.message.reply_text("Usage: /buy SYMBOL SHARES\nExample: /buy AAPL 10")
-            return
-        
-        symbol = context.args[0].upper()
-        try:
-            shares = int(context.args[1])
-            await self._initiate_order(update, symbol, shares, "BUY")
-        except ValueError:
-            await update.message.reply_text("❌ Invalid number of shares")
+        await self._quick_order(update, context, "BUY")
     
     async def quick_sell(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
             return
         
-        if len(context.args) < 2:
-            await update.message.reply_text("Usage: /sell SYMBOL SHARES\nExample: /sell AAPL 10")
+        await self._quick_order(update, context, "SELL")
+    
+    async def _quick_order(self, update, context, action):
+        """/buy|/sell SYMBOL SHARES [limit|stop PRICE]"""
+        command = action.lower()
+        if len(context.args) not in (2, 4) or (len(context.args) == 4 and context.args[2].lower() not in ORDER_TYPES):
+            await update.message.reply_text(
+                f"Usage: /{command} SYMBOL SHARES [limit|stop PRICE]\n"
+                f"Example: /{command} AAPL 10\n"
+                f"Example: /{command} AAPL 10 limit 150"
+            )
             return
         
         symbol = context.args[0].upper()
         try:
             shares = int(context.args[1])
-            await self._initiate_order(update, symbol, shares, "SELL")
         except ValueError:
             await update.message.reply_text("❌ Invalid number of shares")
+            return
+        order_type, price = MARKET, None
+        if len(context.args) == 4:
+            order_type = ORDER_TYPES[context.args[2].lower()]
+            try:
+                price = float(context.args[3])
+            except ValueError:
+                await update.message.reply_text("❌ Invalid price")
+                return
+            if not math.isfinite(price):
+                await update.message.reply_text("❌ Invalid price")
+                return
+            # Cents, so the confirmation shows exactly the price the order rests at
+            price = round(price, 2)
+        if shares <= 0 or (price is not None and price <= 0):
+            await update.message.reply_text("❌ Shares and price must be positive")
+            return
+        if order_type != MARKET and update.effective_user.id not in self.paper.enabled:
+            await update.message.reply_text(NOT_PAPER)
+            return
+        await self._initiate_order(update, symbol, shares, action, order_type, price)
     
-    async def _initiate_order(self, update, symbol, shares, action):
+    async def _initiate_order(self, update, symbol, shares, action, order_type=MARKET, price=None):
+        if not self.schwab.symbols.is_valid(symbol):
+            await update.message.reply_text(self.schwab.symbols.rejection(symbol))
+            return
+        
         # Get current quote
         try:
-            quote_data = self.schwab.get_quote(symbol)
+            quote_data = await self.schwab.get_quote(symbol)
             if quote_data and symbol in quote_data:
-                price = quote_data[symbol]['quote']['lastPrice']
-                estimated_cost = price * shares
+                last = quote_data[symbol]['quote']['lastPrice']
+                estimated_cost = (price or last) * shares
+                user_id = update.effective_user.id
+                if user_id in self.paper.enabled:
+                    account_text = "📝 Paper"
+                else:
+                    account = await self._target_account(user_id)
+                    account_text = account_label(account['accountNumber']) if account else "N/A"
+                
+                if order_type == MARKET:
+                    note = "⚠️ This is a market order that will execute immediately."
+                else:
+                    note = f"⏳ {order_type.title()} order at ${price:.2f}, good until cancelled."
                 
                 message = f"""
 🔧 *Order Confirmation*
 
+Account: {account_text}
 Symbol: {symbol}
 Action: {action}
 Shares: {shares}
-Current Price: ${price:.2f}
+Current Price: ${last:.2f}
 Estimated {'Cost' if action == 'BUY' else 'Proceeds'}: ${estimated_cost:.2f}
 
-⚠️ This is a market order that will execute immediately.
+{note}
                 """
                 
+                callback = f"order_confirm_{symbol}_{shares}_{action}"
+                if order_type != MARKET:
+                    callback += f"_{order_type}_{price!r}"
                 keyboard = [
                     [
-                        InlineKeyboardButton("✅ Confirm", callback_data=f"order_confirm_{symbol}_{shares}_{action}"),
+                        InlineKeyboardButton("✅ Confirm", callback_data=callback),
                         InlineKeyboardButton("❌ Cancel", callback_data="order_cancel")
                     ]
                 ]
@@ -94,17 +186,22 @@ Estimated {'Cost' if action == 'BUY' else 'Proceeds'}: ${estimated_cost:.2f}
             else:
                 await update.message.reply_text(f"❌ Could not get quote for {symbol}")
         except Exception as e:
-            logger.error(f"Error initiating order: {e}")
+            logger.error("Error initiating order: %s", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
     
     async def get_orders(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
             return
         
+        user_id = update.effective_user.id
+        if user_id in self.paper.enabled:
+            await update.message.reply_text(self._format_paper_orders(user_id), parse_mode='Markdown')
+            return
+        
         try:
-            accounts = self.schwab.get_accounts()
-            if accounts and len(accounts) > 0:
-                account_hash = accounts[0]['hashValue']
+            account = await self._target_account(update.effective_user.id)
+            if account:
+                account_hash = account['hashValue']
                 # Get orders (you'd need to implement this in SchwabManager)
                 # orders = self.schwab.get_orders(account_hash)
                 
@@ -113,9 +210,80 @@ Estimated {'Cost' if action == 'BUY' else 'Proceeds'}: ${estimated_cost:.2f}
             else:
                 await update.message.reply_text("❌ No accounts found")
         except Exception as e:
-            logger.error(f"Error getting orders: {e}")
+            logger.error("Error getting orders: %s", e)
             await update.message.reply_text(f"❌ Error getting orders: {str(e)}")
     
+    def _format_paper_orders(self, user_id):
+        open_orders = self.paper.open_orders(user_id)
+        message = "📋 *Paper Orders*\n\n"
+        if open_orders:
+            message += "*Open:*\n"
+            for order in open_orders[:20]:
+                message += f"• #{order.id} {order.side} {order.quantity:g} {order.symbol} {order.type.lower()} ${order.price:.2f}\n"
+            message += "_Cancel with /cancel ID_\n\n"
+        done = [order for order in self.paper.recent_orders(user_id, 30) if order.status != OPEN][:10]
+        if done:
+            message += "*Recent:*\n"
+            for order in done:
+                message += f"• #{order.id} {order.side} {order.quantity:g} {order.symbol}: {self._describe_paper(order)}\n"
+        if not open_orders and not done:
+            message += "No paper orders yet."
+        return message
+    
+    def _describe_paper(self, order):
+        if order.status == FILLED:
+            return f"filled @ ${order.fill_price:.2f}"
+        if order.reason:
+            return f"{order.status.lower()} ({order.reason})"
+        return order.status.lower()
+    
+    async def paper_mode(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/paper [on|off|reset]: route this user's orders to a simulated account"""
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+        
+        user_id = update.effective_user.id
+        action = context.args[0].lower() if context.args else None
+        if action == "on":
+            self.paper.enabled.add(user_id)
+            self.paper_chats[user_id] = update.effective_chat.id
+            account = self.paper.account(user_id)
+            await update.message.reply_text(
+                f"📝 Paper trading on. Orders, /orders and /portfolio now use a simulated "
+                f"account with ${account.cash:,.2f} cash."
+            )
+        elif action == "off":
+            self.paper.enabled.discard(user_id)
+            await update.message.reply_text("🏦 Paper trading off. Orders go to your Schwab account.")
+        elif action == "reset":
+            self.paper.reset(user_id)
+            await update.message.reply_text(
+                f"🔄 Paper account reset to ${self.paper.starting_cash:,.2f}; open orders cancelled."
+            )
+        else:
+            state = "on" if user_id in self.paper.enabled else "off"
+            await update.message.reply_text(f"📝 Paper trading is {state}.\nUsage: /paper on|off|reset")
+    
+    async def cancel_order(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+        
+        if not context.args:
+            await update.message.reply_text("Usage: /cancel ORDER_ID\nSee /orders for open orders")
+            return
+        try:
+            order_id = int(context.args[0].lstrip('#'))
+        except ValueError:
+            await update.message.reply_text("❌ Invalid order ID")
+            return
+        
+        if update.effective_user.id not in self.paper.enabled:
+            await update.message.reply_text("❌ Cancelling live orders is not supported yet")
+        elif self.paper.cancel(update.effective_user.id, order_id):
+            await update.message.reply_text(f"✅ Order #{order_id} cancelled")
+        else:
+            await update.message.reply_text(f"❌ No open order #{order_id}")
+    
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
@@ -124,10 +292,37 @@ Estimated {'Cost' if action == 'BUY' else 'Proceeds'}: ${estimated_cost:.2f}
         if data.startswith("order_confirm_"):
             parts = data.split("_")
             symbol, shares, action = parts[2], parts[3], parts[4]
+            order_type = parts[5] if len(parts) > 6 else MARKET
+            price = float(parts[6]) if len(parts) > 6 else None
+            if query.from_user.id in self.paper.enabled:
+                await self._execute_paper_order(query, symbol, int(shares), action, order_type, price)
+                return
+            if order_type != MARKET:
+                # Paper trading was turned off after the confirmation was shown
+                await query.edit_message_text(f"{NOT_PAPER}; the order was not placed")
+                return
+            await self._watch_order_activity(query)
             await self._execute_order(query, symbol, int(shares), action)
         elif data == "order_cancel":
             await query.edit_message_text("❌ Order cancelled")
+        elif data.startswith("order_account_"):
+            accounts = await self.schwab.get_accounts() or []
+            index = int(data.split("_")[2])
+            if index < len(accounts):
+                self.selected_accounts[query.from_user.id] = accounts[index]['accountNumber']
+                await query.edit_message_text(
+                    f"✅ Orders will go to {account_label(accounts[index]['accountNumber'])}"
+                )
     
+    async def _watch_order_activity(self, query):
+        """Send fill/cancel/reject events for the whole trading account to this chat"""
+        try:
+            account = await self._target_account(query.from_user.id)
+            if account:
+                self.schwab.activity.watch_account(account['accountNumber'], query.message.chat_id)
+        except Exception as e:
+            logger.error("Error subscribing chat to order activity: %s", e)
+
     async def _execute_order(self, query, symbol, shares, action):
         # In production, implement actual order execution
         message = f"""
@@ -139,5 +334,61 @@ Shares: {shares}
 
 ⚠️ *Demo Mode*: This is a simulation. 
 In production, this would place a real order through Schwab API.
+
+🔔 This chat now gets fills, cancels and rejects for the whole account.
         """
-        await query.edit_message_text(message, parse_mode='Markdown')
\ No newline at end of file
+        await query.edit_message_text(message, parse_mode='Markdown')
+
+    async def _execute_paper_order(self, query, symbol, shares, action, order_type, price):
+        user_id = query.from_user.id
+        self.paper_chats[user_id] = query.message.chat_id
+        try:
+            quotes = await self.schwab.get_quotes([symbol])
+            data = quotes.get(symbol, {})
+            order = self.paper.submit(user_id, symbol, action, shares, order_type, price,
+                                      quote=data.get('quote', data), now=time.time())
+        except Exception as e:
+            logger.error("Error placing paper order: %s", e)
+            await query.edit_message_text(f"❌ Error: {str(e)}")
+            return
+        
+        if order.status == OPEN:
+            status = f"⏳ Resting {order.type.lower()} order #{order.id} at ${order.price:.2f}"
+        elif order.status == FILLED:
+            status = f"✅ Filled #{order.id} @ ${order.fill_price:.2f}"
+        else:
+            status = f"❌ Order #{order.id} {self._describe_paper(order)}"
+        account = self.paper.account(user_id)
+        await query.edit_message_text(
+            f"📝 *Paper Order*\n\n{order.side} {order.quantity:g} {symbol}\n{status}\n\n"
+            f"Cash: ${account.cash:,.2f}",
+            parse_mode='Markdown'
+        )
+    
+    async def start_paper(self, bot):
+        """Start matching resting paper orders against the quote feed"""
+        self.bot = bot
+        if self.paper_job is None:
+            self.paper_job = get_scheduler().every(
+                "paper-matching", PAPER_TICK_INTERVAL, self._match_paper_orders,
+                gate=self.schwab.calendar.gate(self.paper.resting_symbols)
+            )
+    
+    async def _match_paper_orders(self):
+        """One tick: a batched quote fetch for symbols with resting orders, then notify fills"""
+        symbols = [symbol for symbol in self.paper.resting_symbols() if self.schwab.calendar.symbol_active(symbol)]
+        if not symbols:
+            return
+        quotes = await self.schwab.get_quotes(symbols)
+        for order in self.paper.on_quotes(quotes, now=time.time()):
+            chat_id = self.paper_chats.get(order.user_id)
+            if chat_id is None or self.bot is None or order.status == CANCELLED:
+                continue
+            if order.status == FILLED:
+                text = f"📝 Paper #{order.id} filled: {order.side} {order.quantity:g} {order.symbol} @ ${order.fill_price:.2f}"
+            else:
+                text = f"📝 Paper #{order.id} {order.side} {order.quantity:g} {order.symbol}: {self._describe_paper(order)}"
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+            except Exception as e:
+                logger.error("Error sending paper fill to %s: %s", chat_id, e)
@@ -1,103 +1,126 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import logging
+from bot.portfolio import aggregate_accounts
 
 logger = logging.getLogger(__name__)
 
 class PortfolioHandler:
-    def __init__(self, schwab_manager, auth_manager):
+    def __init__(self, schwab_manager, auth_manager, paper):
         self.schwab = schwab_manager
         self.auth = auth_manager
-    
+        self.paper = paper  # PaperBroker, shared with OrderHandler
+
+    async def _account_results(self, user_id, fields: str = None):
+        """[(account, details)]: the paper account in paper mode, else every linked account"""
+        if user_id in self.paper.enabled:
+            symbols = list(self.paper.account(user_id).positions)
+            quotes = await self.schwab.get_cached_quotes(symbols) if symbols else {}
+            return [self.paper.account_details(user_id, quotes)]
+        # All linked accounts are fetched concurrently, so this costs about one round-trip
+        return await self.schwab.get_all_account_details(fields=fields)
+
     async def get_portfolio(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
             return
-        
+
         try:
-            accounts = self.schwab.get_accounts()
-            if accounts and len(accounts) > 0:
-                account_hash = accounts[0]['hashValue']
-                account_info = self.schwab.get_account_details(account_hash)
-                
-                if account_info:
-                    balances = account_info.get('currentBalances', {})
-                    total_value = balances.get('liquidationValue', 0)
-                    cash = balances.get('cashBalance', 0)
-                    buying_power = balances.get('buyingPower', 0)
-                    
-                    message = f"""
+            user_id = update.effective_user.id
+            results = await self._account_results(user_id)
+            if not results:
+                await update.message.reply_text("❌ No linked accounts found")
+                return
+
+            portfolio = aggregate_accounts(results)
+            if not portfolio['accounts']:
+                await update.message.reply_text("❌ Could not retrieve account details")
+                return
+
+            balances = portfolio['balances']
+            message = f"""
 💼 *Portfolio Summary*
 
-💰 Total Value: ${total_value:,.2f}
-💵 Cash: ${cash:,.2f}
-🔋 Buying Power: ${buying_power:,.2f}
-                    """
-                    
-                    keyboard = [
-                        [
-                            InlineKeyboardButton("📊 Positions", callback_data="portfolio_positions"),
-                            InlineKeyboardButton("📈 Performance", callback_data="portfolio_performance")
-                        ]
-                    ]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
-                    
-                    await update.message.reply_text(
-                        message, 
-                        parse_mode='Markdown',
-                        reply_markup=reply_markup
-                    )
-                else:
-                    await update.message.reply_text("❌ Could not retrieve account details")
-            else:
-                await update.message.reply_text("❌ No linked accounts found")
+💰 Total Value: ${balances['liquidationValue']:,.2f}
+💵 Cash: ${balances['cashBalance']:,.2f}
+🔋 Buying Power: ${balances['buyingPower']:,.2f}
+            """
+
+            if user_id in self.paper.enabled:
+                account = self.paper.account(user_id)
+                pnl = balances['liquidationValue'] - account.starting_cash
+                message += f"\n📝 *Paper account* · P&L ${pnl:+,.2f} (realized ${account.realized:+,.2f})\n"
+
+            if len(portfolio['accounts']) > 1:
+                message += "\n🏦 *Accounts:*\n"
+                for account in portfolio['accounts']:
+                    message += f"• {account['label']} {account['type']}: ${account['value']:,.2f}\n"
+
+            keyboard = [
+                [
+                    InlineKeyboardButton("📊 Positions", callback_data="portfolio_positions"),
+                    InlineKeyboardButton("🏦 By Account", callback_data="portfolio_breakdown")
+                ]
+            ]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+
+            await update.message.reply_text(
+                message,
+                parse_mode='Markdown',
+                reply_markup=reply_markup
+            )
         except Exception as e:
-            logger.error(f"Error getting portfolio: {e}")
+            logger.error("Error getting portfolio: %s", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
-    
+
     async def get_positions(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.auth.is_authorized(update.effective_user.id):
             return
-        
+
+        breakdown = bool(context.args) and context.args[0].lower() in ("breakdown", "accounts", "all")
+        await self._send_positions(update.message, update.effective_user.id, breakdown)
+
+    async def _send_positions(self, message_target, user_id, breakdown: bool = False):
+        """Reply with positions netted by symbol, optionally split out per account"""
         try:
-            accounts = self.schwab.get_accounts()
-            if accounts and len(accounts) > 0:
-                account_hash = accounts[0]['hashValue']
-                positions_data = self.schwab.get_account_details(account_hash, fields="positions")
-                
-                if positions_data and 'positions' in positions_data:
-                    positions = positions_data['positions']
-                    
-                    if positions:
-                        message = "📊 *Current Positions*\n\n"
-                        for pos in positions[:10]:
-                            instrument = pos.get('instrument', {})
-                            symbol = instrument.get('symbol', 'N/A')
-                            quantity = pos.get('longQuantity', 0) - pos.get('shortQuantity', 0)
-                            market_value = pos.get('marketValue', 0)
-                            
-                            if quantity != 0:
-                                message += f"• *{symbol}*: {quantity} shares (${market_value:,.2f})\n"
-                        
-                        await update.message.reply_text(message, parse_mode='Markdown')
-                    else:
-                        await update.message.reply_text("📊 No positions found")
-                else:
-                    await update.message.reply_text("❌ Could not retrieve positions")
-            else:
-                await update.message.reply_text("❌ No linked accounts found")
+            results = await self._account_results(user_id, fields="positions")
+            if not results:
+                await message_target.reply_text("❌ No linked accounts found")
+                return
+
+            positions = aggregate_accounts(results)['positions']
+            held = sorted(
+                ((symbol, pos) for symbol, pos in positions.items() if pos['quantity'] != 0),
+                key=lambda item: abs(item[1]['market_value']),
+                reverse=True
+            )
+            if not held:
+                await message_target.reply_text("📊 No positions found")
+                return
+
+            message = "📊 *Current Positions*\n\n"
+            for symbol, pos in held[:20]:
+                message += f"• *{symbol}*: {pos['quantity']:g} shares (${pos['market_value']:,.2f})\n"
+                if breakdown and len(pos['accounts']) > 1:
+                    for label, quantity in pos['accounts'].items():
+                        message += f"    {label}: {quantity:g}\n"
+            if len(held) > 20:
+                message += f"\n…and {len(held) - 20} more"
+
+            await message_target.reply_text(message, parse_mode='Markdown')
         except Exception as e:
-            logger.error(f"Error getting positions: {e}")
-            await update.message.reply_text(f"❌ Error: {str(e)}")
-    
+            logger.error("Error getting positions: %s", e)
+            await message_target.reply_text(f"❌ Error: {str(e)}")
+
     async def get_balance(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Similar implementation to get_portfolio but focused on balances
         await self.get_portfolio(update, context)
-    
+
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
-        
+
         data = query.data
         if data == "portfolio_positions":
-            # Convert callback to positions call
-            await self.get_positions(query, context)
\ No newline at end of file
+            await self._send_positions(query.message, query.from_user.id)
+        elif data == "portfolio_breakdown":
+            await self._send_positions(query.message, query.from_user.id, breakdown=True)
@@ -0,0 +1,89 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import logging
+from bot.auth import QUOTA_CLASSES
+
+logger = logging.getLogger(__name__)
+
+USAGE = (
+    "Usage: /quota — your quotas and usage\n"
+    "Admins:\n"
+    "/quota USER_ID — someone else's\n"
+    "/quota USER_ID role admin|user|limited\n"
+    "/quota USER_ID CLASS PER_MINUTE [BURST]\n"
+    "/quota USER_ID reset\n"
+    "/quota top — heaviest users"
+)
+
+
+class QuotaHandler:
+    def __init__(self, schwab_manager, auth_manager):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+
+    async def quota(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user_id = update.effective_user.id
+        if not self.auth.is_authorized(user_id):
+            return
+
+        args = context.args
+        if not args:
+            await self._show(update, user_id)
+            return
+        if not self.auth.is_admin(user_id):
+            await update.message.reply_text("❌ Only admins can view or change other users' quotas")
+            return
+
+        if args[0].lower() == 'top':
+            await self._show_top(update)
+            return
+        try:
+            target = int(args[0])
+            action = args[1].lower() if len(args) > 1 else None
+            if action in QUOTA_CLASSES and len(args) in (3, 4):
+                rate = float(args[2]) / 60
+                burst = float(args[3]) if len(args) == 4 else None
+        except ValueError:
+            await update.message.reply_text(USAGE)
+            return
+
+        try:
+            if action is None:
+                await self._show(update, target)
+            elif action == 'reset':
+                self.auth.reset_user(target)
+                await update.message.reply_text(f"✅ {target} is back to the default quotas")
+            elif action == 'role' and len(args) == 3:
+                self.auth.set_role(target, args[2].lower())
+                await update.message.reply_text(f"✅ {target} is now {args[2].lower()}")
+            elif action in QUOTA_CLASSES and len(args) in (3, 4):
+                self.auth.set_quota(target, action, rate, burst)
+                await update.message.reply_text(f"✅ {target}: {action} set to {args[2]}/min")
+            else:
+                await update.message.reply_text(USAGE)
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+        except Exception as e:
+            logger.error("Error handling /quota: %s", e)
+            await update.message.reply_text(f"❌ Error: {str(e)}")
+
+    async def _show(self, update, user_id):
+        usage = await self.schwab.get_api_usage()
+        calls, queued = usage.get(user_id, (0, 0))
+        text = (
+            f"🎟 *Quotas for {user_id}* ({self.auth.role(user_id)})\n"
+            f"```\n" + "\n".join(self.auth.quota_lines(user_id)) + "\n```\n"
+            f"Schwab API calls: {calls} ({queued} waited for the shared budget)"
+        )
+        await update.message.reply_text(text, parse_mode='Markdown')
+
+    async def _show_top(self, update):
+        usage = await self.schwab.get_api_usage()
+        heaviest = sorted(usage.items(), key=lambda item: -item[1][0])[:10]
+        api = "\n".join(f"{'background' if flow is None else flow:<12} calls {calls:>6}  waited {queued:>5}"
+                        for flow, (calls, queued) in heaviest) or "No API calls yet"
+        await update.message.reply_text(
+            f"🎟 *Requests by user*\n```\n{self.auth.usage_summary()}\n```\n"
+            f"📡 *Schwab API calls*\n```\n{api}\n```",
+            parse_mode='Markdown'
+        )
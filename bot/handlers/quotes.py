@@ -1,6 +1,7 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import logging
+from bot.logs import HOT_PATH
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +13,11 @@ class QuoteHandler:
     async def get_quote(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle quote requests with better error handling and debugging"""
         user_id = update.effective_user.id
-        logger.info(f"Quote request from user {user_id}")
+        logger.info("Quote request from user %s", user_id, extra=HOT_PATH)
         
         # Check authorization first
         if not self.auth.is_authorized(user_id):
-            logger.warning(f"Unauthorized quote request from user {user_id}")
+            logger.warning("Unauthorized quote request from user %s", user_id)
             await update.message.reply_text("🔒 You are not authorized to use this bot.")
             return
         
@@ -32,7 +33,12 @@ class QuoteHandler:
             return
         
         symbol = context.args[0].upper().strip()
-        logger.info(f"Getting quote for symbol: {symbol}")
+        logger.info("Getting quote for symbol: %s", symbol, extra=HOT_PATH)
+        
+        # Reject unknown symbols from the local symbol master before any API call
+        if not self.schwab.symbols.is_valid(symbol):
+            await update.message.reply_text(self.schwab.symbols.rejection(symbol))
+            return
         
         # Send "typing" action to show the bot is working
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
@@ -44,9 +50,9 @@ class QuoteHandler:
                 await update.message.reply_text("❌ Trading service not available. Please try again later.")
                 return
             
-            # Get the quote
-            quote_data = self.schwab.get_quote(symbol)
-            logger.info(f"Quote data received: {quote_data is not None}")
+            # Served from the shared quote table when it was quoted in the last few seconds
+            quote_data = await self.schwab.get_cached_quotes([symbol])
+            logger.info("Quote data received: %s", quote_data is not None, extra=HOT_PATH)
             
             if quote_data and symbol in quote_data:
                 await self._format_and_send_quote(update, symbol, quote_data[symbol])
@@ -61,18 +67,18 @@ class QuoteHandler:
                 )
                 
         except AttributeError as e:
-            logger.error(f"AttributeError getting quote for {symbol}: {e}")
+            logger.error("AttributeError getting quote for %s: %s", symbol, e)
             await update.message.reply_text(
                 f"❌ Service configuration error. Please contact support.\n"
                 f"Error: {str(e)}"
             )
         except ConnectionError as e:
-            logger.error(f"ConnectionError getting quote for {symbol}: {e}")
+            logger.error("ConnectionError getting quote for %s: %s", symbol, e)
             await update.message.reply_text(
                 "❌ Connection error. Please check your internet connection and try again."
             )
         except Exception as e:
-            logger.error(f"Unexpected error getting quote for {symbol}: {e}")
+            logger.error("Unexpected error getting quote for %s: %s", symbol, e)
             await update.message.reply_text(
                 f"❌ Unexpected error getting quote for *{symbol}*\n"
                 f"Error: {str(e)}\n\n"
@@ -148,7 +154,7 @@ class QuoteHandler:
             )
             
         except Exception as e:
-            logger.error(f"Error formatting quote for {symbol}: {e}")
+            logger.error("Error formatting quote for %s: %s", symbol, e)
             # Fallback to simple message
             await update.message.reply_text(
                 f"📊 *{symbol}*\n"
@@ -163,7 +169,7 @@ class QuoteHandler:
         await query.answer()
         
         data = query.data
-        logger.info(f"Quote callback received: {data}")
+        logger.info("Quote callback received: %s", data, extra=HOT_PATH)
         
         if data.startswith("quote_refresh_"):
             symbol = data.split("_")[2]
@@ -175,7 +181,7 @@ class QuoteHandler:
             # Send "typing" action
             await query.bot.send_chat_action(chat_id=query.message.chat_id, action="typing")
             
-            quote_data = self.schwab.get_quote(symbol)
+            quote_data = await self.schwab.get_quotes([symbol])
             
             if quote_data and symbol in quote_data:
                 # Update the existing message
@@ -184,7 +190,7 @@ class QuoteHandler:
                 await query.edit_message_text(f"❌ Could not refresh quote for {symbol}")
                 
         except Exception as e:
-            logger.error(f"Error refreshing quote for {symbol}: {e}")
+            logger.error("Error refreshing quote for %s: %s", symbol, e)
             await query.edit_message_text(f"❌ Error refreshing quote: {str(e)}")
     
     async def _update_quote_message(self, query, symbol, data):
@@ -248,5 +254,5 @@ class QuoteHandler:
             )
             
         except Exception as e:
-            logger.error(f"Error updating quote message for {symbol}: {e}")
+            logger.error("Error updating quote message for %s: %s", symbol, e)
             await query.edit_message_text(f"❌ Error updating quote: {str(e)}")
\ No newline at end of file
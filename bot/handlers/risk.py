@@ -0,0 +1,134 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import asyncio
+import datetime
+import logging
+import os
+from bot.cache import TTLCache
+from bot.compute import run_in_pool
+from bot.portfolio import aggregate_accounts
+from bot.risk import analyze_risk
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOOKBACK = 252
+BENCHMARK = os.getenv("RISK_BENCHMARK", "$SPX")
+# Concurrent price-history requests when a portfolio's bars are first cached
+HISTORY_CONCURRENCY = 8
+
+
+class RiskHandler:
+    def __init__(self, schwab_manager, auth_manager):
+        self.schwab = schwab_manager
+        self.auth = auth_manager
+        # Keyed by positions, lookback and last completed bar, so any change recomputes
+        self.reports = TTLCache(ttl=24 * 3600, maxsize=50)
+
+    async def get_risk(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.auth.is_authorized(update.effective_user.id):
+            return
+
+        try:
+            lookback = int(context.args[0]) if context.args else DEFAULT_LOOKBACK
+        except ValueError:
+            await update.message.reply_text("Usage: /risk [LOOKBACK_DAYS]\nExample: /risk 126")
+            return
+        lookback = max(30, min(lookback, 1260))
+
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+
+        try:
+            results = await self.schwab.get_all_account_details(fields="positions")
+            positions = aggregate_accounts(results or [])['positions']
+            held = sorted((symbol, pos['market_value'], pos['quantity']) for symbol, pos in positions.items()
+                          if pos['quantity'] != 0 and pos['market_value'])
+            if not held:
+                await update.message.reply_text("📊 No positions to analyze")
+                return
+
+            # Completed daily bars only, so the cache key changes once per session
+            end = datetime.datetime.combine(datetime.date.today(), datetime.time(), tzinfo=datetime.timezone.utc)
+            start = end - datetime.timedelta(days=lookback * 7 // 5 + 10)
+            histories = await self._histories([symbol for symbol, _, _ in held] + [BENCHMARK], start, end)
+            benchmark = histories.pop(BENCHMARK, None)
+            if benchmark is None:
+                await update.message.reply_text(f"❌ No price history for benchmark {BENCHMARK}")
+                return
+
+            usable = [(symbol, value, quantity) for symbol, value, quantity in held if symbol in histories]
+            skipped = [symbol for symbol, _, _ in held if symbol not in histories]
+            if not usable:
+                await update.message.reply_text("❌ No price history for any position")
+                return
+
+            last_bar = int(benchmark[0][-1])
+            # Quantities rather than market values, so intraday price moves reuse the report
+            key = (tuple((symbol, quantity) for symbol, _, quantity in usable), lookback, last_bar)
+            report = self.reports.get(key)
+            if report is None:
+                report = await run_in_pool(
+                    analyze_risk,
+                    [symbol for symbol, _, _ in usable],
+                    [value for _, value, _ in usable],
+                    [histories[symbol] for symbol, _, _ in usable],
+                    benchmark,
+                    lookback,
+                )
+                self.reports.set(key, report)
+
+            if 'error' in report:
+                await update.message.reply_text(f"❌ {report['error']}")
+                return
+            await update.message.reply_text(self._format_report(report, skipped), parse_mode='Markdown')
+
+        except Exception as e:
+            logger.error("Error computing risk report: %s", e)
+            await update.message.reply_text(f"❌ Error: {str(e)}")
+
+    async def _histories(self, symbols, start, end):
+        """{symbol: (timestamps, closes)} of daily bars between start and end"""
+        semaphore = asyncio.Semaphore(HISTORY_CONCURRENCY)
+
+        async def load(symbol):
+            async with semaphore:
+                return await self.schwab.get_price_history(symbol, start, end, frequency="daily")
+
+        bars = await asyncio.gather(*[load(symbol) for symbol in symbols], return_exceptions=True)
+        histories = {}
+        for symbol, result in zip(symbols, bars):
+            if isinstance(result, Exception):
+                logger.error("Error loading history for %s: %s", symbol, result)
+                continue
+            if result is not None and len(result) >= 2:
+                # Plain copies: memory-mapped slices would be re-read in the worker otherwise
+                histories[symbol] = (result['datetime'].copy(), result['close'].copy())
+        return histories
+
+    def _format_report(self, report, skipped):
+        pct = report['confidence'] * 100
+        message = f"""
+⚠️ *Portfolio Risk* ({report['days']} days, 1-day horizon)
+
+💼 Gross ${report['gross']:,.0f} · Net ${report['net']:,.0f}
+📉 Historical VaR {pct:.0f}%: ${report['hist_var']:,.0f} · CVaR ${report['hist_cvar']:,.0f}
+📐 Parametric VaR {pct:.0f}%: ${report['param_var']:,.0f} · CVaR ${report['param_cvar']:,.0f}
+🌊 Daily volatility: ${report['volatility']:,.0f}
+β vs {BENCHMARK}: {report['beta']:.2f}
+🎯 Concentration: HHI {report['hhi']:.3f} (≈{report['effective_positions']:.1f} equal positions)
+
+*Largest positions:*
+"""
+        for symbol, weight, beta in report['largest']:
+            message += f"• {symbol}: {weight * 100:+.1f}% (β {beta:.2f})\n"
+
+        symbols = report['corr_symbols']
+        if len(symbols) > 1:
+            header = "      " + " ".join(f"{s[:5]:>5}" for s in symbols)
+            rows = [f"{s[:5]:<5} " + " ".join(f"{v:5.2f}" for v in row)
+                    for s, row in zip(symbols, report['corr_matrix'])]
+            message += "\n*Correlation:*\n```\n" + "\n".join([header] + rows) + "\n```\n"
+        if report['top_pairs']:
+            message += "*Most correlated:* " + ", ".join(f"{a}/{b} {c:.2f}" for a, b, c in report['top_pairs']) + "\n"
+        if skipped:
+            message += f"\n_No daily history for: {', '.join(skipped[:10])}_"
+        return message
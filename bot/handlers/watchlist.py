@@ -24,11 +24,12 @@ class WatchlistHandler:
         try:
             message = "👀 *Your Watchlist*\n\n"
             
-            # Get quotes for all watchlist symbols
-            for symbol in self.watchlists[user_id][:10]:  # Limit to 10 for performance
+            # One consistent read of the quote table; only stale symbols go to the API
+            symbols = self.watchlists[user_id][:50]  # Keeps the reply within Telegram's size limit
+            quote_data = await self.schwab.get_cached_quotes(symbols)
+            for symbol in symbols:
                 try:
-                    quote_data = self.schwab.get_quote(symbol)
-                    if quote_data and symbol in quote_data:
+                    if symbol in quote_data:
                         quote = quote_data[symbol]['quote']
                         price = quote.get('lastPrice', 0)
                         change = quote.get('netChange', 0)
@@ -39,7 +40,7 @@ class WatchlistHandler:
                     else:
                         message += f"❓ *{symbol}*: Quote unavailable\n"
                 except Exception as e:
-                    logger.error(f"Error getting quote for {symbol}: {e}")
+                    logger.error("Error getting quote for %s: %s", symbol, e)
                     message += f"❓ *{symbol}*: Error getting quote\n"
             
             keyboard = [
@@ -57,7 +58,7 @@ class WatchlistHandler:
             )
             
         except Exception as e:
-            logger.error(f"Error showing watchlist: {e}")
+            logger.error("Error showing watchlist: %s", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
     
     async def add_to_watchlist(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -72,11 +73,17 @@ class WatchlistHandler:
         user_id = update.effective_user.id
         
         try:
-            # Verify symbol exists by getting quote
-            quote_data = self.schwab.get_quote(symbol)
-            if not quote_data or symbol not in quote_data:
-                await update.message.reply_text(f"❌ Could not find symbol {symbol}")
-                return
+            # Verify the symbol against the local symbol master; only fall back to a
+            # quote round-trip when the master has not been loaded
+            if self.schwab.symbols.loaded:
+                if not self.schwab.symbols.is_valid(symbol):
+                    await update.message.reply_text(self.schwab.symbols.rejection(symbol))
+                    return
+            else:
+                quote_data = await self.schwab.get_quote(symbol)
+                if not quote_data or symbol not in quote_data:
+                    await update.message.reply_text(f"❌ Could not find symbol {symbol}")
+                    return
             
             # Add to watchlist
             if user_id not in self.watchlists:
@@ -89,7 +96,7 @@ class WatchlistHandler:
                 await update.message.reply_text(f"ℹ️ {symbol} is already in your watchlist")
                 
         except Exception as e:
-            logger.error(f"Error adding to watchlist: {e}")
+            logger.error("Error adding to watchlist: %s", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
     
     async def remove_from_watchlist(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -111,7 +118,7 @@ class WatchlistHandler:
                 await update.message.reply_text(f"ℹ️ {symbol} is not in your watchlist")
                 
         except Exception as e:
-            logger.error(f"Error removing from watchlist: {e}")
+            logger.error("Error removing from watchlist: %s", e)
             await update.message.reply_text(f"❌ Error: {str(e)}")
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
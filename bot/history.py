@@ -0,0 +1,219 @@
+import asyncio
+import collections
+import datetime
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# One record per bar; datetime is epoch milliseconds as returned by Schwab
+BAR_DTYPE = np.dtype([
+    ('datetime', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+DAY_MS = 86_400_000
+
+# name: (periodType, frequencyType, frequency, days per API request, bar length in ms)
+FREQUENCIES = {
+    'minute': ('day', 'minute', 1, 10, 60_000),
+    '5min': ('day', 'minute', 5, 10, 300_000),
+    '15min': ('day', 'minute', 15, 10, 900_000),
+    '30min': ('day', 'minute', 30, 10, 1_800_000),
+    'daily': ('year', 'daily', 1, 365 * 20, DAY_MS),
+    'weekly': ('year', 'weekly', 1, 365 * 20, 7 * DAY_MS),
+}
+# How stale the newest cached bar may be before a read ending now refetches it
+TAIL_TTL_MS = int(float(os.getenv("HISTORY_TAIL_TTL", "300")) * 1000)
+MAX_OPEN_MAPS = int(os.getenv("HISTORY_OPEN_MAPS", "64"))
+
+
+def to_epoch_ms(value) -> int:
+    """Accept a datetime, date or epoch milliseconds and return epoch milliseconds"""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return int(value.timestamp() * 1000)
+    if isinstance(value, datetime.date):
+        return to_epoch_ms(datetime.datetime(value.year, value.month, value.day))
+    return int(value)
+
+
+def candles_to_bars(candles) -> np.ndarray:
+    return np.array(
+        [(c['datetime'], c['open'], c['high'], c['low'], c['close'], c['volume']) for c in candles],
+        dtype=BAR_DTYPE
+    )
+
+
+class PriceHistoryCache:
+    """
+    Local bar store: one file of BAR_DTYPE records per symbol and frequency.
+
+    Reads are memory-mapped and windows are returned as views into the map. Only the
+    ranges not yet covered are requested from the API, and concurrent requests for the
+    same symbol/frequency wait on a single fetch. The newest bar is refetched only once
+    it is older than its bar length or TAIL_TTL_MS, so reads ending now are usually
+    served from the file alone.
+    """
+
+    def __init__(self, fetch, cache_dir: str, max_maps: int = MAX_OPEN_MAPS):
+        self.fetch = fetch  # async (symbol, frequency, start_ms, end_ms) -> [candles], None on failure
+        self.cache_dir = cache_dir
+        self.max_maps = max_maps
+        self._maps = collections.OrderedDict()  # {(symbol, frequency): np.memmap}, least recently used first
+        self._locks = {}  # {(symbol, frequency): [asyncio.Lock, requests using it]}
+
+    def _paths(self, symbol, frequency):
+        base = os.path.join(self.cache_dir, frequency, symbol.replace('/', '_'))
+        return base + '.bars', base + '.json'
+
+    def _coverage(self, symbol, frequency):
+        _, meta_path = self._paths(symbol, frequency)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            return meta['start'], meta['end']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _bars(self, symbol, frequency):
+        """Memory-mapped view of everything cached for the key (empty array if nothing)"""
+        key = (symbol, frequency)
+        if key not in self._maps:
+            bars_path, _ = self._paths(symbol, frequency)
+            if not os.path.exists(bars_path) or os.path.getsize(bars_path) < BAR_DTYPE.itemsize:
+                return np.empty(0, dtype=BAR_DTYPE)
+            self._maps[key] = np.memmap(bars_path, dtype=BAR_DTYPE, mode='r')
+            # Views handed out keep their own map open; this only drops the cache's reference
+            while len(self._maps) > self.max_maps:
+                self._maps.popitem(last=False)
+        self._maps.move_to_end(key)
+        return self._maps[key]
+
+    def read(self, symbol, frequency, start_ms, end_ms) -> np.ndarray:
+        """Zero-copy window of cached bars with start_ms <= datetime <= end_ms"""
+        bars = self._bars(symbol, frequency)
+        times = bars['datetime']
+        lo = np.searchsorted(times, start_ms, side='left')
+        hi = np.searchsorted(times, end_ms, side='right')
+        return bars[lo:hi]
+
+    def _write(self, symbol, frequency, new_bars, coverage):
+        """
+        Merge fetched bars into the file. Newer bars are appended and refetched bars are
+        updated in place, so views handed out earlier stay valid; only a prepend rewrites
+        the file (into a new inode via os.replace).
+        """
+        bars_path, meta_path = self._paths(symbol, frequency)
+        os.makedirs(os.path.dirname(bars_path), exist_ok=True)
+        self._maps.pop((symbol, frequency), None)
+        existing = self._bars(symbol, frequency)
+
+        if len(new_bars):
+            new_bars = np.sort(new_bars, order='datetime')
+            if len(existing) and new_bars['datetime'][0] < existing['datetime'][0]:
+                merged = np.concatenate([new_bars, existing])
+                merged = merged[np.argsort(merged['datetime'], kind='stable')]
+                merged = merged[np.r_[True, np.diff(merged['datetime']) != 0]]
+                tmp_path = bars_path + '.tmp'
+                merged.tofile(tmp_path)
+                os.replace(tmp_path, bars_path)
+            else:
+                last = existing['datetime'][-1] if len(existing) else np.iinfo('<i8').min
+                overlap = new_bars[new_bars['datetime'] <= last]
+                if len(overlap):
+                    idx = np.searchsorted(existing['datetime'], overlap['datetime'])
+                    found = existing['datetime'][idx] == overlap['datetime']
+                    writable = np.memmap(bars_path, dtype=BAR_DTYPE, mode='r+')
+                    writable[idx[found]] = overlap[found]
+                    writable.flush()
+                    del writable
+                with open(bars_path, 'ab') as f:
+                    f.write(new_bars[new_bars['datetime'] > last].tobytes())
+            self._maps.pop((symbol, frequency), None)
+
+        if coverage is None:
+            return
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'start': coverage[0], 'end': coverage[1]}, f)
+        os.replace(tmp_path, meta_path)
+
+    async def _fetch_range(self, symbol, frequency, start_ms, end_ms):
+        """(bars, complete): complete is False if any chunk of the range failed to fetch"""
+        chunk_ms = FREQUENCIES[frequency][3] * DAY_MS
+        parts = []
+        complete = True
+        chunk_start = start_ms
+        while chunk_start <= end_ms:
+            chunk_end = min(chunk_start + chunk_ms, end_ms)
+            candles = await self.fetch(symbol, frequency, chunk_start, chunk_end)
+            if candles is None:
+                complete = False
+            elif candles:
+                parts.append(candles_to_bars(candles))
+            chunk_start = chunk_end + 1
+        if not parts:
+            return np.empty(0, dtype=BAR_DTYPE), complete
+        bars = np.concatenate(parts)
+        return bars[(bars['datetime'] >= start_ms) & (bars['datetime'] <= end_ms)], complete
+
+    async def get(self, symbol: str, frequency: str, start, end=None) -> np.ndarray:
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unsupported frequency: {frequency}")
+        symbol = symbol.upper()
+        now_ms = to_epoch_ms(datetime.datetime.now(datetime.timezone.utc))
+        start_ms = to_epoch_ms(start)
+        end_ms = min(to_epoch_ms(end) if end is not None else now_ms, now_ms)
+
+        key = (symbol, frequency)
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._fill(symbol, frequency, start_ms, end_ms)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+        return self.read(symbol, frequency, start_ms, end_ms)
+
+    async def _fill(self, symbol, frequency, start_ms, end_ms):
+        """Fetch whatever part of the range the file does not cover yet"""
+        bar_ms = FREQUENCIES[frequency][4]
+        coverage = self._coverage(symbol, frequency)
+        missing = []
+        if coverage is None:
+            missing.append((start_ms, end_ms))
+        else:
+            if start_ms < coverage[0]:
+                missing.append((start_ms, coverage[0]))
+            if end_ms > coverage[1] + min(bar_ms, TAIL_TTL_MS):
+                # Step back one bar so a bar that was still forming gets refreshed
+                missing.append((coverage[1] - bar_ms, end_ms))
+        if not missing:
+            return
+
+        fetched = []
+        for lo, hi in missing:
+            bars, complete = await self._fetch_range(symbol, frequency, lo, hi)
+            fetched.append(bars)
+            # Coverage only grows over gaps that came back whole, so a failed
+            # fetch is retried next time instead of being remembered as empty
+            if not complete:
+                logger.warning("Could not fetch %s bars for %s between %s and %s", frequency, symbol, lo, hi)
+            elif coverage is None:
+                coverage = (lo, hi)
+            else:
+                coverage = (min(lo, coverage[0]), max(hi, coverage[1]))
+        new_bars = np.concatenate(fetched)
+        logger.info("Fetched %s %s bars for %s in %s gap(s)", len(new_bars), frequency, symbol, len(missing))
+        await asyncio.to_thread(self._write, symbol, frequency, new_bars, coverage)
+
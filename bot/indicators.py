@@ -0,0 +1,199 @@
+import math
+import numpy as np
+
+# Seconds between the price checks that feed the indicators
+TICK_INTERVAL = 30
+
+
+class RingBuffer:
+    """Fixed-size float buffer; append is O(1) and returns the value it pushed out (if any)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.data = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+
+    def append(self, value: float):
+        evicted = self.data[self.index] if self.count == self.size else None
+        self.data[self.index] = value
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return evicted
+
+    def __getitem__(self, age: int) -> float:
+        """Value appended `age` updates ago (0 is the latest)"""
+        return self.data[(self.index - 1 - age) % self.size]
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+
+class SMA:
+    def __init__(self, period: int):
+        self.window = RingBuffer(period)
+        self.total = 0.0
+        self.value = None
+
+    def update(self, price, volume, timestamp):
+        evicted = self.window.append(price)
+        self.total += price - (evicted or 0.0)
+        if self.window.full:
+            self.value = self.total / self.window.size
+
+
+class EMA:
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.seed = SMA(period)
+        self.value = None
+
+    def update(self, price, volume, timestamp):
+        if self.value is None:
+            # Seed with the SMA of the first `period` prices
+            self.seed.update(price, volume, timestamp)
+            self.value = self.seed.value
+        else:
+            self.value += self.alpha * (price - self.value)
+
+
+class RSI:
+    """Wilder's RSI: running average gain/loss, seeded from the first `period` changes"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.prev = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.changes = 0
+        self.value = None
+
+    def update(self, price, volume, timestamp):
+        if self.prev is None:
+            self.prev = price
+            return
+        change = price - self.prev
+        self.prev = price
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.changes += 1
+        if self.changes <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.changes < self.period:
+                return
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        if self.avg_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class PercentMove:
+    """
+    Percent change from the oldest price inside the trailing `minutes` window; None when
+    nothing but the latest price is inside it, e.g. on the first check after a gap
+    """
+
+    def __init__(self, minutes: int, interval: float = TICK_INTERVAL):
+        self.window_seconds = minutes * 60
+        # Room for every check in the window, with slack for jittered checks
+        capacity = math.ceil(self.window_seconds / interval) + 2
+        self.times = RingBuffer(capacity)
+        self.prices = RingBuffer(capacity)
+        self.start = 0  # age of the oldest sample still inside the window
+        self.value = None
+
+    def update(self, price, volume, timestamp):
+        self.times.append(timestamp)
+        self.prices.append(price)
+        # The window only moves forward, so the oldest-sample pointer is amortized O(1)
+        self.start = min(self.start + 1, self.times.count - 1)
+        while self.start > 0 and self.times[self.start] < timestamp - self.window_seconds:
+            self.start -= 1
+        reference = self.prices[self.start]
+        if self.start > 0 and reference:
+            self.value = (price - reference) / reference * 100.0
+        else:
+            self.value = None
+
+
+class VolumeSpike:
+    """Ratio of the latest per-tick volume to its rolling average over `period` ticks"""
+
+    def __init__(self, period: int):
+        self.window = RingBuffer(period)
+        self.total = 0.0
+        self.last_cumulative = None
+        self.value = None
+
+    def update(self, price, volume, timestamp):
+        # Quotes carry cumulative daily volume; a drop means a new session started
+        if self.last_cumulative is None:
+            self.last_cumulative = volume
+            return
+        delta = volume - self.last_cumulative if volume >= self.last_cumulative else volume
+        self.last_cumulative = volume
+        average = self.total / self.window.count if self.window.count else 0.0
+        if self.window.full and average > 0:
+            self.value = delta / average
+        evicted = self.window.append(delta)
+        self.total += delta - (evicted or 0.0)
+
+
+INDICATORS = {
+    'sma': SMA,
+    'ema': EMA,
+    'rsi': RSI,
+    'move': PercentMove,
+    'volume': VolumeSpike,
+}
+
+
+class IndicatorRegistry:
+    """
+    One indicator instance per (symbol, kind, period), shared by every alert that uses it.
+    Reference counted so state is dropped when the last alert on it goes away.
+    """
+
+    def __init__(self):
+        self.indicators = {}  # {(symbol, kind, period): indicator}
+        self.refcounts = {}  # {(symbol, kind, period): int}
+        self.by_symbol = {}  # {symbol: {keys}}
+
+    def acquire(self, symbol: str, kind: str, period: int):
+        key = (symbol, kind, period)
+        if key not in self.indicators:
+            self.indicators[key] = INDICATORS[kind](period)
+            self.refcounts[key] = 0
+            self.by_symbol.setdefault(symbol, set()).add(key)
+        self.refcounts[key] += 1
+        return key
+
+    def release(self, key):
+        if key not in self.refcounts:
+            return
+        self.refcounts[key] -= 1
+        if self.refcounts[key] <= 0:
+            del self.refcounts[key]
+            del self.indicators[key]
+            self.by_symbol[key[0]].discard(key)
+            if not self.by_symbol[key[0]]:
+                del self.by_symbol[key[0]]
+
+    def get(self, key):
+        indicator = self.indicators.get(key)
+        return None if indicator is None else indicator.value
+
+    def symbols(self):
+        return list(self.by_symbol)
+
+    def update(self, symbol: str, price: float, volume: float, timestamp: float):
+        """Feed one tick to every indicator on the symbol"""
+        if price is None or math.isnan(price):
+            return
+        for key in self.by_symbol.get(symbol, ()):
+            self.indicators[key].update(price, volume or 0.0, timestamp)
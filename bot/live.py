@@ -0,0 +1,148 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import logging
+import time
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from bot.digest import retry_seconds
+from bot.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about one message per second in a private chat and 20 per minute in a group
+PRIVATE_CHAT_INTERVAL = 1.0
+GROUP_CHAT_INTERVAL = 3.0
+
+
+def render_live(symbol: str, data, footer: str) -> str:
+    """Quote text for a live message; no clock in it, so unchanged prices render identically"""
+    if not data:
+        return f"❓ *{symbol}*\n\nQuote unavailable\n\n{footer}"
+    quote = data.get('quote', data)
+    price = quote.get('lastPrice', 0) or 0
+    change = quote.get('netChange', 0) or 0
+    change_pct = quote.get('netPercentChangeInDouble', 0) or 0
+    bid = quote.get('bidPrice', 0) or 0
+    ask = quote.get('askPrice', 0) or 0
+
+    if change > 0:
+        header = f"📈 *{symbol}* 🟢"
+    elif change < 0:
+        header = f"📉 *{symbol}* 🔴"
+    else:
+        header = f"➖ *{symbol}* 🔵"
+    lines = [
+        header,
+        "",
+        f"💰 *Price:* ${price:.2f}",
+        f"📊 *Change:* {change:+.2f} ({change_pct:+.2f}%)",
+        f"📊 *Volume:* {quote.get('totalVolume', 0) or 0:,}",
+    ]
+    if bid > 0 and ask > 0:
+        lines.append(f"💵 *Bid/Ask:* ${bid:.2f} / ${ask:.2f}")
+    lines += ["", footer]
+    return "\n".join(lines)
+
+
+class EditFanout:
+    """
+    Coalescing edit queue for self-updating messages. Each message has at most one edit
+    waiting: a newer render replaces the queued one in place, so a slow round never
+    piles up stale edits. Chats take turns, each edited no faster than Telegram allows
+    for it, all under a global rate; RetryAfter pauses everything.
+    """
+
+    def __init__(self, bot, rate: float = 25.0, concurrency: int = 8, on_gone=None):
+        self.bot = bot
+        self.limiter = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.on_gone = on_gone  # called with (chat_id, message_id) when a message can't be edited anymore
+        self.pending = {}  # {chat_id: OrderedDict {message_id: (text, kwargs)}}
+        self.turns = []  # heap of (time the chat may be edited, seq, chat_id), one per chat in pending
+        self.next_edit = {}  # {chat_id: earliest time of its next edit}
+        self.paused_until = 0.0
+        self.stats = collections.Counter()
+        self._seq = itertools.count()
+        self._drainer = None
+
+    def submit(self, chat_id, message_id, text: str, **kwargs):
+        queued = self.pending.get(chat_id)
+        if queued is None:
+            queued = self.pending[chat_id] = collections.OrderedDict()
+            ready = max(self.next_edit.get(chat_id, 0.0), time.monotonic())
+            heapq.heappush(self.turns, (ready, next(self._seq), chat_id))
+        if message_id in queued:
+            self.stats['coalesced'] += 1
+        queued[message_id] = (text, kwargs)  # keeps its place in line
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.get_running_loop().create_task(self._drain(), name="live-edits")
+
+    def discard(self, chat_id, message_id):
+        queued = self.pending.get(chat_id)
+        if queued is not None:
+            queued.pop(message_id, None)
+
+    @property
+    def backlog(self) -> int:
+        return sum(len(queued) for queued in self.pending.values())
+
+    async def _drain(self):
+        while self.turns:
+            ready, _, chat_id = self.turns[0]
+            wait = max(ready, self.paused_until) - time.monotonic()
+            if wait > 0:
+                # Short naps, so a chat that joins meanwhile isn't held behind this one
+                await asyncio.sleep(min(wait, 0.1))
+                continue
+            heapq.heappop(self.turns)
+            queued = self.pending[chat_id]
+            if not queued:
+                del self.pending[chat_id]
+                continue
+            message_id, (text, kwargs) = queued.popitem(last=False)
+            interval = GROUP_CHAT_INTERVAL if chat_id < 0 else PRIVATE_CHAT_INTERVAL
+            self.next_edit[chat_id] = time.monotonic() + interval
+            if queued:
+                heapq.heappush(self.turns, (self.next_edit[chat_id], next(self._seq), chat_id))
+            else:
+                del self.pending[chat_id]
+
+            await self.limiter.acquire()
+            await self.semaphore.acquire()
+            task = asyncio.get_running_loop().create_task(self._edit(chat_id, message_id, text, kwargs))
+            task.add_done_callback(lambda _: self.semaphore.release())
+        # Chats edited longer ago than any interval need no pacing record
+        now = time.monotonic()
+        self.next_edit = {chat_id: at for chat_id, at in self.next_edit.items() if at > now}
+
+    async def _edit(self, chat_id, message_id, text, kwargs):
+        try:
+            await self.bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, **kwargs)
+            self.stats['edits'] += 1
+        except RetryAfter as e:
+            delay = retry_seconds(e)
+            logger.warning("Telegram flood limit on live edits, pausing %ss", delay)
+            self.paused_until = time.monotonic() + delay
+            self.stats['retried'] += 1
+            # Try again, unless a newer render has been queued meanwhile
+            if message_id not in self.pending.get(chat_id, {}):
+                self.submit(chat_id, message_id, text, **kwargs)
+        except BadRequest as e:
+            reason = str(e).lower()
+            if 'not modified' in reason:
+                self.stats['unchanged'] += 1
+            elif 'not found' in reason or "can't be edited" in reason:
+                self.stats['gone'] += 1
+                if self.on_gone:
+                    self.on_gone(chat_id, message_id)
+            else:
+                self.stats['failed'] += 1
+                logger.error("Error editing live message %s/%s: %s", chat_id, message_id, e)
+        except Forbidden:
+            self.stats['gone'] += 1
+            if self.on_gone:
+                self.on_gone(chat_id, message_id)
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error("Error editing live message %s/%s: %s", chat_id, message_id, e)
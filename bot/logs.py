@@ -0,0 +1,135 @@
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+# What the current task is serving; set once per update and read when a record is made
+request_context = contextvars.ContextVar('request_context', default=None)
+
+# extra= for per-request chatter on hot paths: only this fraction is kept
+HOT_PATH = {'sample': float(os.getenv("LOG_HOT_SAMPLE", "0.1"))}
+
+
+def bind_request(update_id, command: str = None, user_id=None):
+    request_context.set({'request_id': update_id, 'command': command, 'user_id': user_id})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line. Runs on the listener thread, never on the event loop."""
+
+    def __init__(self, process: str = None):
+        super().__init__()
+        self.process = process
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if self.process:
+            entry['process'] = self.process
+        context = getattr(record, 'request', None)
+        if context:
+            entry.update({key: value for key, value in context.items() if value is not None})
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        dropped = getattr(record, 'dropped', 0)
+        if dropped:
+            entry['dropped'] = dropped
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-call-site rate limits, plus opt-in sampling with extra={'sample': p}. Records
+    dropped at a call site are counted on the next one that gets through. Costs a dict
+    lookup and some arithmetic on the caller's thread.
+    """
+
+    def __init__(self, info_rate: float = 20, error_rate: float = 5, burst: float = 50):
+        super().__init__()
+        self.info_rate = info_rate
+        self.error_rate = error_rate
+        self.burst = burst
+        self.sites = {}  # {(pathname, lineno): [tokens, last refill, suppressed]}
+
+    def filter(self, record):
+        sample = getattr(record, 'sample', None)
+        if sample is not None and random.random() >= sample:
+            return False
+
+        site = self.sites.get((record.pathname, record.lineno))
+        now = time.monotonic()
+        if site is None:
+            site = self.sites[(record.pathname, record.lineno)] = [self.burst, now, 0]
+        rate = self.error_rate if record.levelno >= logging.WARNING else self.info_rate
+        site[0] = min(self.burst, site[0] + (now - site[1]) * rate)
+        site[1] = now
+        if site[0] < 1:
+            site[2] += 1
+            return False
+        site[0] -= 1
+        record.suppressed, site[2] = site[2], 0
+        record.request = request_context.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener unformatted; drops (and counts) them if the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting, including the message's %-args, happens on the listener thread
+        return record
+
+    def enqueue(self, record):
+        record.dropped = self.dropped
+        try:
+            self.queue.put_nowait(record)
+            self.dropped = 0
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(process: str = None, level=logging.INFO):
+    """
+    Route all logging through a bounded queue to a listener thread that formats and
+    writes. LOG_FORMAT=text keeps the plain format for local runs.
+    """
+    if os.getenv("LOG_FORMAT", "json") == "text":
+        tag = f"{process} - " if process else ""
+        formatter = logging.Formatter(f'%(asctime)s - {tag}%(name)s - %(levelname)s - %(message)s')
+    else:
+        formatter = JsonFormatter(process)
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(
+        info_rate=float(os.getenv("LOG_SITE_RATE", "20")),
+        error_rate=float(os.getenv("LOG_SITE_ERROR_RATE", "5")),
+    ))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
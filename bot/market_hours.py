@@ -0,0 +1,236 @@
+import datetime
+import functools
+import logging
+import time
+from zoneinfo import ZoneInfo
+from bot.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo("America/New_York")
+
+PRE, REGULAR, POST, CLOSED = "pre", "regular", "post", "closed"
+EXTENDED = (PRE, REGULAR, POST)
+MARKETS = ("equity", "option")
+
+# Local fallback when Schwab's hours are unavailable (US Eastern)
+DEFAULT_HOURS = {
+    'equity': ((PRE, datetime.time(4, 0), datetime.time(9, 30)),
+               (REGULAR, datetime.time(9, 30), datetime.time(16, 0)),
+               (POST, datetime.time(16, 0), datetime.time(20, 0))),
+    'option': ((REGULAR, datetime.time(9, 30), datetime.time(16, 15)),),
+}
+EARLY_CLOSE = {REGULAR: datetime.time(13, 0), POST: datetime.time(17, 0)}
+SCHWAB_SESSIONS = {'preMarket': PRE, 'regularMarket': REGULAR, 'postMarket': POST}
+# Longest a gated job sleeps before looking at the calendar again
+MAX_SUSPEND = 6 * 3600
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based; -1 = last) given weekday of a month"""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def _observed(day):
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+
+@functools.lru_cache(maxsize=8)
+def nyse_holidays(year: int):
+    """Full-day NYSE closures by the exchange's standing rules"""
+    days = {
+        _nth_weekday(year, 1, 0, 3),                    # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                    # Washington's Birthday
+        _easter(year) - datetime.timedelta(days=2),     # Good Friday
+        _nth_weekday(year, 5, 0, -1),                   # Memorial Day
+        _observed(datetime.date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),                    # Labor Day
+        _nth_weekday(year, 11, 3, 4),                   # Thanksgiving
+        _observed(datetime.date(year, 12, 25)),
+    }
+    if year >= 2022:
+        days.add(_observed(datetime.date(year, 6, 19)))
+    new_year = datetime.date(year, 1, 1)
+    # A Saturday New Year's Day is not observed on the Friday before
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    return frozenset(days)
+
+
+@functools.lru_cache(maxsize=8)
+def nyse_early_closes(year: int):
+    days = {_nth_weekday(year, 11, 3, 4) + datetime.timedelta(days=1)}
+    for day in (datetime.date(year, 7, 3), datetime.date(year, 12, 24)):
+        if day.weekday() < 5 and day not in nyse_holidays(year):
+            days.add(day)
+    return frozenset(days)
+
+
+def local_sessions(market: str, date: datetime.date):
+    """[(session, start, end)] from the local calendar"""
+    if date.weekday() >= 5 or date in nyse_holidays(date.year) or market not in DEFAULT_HOURS:
+        return []
+    early = date in nyse_early_closes(date.year)
+    sessions = []
+    for session, start, end in DEFAULT_HOURS[market]:
+        if early and session in EARLY_CLOSE:
+            end = EARLY_CLOSE[session]
+            if session == POST:
+                start = EARLY_CLOSE[REGULAR]
+        sessions.append((
+            session,
+            datetime.datetime.combine(date, start, tzinfo=MARKET_TZ),
+            datetime.datetime.combine(date, end, tzinfo=MARKET_TZ),
+        ))
+    return sessions
+
+
+def parse_market_hours(data, market: str):
+    """Schwab's markets response -> [(session, start, end)] for one market, or None"""
+    products = (data or {}).get(market)
+    if not products:
+        return None
+    product = next(iter(products.values()))
+    if not product.get('isOpen'):
+        return []
+    sessions = []
+    for name, periods in (product.get('sessionHours') or {}).items():
+        session = SCHWAB_SESSIONS.get(name)
+        for period in periods if session else []:
+            sessions.append((
+                session,
+                datetime.datetime.fromisoformat(period['start']),
+                datetime.datetime.fromisoformat(period['end']),
+            ))
+    return sorted(sessions, key=lambda item: item[1])
+
+
+def instrument_market(symbol: str):
+    """(market, sessions that move its price) for a symbol, or None if it is never gated"""
+    if symbol.startswith('/'):
+        return None  # futures trade nearly around the clock
+    if symbol.startswith('$'):
+        return 'equity', (REGULAR,)  # indices are computed in the regular session
+    if len(symbol) > 12 and any(ch.isdigit() for ch in symbol):
+        return 'option', (REGULAR,)
+    return 'equity', EXTENDED
+
+
+class MarketCalendar:
+    """
+    Trading sessions per day: Schwab's market hours, fetched once per day ahead of time,
+    with the local NYSE calendar standing in for days not fetched. All queries are
+    synchronous and take epoch seconds.
+    """
+
+    def __init__(self, schwab, days_ahead: int = 7):
+        self.schwab = schwab
+        self.days_ahead = days_ahead
+        self.days = {}  # {(market, date): [(session, start, end)]} from Schwab
+        self.refresh_job = None
+
+    async def start(self):
+        """Load the coming days now, then again every night"""
+        await self.refresh()
+        if self.refresh_job is None:
+            self.refresh_job = get_scheduler().cron("market-hours", "0 3 * * *", self.refresh, tz=MARKET_TZ, kind="prefetch")
+
+    async def refresh(self):
+        today = datetime.datetime.now(MARKET_TZ).date()
+        self.days = {key: value for key, value in self.days.items() if key[1] >= today}
+        for offset in range(self.days_ahead):
+            date = today + datetime.timedelta(days=offset)
+            if all((market, date) in self.days for market in MARKETS):
+                continue
+            try:
+                data = await self.schwab.get_market_hours(MARKETS, date)
+            except Exception as e:
+                logger.error("Error loading market hours for %s: %s", date, e)
+                return
+            for market in MARKETS:
+                sessions = parse_market_hours(data, market)
+                if sessions is not None:
+                    self.days[(market, date)] = sessions
+
+    def sessions(self, market: str, date: datetime.date):
+        sessions = self.days.get((market, date))
+        return sessions if sessions is not None else local_sessions(market, date)
+
+    def _around(self, market, now, days_after: int = 0):
+        """Sessions from the day before now (for ones spanning midnight) onwards"""
+        today = datetime.datetime.fromtimestamp(now, MARKET_TZ).date()
+        for offset in range(-1, days_after + 1):
+            yield from self.sessions(market, today + datetime.timedelta(days=offset))
+
+    def session(self, market: str = 'equity', now: float = None) -> str:
+        now = time.time() if now is None else now
+        for session, start, end in self._around(market, now):
+            if start.timestamp() <= now < end.timestamp():
+                return session
+        return CLOSED
+
+    def in_session(self, market: str = 'equity', sessions=EXTENDED, now: float = None) -> bool:
+        return self.session(market, now) in sessions
+
+    def is_trading_day(self, date: datetime.date, market: str = 'equity') -> bool:
+        return any(session == REGULAR for session, _, _ in self.sessions(market, date))
+
+    def next_open(self, market: str = 'equity', sessions=EXTENDED, now: float = None) -> float:
+        """When the next of the given sessions starts (capped at MAX_SUSPEND from now)"""
+        now = time.time() if now is None else now
+        for session, start, _ in self._around(market, now, days_after=10):
+            if session in sessions and start.timestamp() > now:
+                return min(start.timestamp(), now + MAX_SUSPEND)
+        return now + MAX_SUSPEND
+
+    def next_change(self, market: str = 'equity', now: float = None) -> float:
+        """The next session boundary of any kind (capped at MAX_SUSPEND from now)"""
+        now = time.time() if now is None else now
+        for _, start, end in self._around(market, now, days_after=10):
+            for boundary in (start.timestamp(), end.timestamp()):
+                if boundary > now:
+                    return min(boundary, now + MAX_SUSPEND)
+        return now + MAX_SUSPEND
+
+    def symbol_active(self, symbol: str, now: float = None) -> bool:
+        market = instrument_market(symbol)
+        return market is None or self.in_session(*market, now)
+
+    def gate(self, symbols=None, idle: float = None):
+        """
+        A scheduler gate: the job runs while any of symbols() (default: US equities) is in
+        a session that moves its price. Otherwise it sleeps until the next such session
+        opens, or, with idle, still runs once every idle seconds.
+        """
+        def gate(job, now):
+            markets = {instrument_market(s) for s in symbols()} if symbols else {('equity', EXTENDED)}
+            if not markets or None in markets or any(self.in_session(*m, now) for m in markets):
+                return None
+            wake = min(self.next_open(*m, now) for m in markets)
+            if idle is not None:
+                if job.last_run is None or now - job.last_run >= idle:
+                    return None
+                wake = min(wake, job.last_run + idle)
+            return wake
+        return gate
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from bot.cache import TTLCache
+from bot.ratelimit import TokenBucket
+from bot.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class NewsProvider:
+    """Base class for headline sources. Subclasses implement fetch()."""
+
+    name = "provider"
+    # Calls per second this provider allows
+    rate_limit = 1.0
+
+    def __init__(self):
+        self.limiter = TokenBucket(self.rate_limit)
+
+    async def fetch(self, symbol: str):
+        """Return a list of {'title', 'url', 'source', 'published'} dicts for symbol"""
+        raise NotImplementedError
+
+    async def headlines(self, symbol: str):
+        await self.limiter.acquire()
+        return await self.fetch(symbol)
+
+
+class FileNewsProvider(NewsProvider):
+    """Reads headlines from {directory}/{SYMBOL}.json; a stand-in for a real feed in testing"""
+
+    name = "file"
+    rate_limit = 50.0
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+
+    def _read(self, symbol):
+        path = os.path.join(self.directory, f"{symbol}.json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            items = json.load(f)
+        return [dict(item, source=item.get('source', self.name)) for item in items]
+
+    async def fetch(self, symbol: str):
+        return await asyncio.to_thread(self._read, symbol)
+
+
+def load_providers():
+    """Providers enabled by the environment"""
+    providers = []
+    news_dir = os.getenv("NEWS_DIR")
+    if news_dir:
+        providers.append(FileNewsProvider(news_dir))
+    return providers
+
+
+def _item_key(item):
+    """Same URL or same (normalized) title counts as the same story"""
+    basis = item.get('url') or " ".join((item.get('title') or "").lower().split())
+    return hashlib.sha1(basis.encode()).hexdigest()
+
+
+class NewsService:
+    """Concurrent, deduplicated, cached headlines with background prefetch of tracked symbols"""
+
+    def __init__(self, providers, ttl: float = 600, prefetch_interval: float = 300):
+        self.providers = providers
+        self.cache = TTLCache(ttl=ttl, maxsize=5000)
+        self.prefetch_interval = prefetch_interval
+        self.prefetch_job = None
+        self._pending = {}  # {symbol: asyncio.Task} so a symbol is fetched once at a time
+
+    async def get(self, symbol: str, limit: int = 10):
+        items = self.cache.get(symbol)
+        if items is None:
+            items = await self._refresh(symbol)
+        return items[:limit]
+
+    async def _refresh(self, symbol: str):
+        task = self._pending.get(symbol)
+        if task is None:
+            task = asyncio.create_task(self._fetch_all(symbol), name=f"news {symbol}")
+            self._pending[symbol] = task
+            task.add_done_callback(lambda _: self._pending.pop(symbol, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_all(self, symbol: str):
+        results = await asyncio.gather(
+            *[provider.headlines(symbol) for provider in self.providers],
+            return_exceptions=True
+        )
+        seen = set()
+        items = []
+        for provider, result in zip(self.providers, results):
+            if isinstance(result, Exception):
+                logger.error("News provider %s failed for %s: %s", provider.name, symbol, result)
+                continue
+            for item in result:
+                key = _item_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    items.append(item)
+        items.sort(key=lambda item: item.get('published') or "", reverse=True)
+        self.cache.set(symbol, items)
+        return items
+
+    async def start_prefetch(self, tracked_symbols, gate=None):
+        """Keep headlines warm for every symbol returned by tracked_symbols()"""
+        if self.prefetch_job is None and self.providers:
+            self.prefetch_job = get_scheduler().every(
+                "news-prefetch", self.prefetch_interval, lambda: self._prefetch(tracked_symbols), first=0, gate=gate,
+                kind="prefetch"
+            )
+
+    async def _prefetch(self, tracked_symbols):
+        symbols = sorted(tracked_symbols())
+        await asyncio.gather(*[self._refresh(symbol) for symbol in symbols])
+        logger.info("Prefetched news for %s symbols", len(symbols))
@@ -0,0 +1,192 @@
+import datetime
+import numpy as np
+from scipy.special import ndtr
+
+SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+def _pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def _d1_d2(S, K, T, r, sigma):
+    vol_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(S, K, T, r, sigma, is_call):
+    """Black-Scholes price for arrays of contracts"""
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    discount = np.exp(-r * T)
+    call = S * ndtr(d1) - K * discount * ndtr(d2)
+    put = K * discount * ndtr(-d2) - S * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_greeks(S, K, T, r, sigma, is_call):
+    """Delta, gamma, theta (per day) and vega (per vol point) for arrays of contracts"""
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    sqrt_t = np.sqrt(T)
+    discount = np.exp(-r * T)
+    pdf_d1 = _pdf(d1)
+    delta = np.where(is_call, ndtr(d1), ndtr(d1) - 1.0)
+    gamma = pdf_d1 / (S * sigma * sqrt_t)
+    vega = S * pdf_d1 * sqrt_t / 100.0
+    decay = -S * pdf_d1 * sigma / (2.0 * sqrt_t)
+    theta = np.where(is_call,
+                     decay - r * K * discount * ndtr(d2),
+                     decay + r * K * discount * ndtr(-d2)) / 365.0
+    return delta, gamma, theta, vega
+
+
+def implied_vol(price, S, K, T, r, is_call, iterations: int = 8):
+    """
+    Vectorized implied volatility: a few Newton steps for the whole chain, then bisection
+    for the contracts Newton could not settle. NaN where the price is below intrinsic.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    intrinsic = np.where(is_call, np.maximum(S - K * np.exp(-r * T), 0), np.maximum(K * np.exp(-r * T) - S, 0))
+    valid = (price > intrinsic) & (T > 0) & (price > 0)
+
+    sigma = np.full(price.shape, 0.3)
+    with np.errstate(all='ignore'):
+        for _ in range(iterations):
+            diff = bs_price(S, K, T, r, sigma, is_call) - price
+            d1, _ = _d1_d2(S, K, T, r, sigma)
+            vega = S * _pdf(d1) * np.sqrt(T)
+            sigma = np.clip(sigma - diff / np.where(vega > 1e-8, vega, np.inf), 1e-4, 5.0)
+
+        residual = np.abs(bs_price(S, K, T, r, sigma, is_call) - price)
+        retry = valid & ~(residual < 1e-4 * np.maximum(price, 1e-2))
+        if retry.any():
+            lo, hi = np.full(retry.sum(), 1e-4), np.full(retry.sum(), 5.0)
+            for _ in range(60):
+                mid = 0.5 * (lo + hi)
+                above = bs_price(S, K[retry], T[retry], r, mid, is_call[retry]) > price[retry]
+                hi = np.where(above, mid, hi)
+                lo = np.where(above, lo, mid)
+            sigma[retry] = 0.5 * (lo + hi)
+
+    return np.where(valid, sigma, np.nan)
+
+
+def american_implied_vol(price, S, K, T, r, is_call):
+    """Implied vol under American exercise (Barone-Adesi-Whaley via QuantLib), NaN on failure"""
+    import QuantLib as ql
+
+    today = ql.Date.todaysDate()
+    ql.Settings.instance().evaluationDate = today
+    calendar = ql.NullCalendar()
+    day_count = ql.Actual365Fixed()
+    spot = ql.SimpleQuote(float(S))
+    vol = ql.SimpleQuote(0.3)
+    process = ql.BlackScholesMertonProcess(
+        ql.QuoteHandle(spot),
+        ql.YieldTermStructureHandle(ql.FlatForward(today, 0.0, day_count)),
+        ql.YieldTermStructureHandle(ql.FlatForward(today, float(r), day_count)),
+        ql.BlackVolTermStructureHandle(ql.BlackConstantVol(today, calendar, ql.QuoteHandle(vol), day_count)),
+    )
+    engine = ql.BaroneAdesiWhaleyApproximationEngine(process)
+
+    result = np.full(len(price), np.nan)
+    for i in range(len(price)):
+        days = max(int(round(T[i] * 365)), 1)
+        option = ql.VanillaOption(
+            ql.PlainVanillaPayoff(ql.Option.Call if is_call[i] else ql.Option.Put, float(K[i])),
+            ql.AmericanExercise(today, today + days),
+        )
+        option.setPricingEngine(engine)
+        try:
+            result[i] = option.impliedVolatility(float(price[i]), process, 1e-4, 100, 1e-4, 5.0)
+        except RuntimeError:
+            pass
+    return result
+
+
+def flatten_chain(chain: dict, expiry: str = None):
+    """Pull one expiration out of a Schwab chain response as flat NumPy arrays"""
+    expirations = sorted({
+        key.split(':')[0]
+        for side in ('callExpDateMap', 'putExpDateMap')
+        for key in chain.get(side, {})
+    })
+    if not expirations:
+        return None, expirations
+    if expiry is None:
+        expiry = expirations[0]
+    elif expiry not in expirations:
+        return None, expirations
+
+    rows = []
+    for side in ('callExpDateMap', 'putExpDateMap'):
+        for key, strikes in chain.get(side, {}).items():
+            if key.split(':')[0] != expiry:
+                continue
+            for contracts in strikes.values():
+                for c in contracts:
+                    bid, ask = c.get('bid') or 0.0, c.get('ask') or 0.0
+                    mark = c.get('mark') or ((bid + ask) / 2 if bid and ask else c.get('last') or 0.0)
+                    rows.append((c['strikePrice'], c.get('putCall') == 'CALL', bid, ask, mark,
+                                 max(c.get('daysToExpiration', 0), 0) + 0.5, c.get('openInterest', 0)))
+    arrays = np.array(rows, dtype=[('strike', 'f8'), ('is_call', '?'), ('bid', 'f8'), ('ask', 'f8'),
+                                   ('mark', 'f8'), ('days', 'f8'), ('open_interest', 'f8')])
+    return {'expiry': expiry, 'contracts': arrays}, expirations
+
+
+def analyze_chain(chain: dict, expiry: str = None, width: int = 6):
+    """
+    Price one expiration of a chain in a single batched pass and return a strike ladder of
+    `width` strikes either side of the money. Meant to run in the compute pool.
+    """
+    flat, expirations = flatten_chain(chain, expiry)
+    # An expiration can be listed with no contracts under it
+    if flat is None or not len(flat['contracts']):
+        return {'error': 'expiry', 'expirations': expirations}
+
+    c = flat['contracts']
+    S = float(chain.get('underlyingPrice') or chain.get('underlying', {}).get('last') or 0.0)
+    r = float(chain.get('interestRate') or 0.0) / 100.0
+    T = c['days'] / 365.0
+    iv = implied_vol(c['mark'], S, c['strike'], T, r, c['is_call'])
+
+    strikes = np.unique(c['strike'])
+    atm = int(np.argmin(np.abs(strikes - S)))
+    ladder = strikes[max(atm - width, 0):atm + width + 1]
+
+    # Equity options exercise American-style: refine the ladder's puts (where early
+    # exercise is worth something) with QuantLib; calls stay on the European estimate.
+    in_ladder = np.isin(c['strike'], ladder)
+    puts = in_ladder & ~c['is_call'] & (c['mark'] > 0)
+    if puts.any():
+        american = american_implied_vol(c['mark'][puts], S, c['strike'][puts], T[puts], r, c['is_call'][puts])
+        iv[puts] = np.where(np.isnan(american), iv[puts], american)
+
+    sigma = np.where(np.isnan(iv), 0.3, iv)
+    with np.errstate(all='ignore'):
+        delta, gamma, theta, vega = bs_greeks(S, c['strike'], T, r, sigma, c['is_call'])
+
+    rows = []
+    for strike in ladder:
+        row = {'strike': float(strike)}
+        for side, mask in (('call', c['is_call']), ('put', ~c['is_call'])):
+            idx = np.flatnonzero(mask & (c['strike'] == strike))
+            if len(idx):
+                i = idx[0]
+                row[side] = {
+                    'bid': float(c['bid'][i]), 'ask': float(c['ask'][i]),
+                    'iv': None if np.isnan(iv[i]) else float(iv[i]),
+                    'delta': float(delta[i]), 'gamma': float(gamma[i]),
+                    'theta': float(theta[i]), 'vega': float(vega[i]),
+                }
+        rows.append(row)
+
+    return {
+        'expiry': flat['expiry'],
+        'days': int(c['days'][0]),
+        'underlying': S,
+        'expirations': expirations,
+        'contracts': len(c),
+        'ladder': rows,
+        'generated': datetime.datetime.now().strftime('%H:%M:%S'),
+    }
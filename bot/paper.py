@@ -0,0 +1,281 @@
+import heapq
+import os
+
+MARKET, LIMIT, STOP = "MARKET", "LIMIT", "STOP"
+BUY, SELL = "BUY", "SELL"
+OPEN, FILLED, CANCELLED, REJECTED = "OPEN", "FILLED", "CANCELLED", "REJECTED"
+
+
+class PaperOrder:
+    __slots__ = ('id', 'user_id', 'symbol', 'side', 'quantity', 'type', 'price',
+                 'status', 'fill_price', 'created', 'updated', 'reason')
+
+    def __init__(self, order_id, user_id, symbol, side, quantity, order_type, price, created):
+        self.id = order_id
+        self.user_id = user_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.type = order_type
+        self.price = price
+        self.status = OPEN
+        self.fill_price = None
+        self.created = created
+        self.updated = created
+        self.reason = None
+
+
+class _Trigger:
+    """
+    Resting orders that fire when a quote field crosses their price, in a heap ordered so
+    the next order to fire is always on top: price priority, then submission order.
+    """
+
+    def __init__(self, field, fires_above: bool):
+        self.field = field
+        self.fires_above = fires_above  # fire when quote >= price (else quote <= price)
+        self.heap = []  # (sort price, order id)
+
+    def push(self, order):
+        key = order.price if self.fires_above else -order.price
+        heapq.heappush(self.heap, (key, order.id))
+
+    def pop_crossed(self, quote, orders):
+        """Order ids crossed by this quote: O(k log n) for k fills, O(1) when nothing crosses"""
+        value = quote.get(self.field)
+        if not value:
+            return []
+        bound = value if self.fires_above else -value
+        crossed = []
+        while self.heap and self.heap[0][0] <= bound:
+            _, order_id = heapq.heappop(self.heap)
+            # Cancelled orders are removed lazily, when they reach the top
+            if orders[order_id].status == OPEN:
+                crossed.append(order_id)
+        return crossed
+
+
+class SymbolBook:
+    """The four kinds of resting order for one symbol, with a count of those still open"""
+
+    def __init__(self):
+        self.triggers = {
+            (BUY, LIMIT): _Trigger('askPrice', fires_above=False),    # ask falls to the limit
+            (SELL, LIMIT): _Trigger('bidPrice', fires_above=True),    # bid rises to the limit
+            (BUY, STOP): _Trigger('lastPrice', fires_above=True),     # trades up through the stop
+            (SELL, STOP): _Trigger('lastPrice', fires_above=False),   # trades down through the stop
+        }
+        self.live = 0
+
+    def add(self, order):
+        self.triggers[(order.side, order.type)].push(order)
+        self.live += 1
+
+    def closed(self, orders):
+        """An order in this book stopped being open; drop dead entries once they outnumber live ones"""
+        self.live -= 1
+        if self.entries() > 2 * self.live + 32:
+            self.compact(orders)
+
+    def compact(self, orders):
+        for trigger in self.triggers.values():
+            trigger.heap = [entry for entry in trigger.heap if orders[entry[1]].status == OPEN]
+            heapq.heapify(trigger.heap)
+
+    def entries(self) -> int:
+        return sum(len(trigger.heap) for trigger in self.triggers.values())
+
+    def crossed(self, quote, orders):
+        ids = []
+        for trigger in self.triggers.values():
+            ids.extend(trigger.pop_crossed(quote, orders))
+        return sorted(ids)  # submission order, so replays are deterministic
+
+    def __len__(self):
+        return self.live
+
+
+class PaperAccount:
+    def __init__(self, user_id, cash: float):
+        self.user_id = user_id
+        self.cash = cash
+        self.starting_cash = cash
+        self.positions = {}  # {symbol: {'quantity': float, 'cost': float}} cost = total cost basis
+        self.realized = 0.0
+
+
+class PaperBroker:
+    """
+    Simulated accounts and order matching. Pure and deterministic: no clocks or I/O, order
+    ids are sequential and every call takes its time from the caller, so replaying the same
+    quotes and orders reproduces the same fills.
+    """
+
+    def __init__(self, starting_cash: float = None):
+        self.starting_cash = starting_cash or float(os.getenv("PAPER_STARTING_CASH", "100000"))
+        self.enabled = set()  # user ids trading on paper
+        self.accounts = {}  # {user_id: PaperAccount}
+        self.orders = {}  # {order id: PaperOrder}
+        self.books = {}  # {symbol: SymbolBook}
+        self.next_id = 1
+
+    def restore(self, saved: "PaperBroker"):
+        """Take over a snapshotted broker's state in place (handlers share this object)"""
+        self.__dict__.update(saved.__dict__)
+
+    def account(self, user_id) -> PaperAccount:
+        if user_id not in self.accounts:
+            self.accounts[user_id] = PaperAccount(user_id, self.starting_cash)
+        return self.accounts[user_id]
+
+    def reset(self, user_id):
+        for order in self.open_orders(user_id):
+            self._close(order, CANCELLED, order.updated)
+        self.accounts[user_id] = PaperAccount(user_id, self.starting_cash)
+
+    def submit(self, user_id, symbol, side, quantity, order_type=MARKET, price=None, quote=None, now=0.0):
+        """Place an order; market orders (and marketable limits) fill against quote at once"""
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        if order_type != MARKET and not price:
+            raise ValueError(f"{order_type.title()} orders need a price")
+        order = PaperOrder(self.next_id, user_id, symbol, side, quantity, order_type, price, now)
+        self.next_id += 1
+        self.orders[order.id] = order
+        self.account(user_id)
+
+        if order_type == MARKET:
+            if not quote:
+                self._close(order, REJECTED, now, "No quote")
+            else:
+                self._fill(order, quote, now)
+            return order
+
+        book = self.books.setdefault(symbol, SymbolBook())
+        book.add(order)
+        if quote:
+            for order_id in book.crossed(quote, self.orders):
+                self._fill(self.orders[order_id], quote, now)
+        return order
+
+    def cancel(self, user_id, order_id) -> bool:
+        order = self.orders.get(order_id)
+        if order is None or order.user_id != user_id or order.status != OPEN:
+            return False
+        self._close(order, CANCELLED, order.updated)
+        return True
+
+    def on_quote(self, symbol, quote, now=0.0):
+        """Fill the resting orders this quote crosses; returns the orders it touched"""
+        book = self.books.get(symbol)
+        if book is None:
+            return []
+        touched = []
+        for order_id in book.crossed(quote, self.orders):
+            order = self.orders[order_id]
+            self._fill(order, quote, now)
+            touched.append(order)
+        return touched
+
+    def on_quotes(self, quotes, now=0.0):
+        touched = []
+        for symbol in sorted(quotes):
+            data = quotes[symbol]
+            touched.extend(self.on_quote(symbol, data.get('quote', data), now))
+        return touched
+
+    def resting_symbols(self):
+        return [symbol for symbol, book in self.books.items() if len(book)]
+
+    def _fill_price(self, order, quote):
+        last = quote.get('lastPrice')
+        if order.side == BUY:
+            market = quote.get('askPrice') or last
+            return min(market, order.price) if order.type == LIMIT else market
+        market = quote.get('bidPrice') or last
+        return max(market, order.price) if order.type == LIMIT else market
+
+    def _fill(self, order, quote, now):
+        price = self._fill_price(order, quote)
+        if not price:
+            self._close(order, REJECTED, now, "No price")
+            return
+        account = self.account(order.user_id)
+        position = account.positions.get(order.symbol, {'quantity': 0.0, 'cost': 0.0})
+        value = price * order.quantity
+
+        if order.side == BUY:
+            if value > account.cash:
+                self._close(order, REJECTED, now, "Insufficient cash")
+                return
+            account.cash -= value
+            position['quantity'] += order.quantity
+            position['cost'] += value
+        else:
+            if order.quantity > position['quantity']:
+                self._close(order, REJECTED, now, "Insufficient shares")
+                return
+            average = position['cost'] / position['quantity']
+            account.cash += value
+            account.realized += (price - average) * order.quantity
+            position['quantity'] -= order.quantity
+            position['cost'] -= average * order.quantity
+
+        if position['quantity'] > 0:
+            account.positions[order.symbol] = position
+        else:
+            account.positions.pop(order.symbol, None)
+        order.fill_price = price
+        self._close(order, FILLED, now)
+
+    def _close(self, order, status, now, reason=None):
+        if order.status == OPEN and order.type != MARKET:
+            book = self.books[order.symbol]
+            book.closed(self.orders)
+            if not book.live:
+                del self.books[order.symbol]
+        order.status = status
+        order.updated = now
+        order.reason = reason
+
+    def open_orders(self, user_id):
+        return [order for order in self.orders.values() if order.user_id == user_id and order.status == OPEN]
+
+    def recent_orders(self, user_id, limit: int = 10):
+        orders = [order for order in self.orders.values() if order.user_id == user_id]
+        return orders[-limit:][::-1]
+
+    def account_details(self, user_id, quotes):
+        """The paper account in the shape of Schwab's account details, for the portfolio views"""
+        account = self.account(user_id)
+        positions = []
+        long_value = 0.0
+        for symbol, position in sorted(account.positions.items()):
+            data = quotes.get(symbol, {})
+            price = data.get('quote', data).get('lastPrice') or position['cost'] / position['quantity']
+            market_value = price * position['quantity']
+            long_value += market_value
+            positions.append({
+                'instrument': {'symbol': symbol},
+                'longQuantity': position['quantity'],
+                'shortQuantity': 0,
+                'averagePrice': position['cost'] / position['quantity'],
+                'marketValue': market_value,
+            })
+        number = f"PAPER{user_id}"
+        balances = {
+            'liquidationValue': account.cash + long_value,
+            'cashBalance': account.cash,
+            'buyingPower': account.cash,
+            'longMarketValue': long_value,
+            'shortMarketValue': 0.0,
+        }
+        return (
+            {'accountNumber': number, 'hashValue': number},
+            {'securitiesAccount': {
+                'accountNumber': number,
+                'type': 'PAPER',
+                'currentBalances': balances,
+                'positions': positions,
+            }},
+        )
@@ -0,0 +1,44 @@
+BALANCE_FIELDS = ('liquidationValue', 'cashBalance', 'buyingPower', 'longMarketValue', 'shortMarketValue')
+
+
+def account_label(account_number) -> str:
+    """Short, non-sensitive label for an account (last four digits)"""
+    return f"…{str(account_number)[-4:]}"
+
+
+def _securities_account(details):
+    return (details or {}).get('securitiesAccount', details or {})
+
+
+def aggregate_accounts(results):
+    """
+    Merge [(account, details), ...] into one view: summed balances, positions netted by
+    symbol with a per-account breakdown, and a per-account summary.
+    """
+    balances = {field: 0.0 for field in BALANCE_FIELDS}
+    positions = {}  # {symbol: {'quantity', 'market_value', 'accounts': {label: quantity}}}
+    accounts = []
+
+    for account, details in results:
+        if not details:
+            continue
+        data = _securities_account(details)
+        label = account_label(account.get('accountNumber', data.get('accountNumber', '')))
+        current = data.get('currentBalances', {})
+        for field in BALANCE_FIELDS:
+            balances[field] += current.get(field, 0) or 0
+        accounts.append({
+            'label': label,
+            'type': data.get('type', ''),
+            'value': current.get('liquidationValue', 0) or 0,
+        })
+
+        for pos in data.get('positions', []) or []:
+            symbol = pos.get('instrument', {}).get('symbol', 'N/A')
+            quantity = pos.get('longQuantity', 0) - pos.get('shortQuantity', 0)
+            entry = positions.setdefault(symbol, {'quantity': 0.0, 'market_value': 0.0, 'accounts': {}})
+            entry['quantity'] += quantity
+            entry['market_value'] += pos.get('marketValue', 0) or 0
+            entry['accounts'][label] = entry['accounts'].get(label, 0) + quantity
+
+    return {'balances': balances, 'positions': positions, 'accounts': accounts}
@@ -0,0 +1,219 @@
+import logging
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
+
+# One row per symbol. 'seq' is the row's seqlock: odd while the producer is writing it.
+QUOTE_DTYPE = np.dtype([
+    ('seq', 'u8'),
+    ('timestamp', 'f8'),
+    ('last', 'f8'),
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('net_change', 'f8'),
+    ('net_pct', 'f8'),
+    ('volume', 'i8'),
+])
+VALUE_FIELDS = [name for name in QUOTE_DTYPE.names if name != 'seq']
+# Wide enough for Schwab option symbols (21 characters); longer symbols are not tabled
+SYMBOL_DTYPE = np.dtype('S32')
+EXPORT_DTYPE = np.dtype([('symbol', SYMBOL_DTYPE)] + [(name, QUOTE_DTYPE[name]) for name in VALUE_FIELDS])
+# count, capacity
+HEADER_SIZE = 64
+
+# Table column -> Schwab quote field, so rows can stand in for API quotes
+SCHWAB_FIELDS = {
+    'last': 'lastPrice',
+    'bid': 'bidPrice',
+    'ask': 'askPrice',
+    'high': 'highPrice',
+    'low': 'lowPrice',
+    'net_change': 'netChange',
+    'net_pct': 'netPercentChangeInDouble',
+    'volume': 'totalVolume',
+}
+
+
+def is_quote(entry) -> bool:
+    """True for a Schwab quote entry, nested under 'quote' or flat; False for e.g. 'errors'"""
+    return isinstance(entry, dict) and ('quote' in entry or 'lastPrice' in entry)
+
+
+class QuoteTable:
+    """
+    Latest quote per symbol in shared memory. One process writes (the one that talks to
+    Schwab); any number of processes read concurrently without locks, using each row's
+    sequence number to detect and retry torn reads. Symbols are append-only, so readers
+    keep their own symbol -> row index and only scan rows added since they last looked.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((2,), dtype='i8', buffer=shm.buf)
+        capacity = int(self.header[1])
+        self.capacity = capacity
+        self.rows = np.ndarray((capacity,), dtype=QUOTE_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+        self.values = self.rows[VALUE_FIELDS]
+        self.symbols = np.ndarray(
+            (capacity,), dtype=SYMBOL_DTYPE, buffer=shm.buf,
+            offset=HEADER_SIZE + capacity * QUOTE_DTYPE.itemsize
+        )
+        self.index = {}  # {symbol: row}
+        self.too_long = 0  # writes refused because the symbol does not fit its field
+        self._full_logged = False
+
+    @classmethod
+    def create(cls, capacity: int = None, name: str = None):
+        capacity = capacity or int(os.getenv("QUOTE_TABLE_CAPACITY", "20000"))
+        size = HEADER_SIZE + capacity * (QUOTE_DTYPE.itemsize + SYMBOL_DTYPE.itemsize)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        np.ndarray((2,), dtype='i8', buffer=shm.buf)[:] = (0, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str):
+        """Open a table created by the parent process (children share its resource tracker)"""
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        self.header = self.rows = self.values = self.symbols = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def _sync_index(self):
+        """Pick up symbols the producer has added since the last lookup"""
+        count = int(self.header[0])
+        for row in range(len(self.index), count):
+            self.index[self.symbols[row].decode()] = row
+
+    def _row_for_write(self, symbol: str):
+        row = self.index.get(symbol)
+        if row is None:
+            encoded = symbol.encode()
+            if len(encoded) > SYMBOL_DTYPE.itemsize:
+                # Stored truncated, it would never match for readers
+                if not self.too_long:
+                    logger.warning("Quote table skips symbols over %s bytes, e.g. %s", SYMBOL_DTYPE.itemsize, symbol)
+                self.too_long += 1
+                return None
+            row = int(self.header[0])
+            if row >= self.capacity:
+                if not self._full_logged:
+                    logger.warning("Quote table is full (%s symbols)", self.capacity)
+                    self._full_logged = True
+                return None
+            # The symbol must be in place before readers can see the new count
+            self.symbols[row] = encoded
+            self.header[0] = row + 1
+            self.index[symbol] = row
+        return row
+
+    def write(self, quotes: dict, timestamp: float = None):
+        """Producer only: store {symbol: Schwab quote data} as one batch"""
+        timestamp = timestamp or time.time()
+        rows = []
+        records = []
+        for symbol, data in quotes.items():
+            if not is_quote(data):
+                continue
+            row = self._row_for_write(symbol)
+            if row is None:
+                continue
+            quote = (data or {}).get('quote', data or {})
+            rows.append(row)
+            records.append((
+                timestamp,
+                quote.get('lastPrice') or 0.0,
+                quote.get('bidPrice') or 0.0,
+                quote.get('askPrice') or 0.0,
+                quote.get('highPrice') or 0.0,
+                quote.get('lowPrice') or 0.0,
+                quote.get('netChange') or 0.0,
+                quote.get('netPercentChangeInDouble', quote.get('netPercentChange')) or 0.0,
+                int(quote.get('totalVolume') or 0),
+            ))
+        if not rows:
+            return
+        rows = np.array(rows)
+        seq = self.rows['seq']
+        seq[rows] += 1  # odd: readers of these rows will retry
+        self.values[rows] = np.array(records, dtype=self.values.dtype)
+        seq[rows] += 1  # even again: the rows are consistent
+
+    def snapshot(self, symbols, retries: int = 100):
+        """
+        Consistent copy of the rows for symbols, as (structured array, found symbols).
+        Only rows caught mid-write are read again.
+        """
+        self._sync_index()
+        found = [symbol for symbol in symbols if symbol in self.index]
+        rows = np.array([self.index[symbol] for symbol in found], dtype=np.intp)
+        result = np.empty(len(rows), dtype=QUOTE_DTYPE)
+        pending = np.arange(len(rows))
+        for _ in range(retries):
+            before = self.rows['seq'][rows[pending]]
+            result[pending] = self.rows[rows[pending]]
+            after = self.rows['seq'][rows[pending]]
+            pending = pending[(before != after) | (before % 2 == 1)]
+            if len(pending) == 0:
+                break
+        else:
+            # Give up on rows that never settled rather than return torn data
+            keep = np.setdiff1d(np.arange(len(rows)), pending)
+            result = result[keep]
+            found = [found[i] for i in keep]
+        return result, found
+
+    def export(self):
+        """Every row with its symbol, as one structured array (for snapshots)"""
+        self._sync_index()
+        symbols = list(self.index)
+        records, found = self.snapshot(symbols)
+        exported = np.empty(len(found), dtype=EXPORT_DTYPE)
+        exported['symbol'] = [symbol.encode() for symbol in found]
+        for field in VALUE_FIELDS:
+            exported[field] = records[field]
+        return exported
+
+    def restore(self, exported):
+        """Producer only: load exported rows, keeping their original timestamps"""
+        rows = []
+        for symbol in exported['symbol']:
+            rows.append(self._row_for_write(symbol.decode()))
+        keep = np.array([row is not None for row in rows], dtype=bool)
+        rows = np.array([row for row in rows if row is not None], dtype=np.intp)
+        if not len(rows):
+            return
+        seq = self.rows['seq']
+        seq[rows] += 1
+        for field in VALUE_FIELDS:
+            self.rows[field][rows] = exported[field][keep]
+        seq[rows] += 1
+
+    def get_quotes(self, symbols, max_age: float = None):
+        """({symbol: Schwab-shaped quote}, [symbols missing or older than max_age])"""
+        records, found = self.snapshot(symbols)
+        now = time.time()
+        quotes = {}
+        for symbol, record in zip(found, records):
+            if max_age is not None and now - record['timestamp'] > max_age:
+                continue
+            quotes[symbol] = as_quote(symbol, record)
+        return quotes, [symbol for symbol in symbols if symbol not in quotes]
+
+
+def as_quote(symbol: str, record) -> dict:
+    quote = {field: record[column].item() for column, field in SCHWAB_FIELDS.items()}
+    quote['quoteTime'] = int(record['timestamp'] * 1000)
+    return {'symbol': symbol, 'quote': quote}
@@ -0,0 +1,95 @@
+import asyncio
+import collections
+import math
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available right now; never waits"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until tokens would be available (inf if they never will be)"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        if self.rate <= 0 or tokens > self.capacity:
+            return math.inf
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until tokens are available, then take them"""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class FairLimiter:
+    """
+    One token bucket shared by many flows (users). While tokens are free, callers take
+    one straight away; once it runs dry, waiters queue per flow and the flows are
+    served round-robin, one token each, so one busy flow cannot starve the others.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.bucket = TokenBucket(rate, capacity)
+        self.waiting = collections.OrderedDict()  # {flow: deque of futures}, in turn order
+        self.granted = collections.Counter()  # {flow: tokens taken}
+        self.delayed = collections.Counter()  # {flow: acquisitions that had to queue}
+        self._drainer = None
+
+    @property
+    def saturated(self) -> bool:
+        return bool(self.waiting)
+
+    async def acquire(self, flow=None):
+        if not self.waiting and self.bucket.try_acquire():
+            self.granted[flow] += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(flow, collections.deque()).append(future)
+        self.delayed[flow] += 1
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.get_running_loop().create_task(self._drain())
+        # A cancelled waiter stays queued as a done future and is skipped when its turn comes
+        await future
+        self.granted[flow] += 1
+
+    async def _drain(self):
+        while self.waiting:
+            await self.bucket.acquire()
+            if not self._grant_next():
+                # Everyone still queued had given up; keep the token
+                self.bucket.tokens += 1
+
+    def _grant_next(self) -> bool:
+        while self.waiting:
+            flow, queue = self.waiting.popitem(last=False)
+            future = None
+            while queue and future is None:
+                candidate = queue.popleft()
+                if not candidate.done():
+                    future = candidate
+            if queue:
+                self.waiting[flow] = queue  # back of the line
+            if future is not None:
+                future.set_result(None)
+                return True
+        return False
@@ -0,0 +1,91 @@
+import numpy as np
+from scipy.stats import norm
+
+
+def align_closes(series):
+    """
+    [(timestamps, closes)] -> (common timestamps, closes matrix T x N). Only dates every
+    series has are kept, so returns line up across positions and the benchmark.
+    """
+    common = series[0][0]
+    for timestamps, _ in series[1:]:
+        common = np.intersect1d(common, timestamps, assume_unique=True)
+    matrix = np.empty((len(common), len(series)))
+    for j, (timestamps, closes) in enumerate(series):
+        matrix[:, j] = closes[np.searchsorted(timestamps, common)]
+    return common, matrix
+
+
+def analyze_risk(symbols, market_values, series, benchmark, lookback: int = 252,
+                 confidence: float = 0.95, top: int = 8):
+    """
+    One-day risk of a portfolio from daily closes. Runs in the compute pool.
+
+    symbols/market_values: positions (signed dollar exposure); series: [(timestamps, closes)]
+    aligned with symbols; benchmark: (timestamps, closes) of the index used for beta;
+    lookback: number of daily returns used.
+    """
+    _, closes = align_closes(list(series) + [benchmark])
+    closes = closes[-(lookback + 1):]
+    if len(closes) < 20:
+        return {'error': f"Only {len(closes)} overlapping daily bars; need at least 20"}
+
+    returns = closes[1:] / closes[:-1] - 1.0           # T x (N + 1)
+    asset_returns, bench_returns = returns[:, :-1], returns[:, -1]
+    exposure = np.asarray(market_values, dtype=np.float64)
+    gross = np.abs(exposure).sum()
+    net = exposure.sum()
+    weights = exposure / gross
+
+    # Historical: replay each past day's returns on today's positions
+    pnl = asset_returns @ exposure
+    alpha = 1.0 - confidence
+    cutoff = np.quantile(pnl, alpha)
+    hist_var = -cutoff
+    hist_cvar = -pnl[pnl <= cutoff].mean()
+
+    # Parametric (normal): sigma^2 = x' Σ x
+    cov = np.cov(asset_returns, rowvar=False).reshape(len(symbols), len(symbols))
+    mu = asset_returns.mean(axis=0) @ exposure
+    sigma = float(np.sqrt(max(exposure @ cov @ exposure, 0.0)))
+    z = norm.ppf(alpha)
+    param_var = -(mu + z * sigma)
+    param_cvar = -(mu - sigma * norm.pdf(z) / alpha)
+
+    # Beta of every position against the benchmark in one pass
+    bench_centered = bench_returns - bench_returns.mean()
+    betas = (asset_returns - asset_returns.mean(axis=0)).T @ bench_centered / (bench_centered @ bench_centered)
+    portfolio_beta = float(betas @ exposure / net) if net else 0.0
+
+    hhi = float((weights ** 2).sum())
+    order = np.argsort(-np.abs(weights))
+    largest = [(symbols[i], float(weights[i]), float(betas[i])) for i in order[:top]]
+
+    corr = np.corrcoef(asset_returns, rowvar=False).reshape(len(symbols), len(symbols))
+    shown = order[:top]
+    pairs = []
+    if len(symbols) > 1:
+        upper = np.triu_indices(len(symbols), k=1)
+        values = corr[upper]
+        for k in np.argsort(-values)[:5]:
+            i, j = upper[0][k], upper[1][k]
+            pairs.append((symbols[i], symbols[j], float(values[k])))
+
+    return {
+        'days': len(returns),
+        'confidence': confidence,
+        'gross': float(gross),
+        'net': float(net),
+        'hist_var': float(hist_var),
+        'hist_cvar': float(hist_cvar),
+        'param_var': float(param_var),
+        'param_cvar': float(param_cvar),
+        'volatility': sigma,
+        'beta': portfolio_beta,
+        'hhi': hhi,
+        'effective_positions': 1.0 / hhi if hhi else 0.0,
+        'largest': largest,
+        'corr_symbols': [symbols[i] for i in shown],
+        'corr_matrix': corr[np.ix_(shown, shown)].round(2).tolist(),
+        'top_pairs': pairs,
+    }
@@ -0,0 +1,313 @@
+import asyncio
+import datetime
+import inspect
+import logging
+import math
+import os
+import random
+import time
+from crontab import CronSlices
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline  # in ticks
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        # Dropped when its slot comes up; no search through the wheel
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel: levels of `slots` buckets, each level's bucket spanning a
+    whole turn of the level below. Scheduling and cancelling are O(1); a timer moves
+    down at most `levels - 1` times before it fires. Counts ticks only; the caller
+    decides what a tick is.
+    """
+
+    def __init__(self, slots: int = 256, levels: int = 4):
+        self.slots = slots
+        self.levels = levels
+        self.spans = [slots ** level for level in range(levels + 1)]
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.current = 0  # ticks elapsed
+
+    def add(self, timer: Timer):
+        delta = max(timer.deadline - self.current, 0)
+        for level in range(self.levels):
+            if delta < self.spans[level + 1]:
+                self.wheels[level][(timer.deadline // self.spans[level]) % self.slots].append(timer)
+                return timer
+        raise ValueError(f"Timer {delta} ticks out is beyond the wheel's horizon")
+
+    def advance(self, ticks: int):
+        """Move forward and return the timers that expired, in deadline order"""
+        expired = []
+        for _ in range(ticks):
+            self.current += 1
+            # Higher levels first: their timers may land in a lower bucket that cascades now too
+            for level in range(self.levels - 1, 0, -1):
+                if self.current % self.spans[level] == 0:
+                    bucket = self.wheels[level][(self.current // self.spans[level]) % self.slots]
+                    self.wheels[level][(self.current // self.spans[level]) % self.slots] = []
+                    for timer in bucket:
+                        if not timer.cancelled:
+                            self.add(timer)
+            slot = self.current % self.slots
+            bucket, self.wheels[0][slot] = self.wheels[0][slot], []
+            expired.extend(timer for timer in bucket if not timer.cancelled)
+        return expired
+
+
+def _cron_values(cron_slice):
+    values = set()
+    for part in cron_slice.parts:
+        values.update(part.range() if hasattr(part, 'range') else [int(part)])
+    return {0 if value == 7 else value for value in values} if cron_slice.max == 6 else values
+
+
+class CronTrigger:
+    """Next fire time for a five-field cron expression (parsed by python-crontab)"""
+
+    def __init__(self, expression: str, tz: datetime.tzinfo = None):
+        slices = CronSlices(expression)
+        self.expression = expression
+        self.tz = tz
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (_cron_values(s) for s in slices)
+        # Cron matches day-of-month OR day-of-week when both are restricted
+        self.either_day = slices[2].render() != '*' and slices[4].render() != '*'
+
+    def _day_matches(self, dt):
+        day = dt.day in self.days
+        weekday = (dt.weekday() + 1) % 7 in self.weekdays
+        return (day or weekday) if self.either_day else (day and weekday)
+
+    def next_after(self, dt: datetime.datetime) -> datetime.datetime:
+        dt = dt.astimezone(self.tz).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        for _ in range(100000):
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1) + datetime.timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(dt):
+                dt = (dt + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + datetime.timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += datetime.timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+
+class Job:
+    def __init__(self, name, func, kind, interval=None, cron=None, jitter=0.0, gate=None):
+        self.name = name
+        self.func = func
+        self.kind = kind or name
+        self.interval = interval
+        self.cron = cron
+        self.jitter = jitter
+        # gate(job, now) -> None to run, or the time to look again (e.g. the next market open)
+        self.gate = gate
+        self.last_run = None
+        self.due = None  # wall-clock time of the run the pending timer is for
+        self.timer = None
+        self.task = None
+        # Metrics
+        self.runs = 0
+        self.failures = 0
+        self.misfires = 0  # missed runs coalesced into one
+        self.skipped = 0   # runs skipped because the previous one was still going
+        self.gated = 0     # runs held back by the gate
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+
+    def next_due(self, after: float) -> float:
+        if self.cron is not None:
+            tz = self.cron.tz or datetime.timezone.utc
+            return self.cron.next_after(datetime.datetime.fromtimestamp(after, tz)).timestamp()
+        return after + self.interval
+
+
+class Scheduler:
+    """
+    Runs every periodic job and one-shot timer from a single timer wheel driven by one
+    task. Jobs are interval or cron; missed runs coalesce into one, a job never overlaps
+    itself, and each kind of job can be capped to a number of concurrent runs.
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 256, levels: int = 4):
+        self.tick = tick
+        self.wheel = TimerWheel(slots, levels)
+        self.jobs = {}  # {name: Job}
+        self.limits = {}  # {kind: Semaphore}
+        self.tasks = set()  # running job and timer tasks
+        self.origin = None
+        self.driver = None
+
+    def _ensure_started(self):
+        if self.driver is None:
+            self.origin = time.monotonic()
+            self.driver = asyncio.get_running_loop().create_task(self._drive(), name="scheduler")
+
+    async def _drive(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            target = int((time.monotonic() - self.origin) / self.tick)
+            for timer in self.wheel.advance(target - self.wheel.current):
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    logger.error("Error in timer callback %r: %s", timer.callback, e)
+
+    def call_later(self, delay: float, callback, *args) -> Timer:
+        """
+        One-shot timer in O(1), for per-user and per-symbol deadlines. A coroutine
+        function's result is run as a task. Accurate to one tick.
+        """
+        self._ensure_started()
+        if inspect.iscoroutinefunction(callback):
+            callback, args = self._spawn, (callback, *args)
+        deadline = math.ceil((time.monotonic() - self.origin + max(delay, 0)) / self.tick)
+        return self.wheel.add(Timer(max(deadline, self.wheel.current + 1), callback, args))
+
+    def _spawn(self, func, *args, name=None):
+        task = asyncio.get_running_loop().create_task(func(*args), name=name)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def set_limit(self, kind: str, concurrency: int):
+        """At most `concurrency` runs of jobs of this kind at once"""
+        self.limits[kind] = asyncio.Semaphore(concurrency)
+
+    def every(self, name: str, interval: float, func, *, kind: str = None, jitter: float = 0.0,
+              first: float = None, gate=None) -> Job:
+        """Run func() every `interval` seconds; the first run after `first` (default: interval)"""
+        job = Job(name, func, kind, interval=interval, jitter=jitter, gate=gate)
+        return self._add(job, time.time() + (interval if first is None else first))
+
+    def cron(self, name: str, expression: str, func, *, tz: datetime.tzinfo = None,
+             kind: str = None, jitter: float = 0.0, gate=None) -> Job:
+        """Run func() on a cron schedule ('m h dom mon dow'), in tz (default UTC)"""
+        job = Job(name, func, kind, cron=CronTrigger(expression, tz), jitter=jitter, gate=gate)
+        return self._add(job, job.next_due(time.time()))
+
+    def _add(self, job, due):
+        self.cancel(job.name)
+        self.jobs[job.name] = job
+        self._arm(job, due)
+        return job
+
+    def _arm(self, job, due):
+        job.due = due
+        delay = due - time.time() + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+        job.timer = self.call_later(delay, self._fire, job)
+
+    def _fire(self, job):
+        if self.jobs.get(job.name) is not job:
+            return
+        now = time.time()
+        if job.gate is not None:
+            wake = job.gate(job, now)
+            if wake is not None:
+                # Held back: look again at wake, and resume the cadence from there
+                job.gated += 1
+                self._arm(job, max(wake, now))
+                return
+        # Schedule the next run first, from the due time, so run time doesn't drift the schedule
+        due = job.next_due(job.due)
+        if due <= now and job.interval:
+            missed = int((now - due) // job.interval) + 1
+            job.misfires += missed
+            due += missed * job.interval
+        while due <= now:
+            job.misfires += 1
+            due = job.next_due(due)
+        self._arm(job, due)
+
+        if job.task is not None and not job.task.done():
+            job.skipped += 1
+            return
+        job.task = self._spawn(self._run, job, name=job.name)
+
+    async def _run(self, job):
+        limit = self.limits.get(job.kind)
+        if limit is not None:
+            await limit.acquire()
+        started = time.perf_counter()
+        job.last_run = time.time()
+        try:
+            await job.func()
+        except Exception as e:
+            job.failures += 1
+            logger.error("Job %s failed: %s", job.name, e)
+        finally:
+            elapsed = time.perf_counter() - started
+            job.runs += 1
+            job.last_time = elapsed
+            job.total_time += elapsed
+            job.max_time = max(job.max_time, elapsed)
+            if limit is not None:
+                limit.release()
+
+    def cancel(self, name: str):
+        job = self.jobs.pop(name, None)
+        if job is not None and job.timer is not None:
+            job.timer.cancel()
+        return job
+
+    async def shutdown(self):
+        """Stop the driver and cancel every running job, waiting for them to unwind"""
+        for job in list(self.jobs.values()):
+            self.cancel(job.name)
+        tasks = [task for task in (self.driver, *self.tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.driver = None
+
+    def summary(self) -> str:
+        if not self.jobs:
+            return "No jobs scheduled"
+        lines = [f"{'Job':<16} {'Runs':>5} {'Fail':>4} {'Miss':>4} {'Skip':>4} {'Gate':>4} {'Avg ms':>7} {'Max ms':>7}"]
+        for job in sorted(self.jobs.values(), key=lambda job: job.name):
+            average = job.total_time / job.runs * 1000 if job.runs else 0.0
+            lines.append(f"{job.name[:16]:<16} {job.runs:>5} {job.failures:>4} {job.misfires:>4} "
+                         f"{job.skipped:>4} {job.gated:>4} {average:>7.1f} {job.max_time * 1000:>7.1f}")
+        return "\n".join(lines)
+
+
+_scheduler = None
+
+# Concurrent runs allowed per job kind: digest fan-outs share Telegram's send rate, and
+# prefetches (news, symbol master, market hours) are background reads that can wait
+JOB_LIMITS = {
+    'digest': int(os.getenv("DIGEST_CONCURRENCY", "1")),
+    'prefetch': int(os.getenv("PREFETCH_CONCURRENCY", "2")),
+}
+
+
+def get_scheduler() -> Scheduler:
+    """The process's scheduler, shared by every handler and service"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(tick=float(os.getenv("SCHEDULER_TICK", "0.1")))
+        for kind, concurrency in JOB_LIMITS.items():
+            _scheduler.set_limit(kind, concurrency)
+    return _scheduler
+
+
+async def shutdown():
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.shutdown()
+        _scheduler = None
@@ -1,15 +1,51 @@
+import asyncio
+import datetime
 import logging
+import os
 from schwabdev import Client
+from bot.cache import TTLCache
+from bot.history import FREQUENCIES, PriceHistoryCache
+from bot.logs import request_context
+from bot.market_hours import MarketCalendar
+from bot.portfolio import account_label
+from bot.quotetable import QuoteTable, is_quote
+from bot.ratelimit import FairLimiter, TokenBucket
+from bot.scheduler import get_scheduler
+from bot.streaming import AccountActivityStream
+from bot.symbols import SymbolIndex
+from bot.tenants import ClientPool, authorize_url
 
 logger = logging.getLogger(__name__)
 
+# Symbols per quotes() request; keeps the query string well under URL limits
+QUOTE_BATCH_SIZE = 200
+
 
 class SchwabManager:
-    def __init__(self, app_key: str, app_secret: str, callback_url: str):
+    def __init__(self, app_key: str, app_secret: str, callback_url: str, quote_table: QuoteTable = None):
         self.app_key = app_key
         self.app_secret = app_secret
         self.callback_url = callback_url
         self.client = None
+        # Multi-tenant mode: account views and orders use each user's own linked Schwab account
+        self.tenants = ClientPool(app_key, app_secret, callback_url) if os.getenv("SCHWAB_MULTI_TENANT") == "1" else None
+        # Positions/balances are served from here until an account activity event invalidates them
+        self.account_cache = TTLCache(ttl=300, maxsize=int(os.getenv("ACCOUNT_CACHE_SIZE", "5000")))
+        self.activity = AccountActivityStream(self)
+        self.chain_cache = TTLCache(ttl=30, maxsize=200)
+        self.movers_cache = TTLCache(ttl=60, maxsize=20)
+        # Every quote fetched lands here, readable by other processes without API calls
+        self.quote_table = quote_table or QuoteTable.create()
+        self.symbols = SymbolIndex()
+        # Session state for gating background work; Schwab's hours with a local fallback
+        self.calendar = MarketCalendar(self)
+        # The app's Schwab request budget, shared round-robin between users once it runs dry
+        self.budget = FairLimiter(
+            float(os.getenv("SCHWAB_RATE", "2")), float(os.getenv("SCHWAB_BURST", "20"))
+        )
+        self.history = PriceHistoryCache(
+            self._fetch_price_history, os.getenv("PRICE_HISTORY_DIR", "data/history")
+        )
 
     async def initialize(self):
         try:
@@ -20,20 +56,271 @@ class SchwabManager:
             )
             logger.info("Schwab client initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize Schwab client: {e}")
+            logger.error("Failed to initialize Schwab client: %s", e)
             raise
+        if self.tenants is not None:
+            get_scheduler().every("tenant-evict", 60, self._evict_tenants)
+
+    async def load_symbols(self):
+        """Load the symbol master (local file first, else Schwab) and keep it refreshed daily"""
+        try:
+            if not await asyncio.to_thread(self.symbols.load_file):
+                await self.symbols.load_from_schwab(self)
+        except Exception as e:
+            logger.error("Failed to load symbol master: %s", e)
+        await self.symbols.start_refresh(self)
+
+    async def _cached(self, cache, key, fetch, ttl: float = None):
+        """Fresh entry, else a restored (stale) one awaiting revalidation, else fetch it"""
+        value = cache.get(key)
+        if value is None:
+            value = cache.get_stale(key)
+        if value is None:
+            value = await fetch()
+            if value:
+                cache.set(key, value, ttl)
+        return value
+
+    async def _call(self, method, *args, **kwargs):
+        """Run a blocking schwabdev call in a worker thread and decode its JSON body"""
+        context = request_context.get()
+        await self.budget.acquire(context.get('user_id') if context else None)
+        response = await asyncio.to_thread(method, *args, **kwargs)
+        if not response.ok:
+            logger.error("Schwab API %s failed: %s %s", method.__name__, response.status_code, response.text)
+            return None
+        return response.json()
+
+    @staticmethod
+    def _current_user():
+        context = request_context.get()
+        return context.get('user_id') if context else None
+
+    async def _account_client(self):
+        """The client for the current user's accounts: the app's own, or theirs in multi-tenant mode"""
+        if self.tenants is None:
+            return self.client
+        client = await self.tenants.get(self._current_user())
+        if client is None:
+            raise PermissionError("No Schwab account linked; use /link to connect yours")
+        await client.limiter.acquire()
+        return client
+
+    async def _account_call(self, name: str, *args):
+        return await self._call(getattr(await self._account_client(), name), *args)
+
+    def _linked_key(self):
+        return "linked" if self.tenants is None else ("linked", self._current_user())
+
+    @staticmethod
+    def _is_linked_key(key) -> bool:
+        return key == "linked" or (isinstance(key, tuple) and key[0] == "linked")
+
+    async def _evict_tenants(self):
+        self.tenants.evict_idle()
+
+    async def authorize_url(self):
+        """Where a user signs in to link their account, or None outside multi-tenant mode"""
+        return authorize_url(self.app_key, self.callback_url) if self.tenants is not None else None
+
+    async def link_account(self, user_id: int, redirect_url: str):
+        await asyncio.to_thread(self.tenants.link, user_id, redirect_url)
+        self.tenants.discard(user_id)
+        self.account_cache.invalidate(("linked", user_id))
+
+    async def unlink_account(self, user_id: int) -> bool:
+        self.account_cache.invalidate(("linked", user_id))
+        return await asyncio.to_thread(self.tenants.unlink, user_id)
+
+    async def is_linked(self, user_id: int) -> bool:
+        return self.tenants is None or await self.tenants.get(user_id) is not None
+
+    @staticmethod
+    def _only_quotes(data):
+        """Drop entries that are not quotes, such as the 'errors' list of invalid symbols"""
+        return {symbol: entry for symbol, entry in (data or {}).items() if is_quote(entry)}
 
     async def get_quote(self, symbol: str):
-        return await self.client.quote(symbol)
+        quote = self._only_quotes(await self._call(self.client.quote, symbol))
+        if quote:
+            self.quote_table.write(quote)
+        return quote or None
+
+    async def get_quotes(self, symbols):
+        """Quotes for many symbols in as few API calls as possible, as {symbol: quote data}"""
+        symbols = list(dict.fromkeys(symbols))
+        batches = await asyncio.gather(*[
+            self._call(self.client.quotes, symbols[i:i + QUOTE_BATCH_SIZE])
+            for i in range(0, len(symbols), QUOTE_BATCH_SIZE)
+        ])
+        quotes = {}
+        for batch in batches:
+            quotes.update(self._only_quotes(batch))
+        self.quote_table.write(quotes)
+        return quotes
+
+    async def get_cached_quotes(self, symbols, max_age: float = 5):
+        """Like get_quotes, but symbols quoted in the last few seconds are read from the quote table"""
+        quotes, missing = self.quote_table.get_quotes(list(dict.fromkeys(symbols)), max_age)
+        if missing:
+            quotes.update(await self.get_quotes(missing))
+        return quotes
+
+    async def get_option_chain(self, symbol: str, expiry: str = None):
+        """Option chain for one underlying (one expiry, or the next 60 days), cached briefly"""
+        return await self._cached(self.chain_cache, (symbol, expiry), lambda: self._fetch_option_chain(symbol, expiry))
+
+    async def _fetch_option_chain(self, symbol: str, expiry: str = None):
+        if expiry:
+            from_date = to_date = expiry
+        else:
+            today = datetime.date.today()
+            from_date, to_date = today.isoformat(), (today + datetime.timedelta(days=60)).isoformat()
+        return await self._call(
+            self.client.option_chains, symbol,
+            contractType="ALL",
+            includeUnderlyingQuote=True,
+            fromDate=from_date,
+            toDate=to_date,
+        )
+
+    async def search_instruments(self, symbol: str, projection: str = "symbol-search"):
+        return await self._call(self.client.instruments, symbol, projection)
 
     async def get_movers(self, index: str):
-        return await self.client.movers(index)
+        return await self._cached(self.movers_cache, index, lambda: self._call(self.client.movers, index))
+
+    async def get_price_history(self, symbol: str, start, end=None, frequency: str = "daily"):
+        """
+        Bars for symbol between start and end (datetimes or epoch ms) as a NumPy structured
+        array of history.BAR_DTYPE, served from the local cache and topped up from the API.
+        """
+        return await self.history.get(symbol, frequency, start, end)
+
+    async def _fetch_price_history(self, symbol: str, frequency: str, start_ms: int, end_ms: int):
+        period_type, frequency_type, frequency_value = FREQUENCIES[frequency][:3]
+        data = await self._call(
+            self.client.price_history, symbol,
+            periodType=period_type,
+            frequencyType=frequency_type,
+            frequency=frequency_value,
+            startDate=start_ms,
+            endDate=end_ms,
+        )
+        # None tells the cache the range was not fetched; an empty list means no bars in it
+        return None if data is None else data.get('candles', [])
 
     async def get_accounts(self):
-        return await self.client.account_linked()
+        return await self._cached(self.account_cache, self._linked_key(), lambda: self._account_call('account_linked'), ttl=3600)
 
     async def get_account_details(self, account_hash: str, fields: str = None):
-        return await self.client.account_details(account_hash, fields)
+        return await self._cached(
+            self.account_cache, (account_hash, fields),
+            lambda: self._account_call('account_details', account_hash, fields)
+        )
+
+    async def get_all_account_details(self, fields: str = None):
+        """Details for every linked account, fetched concurrently, as [(account, details)]"""
+        accounts = await self.get_accounts() or []
+        details = await asyncio.gather(
+            *[self.get_account_details(account['hashValue'], fields) for account in accounts],
+            return_exceptions=True
+        )
+        results = []
+        for account, result in zip(accounts, details):
+            if isinstance(result, Exception):
+                logger.error("Error fetching account %s: %s", account_label(account.get('accountNumber', '')), result)
+                result = None
+            results.append((account, result))
+        return results
+
+    async def get_market_hours(self, markets, date: datetime.date):
+        """Session hours of the given markets ('equity', 'option', ...) on one date"""
+        return await self._call(self.client.market_hours, list(markets), date.isoformat())
+
+    async def get_order_events(self, after: int = 0, limit: int = 500):
+        """One page of order events from the account activity stream (seq > after), oldest first"""
+        if self.tenants is not None:
+            return []  # the stream follows the app's own account, not the users'
+        return self.activity.events_after(after, limit)
+
+    async def get_api_usage(self):
+        """{user_id (None for background work): [API calls, calls that queued]}"""
+        return {flow: [count, self.budget.delayed[flow]] for flow, count in self.budget.granted.items()}
+
+    async def get_account_hash(self, account_number: str):
+        """Map a plain account number (as sent by the streamer) to its hash value"""
+        for account in await self.get_accounts() or []:
+            if str(account.get('accountNumber')) == str(account_number):
+                return account['hashValue']
+        return None
+
+    def invalidate_account(self, account_hash: str = None):
+        """Forget cached positions/balances for one account, or all of them"""
+        self.account_cache.invalidate_where(
+            lambda key: not self._is_linked_key(key) and (account_hash is None or key[0] == account_hash)
+        )
+
+    def _caches(self):
+        return {'accounts': self.account_cache, 'chains': self.chain_cache, 'movers': self.movers_cache}
+
+    def snapshot_state(self):
+        """(picklable cache contents, arrays) for a warm-restart snapshot"""
+        state = {name: cache.items() for name, cache in self._caches().items()}
+        state['activity'] = {
+            'account_chats': self.activity.account_chats,
+            'notified': self.activity.notified(),
+            'events': list(self.activity.events),
+        }
+        return state, {'quotes': self.quote_table.export()}
+
+    def restore_snapshot(self, state, arrays):
+        """Restore cached data as stale; revalidate() refreshes it afterwards"""
+        for name, cache in self._caches().items():
+            cache.restore(state.get(name, []))
+        activity = state.get('activity', {})
+        self.activity.account_chats.update(activity.get('account_chats', {}))
+        for key in activity.get('notified', []):
+            self.activity.mark_notified(key)
+        self.activity.restore_events(activity.get('events', []))
+        if 'quotes' in arrays:
+            # Rows keep their original timestamps, so they read as stale until re-quoted
+            self.quote_table.restore(arrays['quotes'])
+
+    async def revalidate(self, rate: float = 2.0):
+        """Refresh restored entries one at a time within a request budget"""
+        limiter = TokenBucket(rate)
+        refreshed = 0
+        for name, cache in self._caches().items():
+            for key in cache.stale_keys():
+                await limiter.acquire()
+                if cache.get_stale(key) is None:
+                    continue  # already refreshed or invalidated meanwhile
+                if name == 'accounts' and self.tenants is not None:
+                    # Whose account an entry belongs to isn't recorded; refetch on demand instead
+                    cache.invalidate(key)
+                    continue
+                try:
+                    if name == 'accounts':
+                        if key == "linked":
+                            value, ttl = await self._call(self.client.account_linked), 3600
+                        else:
+                            value, ttl = await self._call(self.client.account_details, *key), None
+                    elif name == 'chains':
+                        value, ttl = await self._fetch_option_chain(*key), None
+                    else:
+                        value, ttl = await self._call(self.client.movers, key), None
+                    if value:
+                        cache.set(key, value, ttl)
+                        refreshed += 1
+                    else:
+                        cache.invalidate(key)
+                except Exception as e:
+                    logger.error("Error revalidating %s %s: %s", name, key, e)
+                    cache.invalidate(key)
+        logger.info("Revalidated %s restored cache entries", refreshed)
 
-    async def place_order(self, account_hash: str, order_data: dict):
-        return await self.client.place_order(account_hash, order_data)
\ No newline at end of file
+    def close(self):
+        if self.tenants is not None:
+            self.tenants.close()
+        self.quote_table.close()
@@ -0,0 +1,68 @@
+import logging
+import os
+import pickle
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "state.pkl"
+
+
+class SnapshotStore:
+    """
+    Warm-restart snapshot on disk: NumPy arrays as .npy files (memory-mapped on load, so a
+    large quote table is not read up front) plus one pickle of the remaining state.
+    Every file is written to a temporary name and renamed into place.
+    """
+
+    def __init__(self, directory: str = None, max_age: float = None):
+        self.directory = directory or os.getenv("SNAPSHOT_DIR", "data/snapshot")
+        # Older snapshots are ignored rather than restored
+        self.max_age = max_age or float(os.getenv("SNAPSHOT_MAX_AGE", str(24 * 3600)))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def save(self, state_bytes: bytes, arrays: dict):
+        """Write a snapshot; state_bytes is the already-pickled state (see dump_state)"""
+        os.makedirs(self.directory, exist_ok=True)
+        for name, array in arrays.items():
+            tmp_path = self._path(f"{name}.npy.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(tmp_path, self._path(f"{name}.npy"))
+        # The state file goes last and names the arrays, so a crash mid-save leaves the old set
+        tmp_path = self._path(STATE_FILE + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(state_bytes)
+        os.replace(tmp_path, self._path(STATE_FILE))
+
+    def load(self):
+        """(state, {name: memory-mapped array}), or (None, {}) when there is no usable snapshot"""
+        path = self._path(STATE_FILE)
+        if not os.path.exists(path):
+            return None, {}
+        try:
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+            age = time.time() - snapshot['saved_at']
+            if age > self.max_age:
+                logger.info("Ignoring snapshot from %.1f hours ago", age / 3600)
+                return None, {}
+            arrays = {
+                name: np.load(self._path(f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+                for name in snapshot['arrays']
+            }
+            return snapshot['state'], arrays
+        except Exception as e:
+            logger.error("Could not read snapshot in %s: %s", self.directory, e)
+            return None, {}
+
+
+def dump_state(state: dict, array_names) -> bytes:
+    """Pickle state on the event loop thread so it is a consistent copy before the write"""
+    return pickle.dumps(
+        {'saved_at': time.time(), 'arrays': list(array_names), 'state': state},
+        protocol=pickle.HIGHEST_PROTOCOL
+    )
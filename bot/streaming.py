@@ -0,0 +1,220 @@
+import asyncio
+import bisect
+import collections
+import itertools
+import json
+import os
+import time
+import logging
+from bot.market_hours import EXTENDED
+from bot.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Order events kept for /export, newest last; older ones are dropped
+ORDER_EVENT_LIMIT = int(os.getenv("ORDER_EVENT_LIMIT", "10000"))
+# (order, outcome) pairs remembered so a replayed frame notifies once; oldest forgotten first
+NOTIFIED_LIMIT = int(os.getenv("NOTIFIED_LIMIT", "5000"))
+
+EVENT_TITLES = {
+    'fill': "✅ *Order Filled*",
+    'partial_fill': "🟡 *Order Partially Filled*",
+    'cancel': "🚫 *Order Cancelled*",
+    'reject': "❌ *Order Rejected*",
+}
+
+
+# Terminal ACCT_ACTIVITY message types, in both the legacy and the current Schwab naming.
+# Requests such as OrderCancelRequest or CancelReplaceRequest are not outcomes and are ignored.
+ACTIVITY_KINDS = {
+    'orderfill': 'fill',
+    'orderfillcompleted': 'fill',
+    'orderpartialfill': 'partial_fill',
+    'orderrejection': 'reject',
+    'orderrejected': 'reject',
+    'urout': 'cancel',
+    'orderuroutcompleted': 'cancel',
+}
+
+
+def classify_activity(message_type: str):
+    """Map a Schwab ACCT_ACTIVITY message type to fill/partial_fill/cancel/reject (or None)"""
+    return ACTIVITY_KINDS.get((message_type or "").lower())
+
+
+def _find_value(obj, names):
+    """Depth-first search of a decoded message body for the first key in names"""
+    if isinstance(obj, dict):
+        for name in names:
+            if obj.get(name) not in (None, ""):
+                return obj[name]
+        for value in obj.values():
+            found = _find_value(value, names)
+            if found is not None:
+                return found
+    elif isinstance(obj, list):
+        for value in obj:
+            found = _find_value(value, names)
+            if found is not None:
+                return found
+    return None
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_activity(raw: str):
+    """Turn one raw streamer frame into a list of order events"""
+    try:
+        frame = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+
+    events = []
+    for data in frame.get('data', []):
+        if data.get('service') != 'ACCT_ACTIVITY':
+            continue
+        for content in data.get('content', []):
+            kind = classify_activity(content.get('2'))
+            if kind is None:
+                continue
+            try:
+                body = json.loads(content.get('3') or "{}")
+            except ValueError:
+                body = {}
+            events.append({
+                'kind': kind,
+                'account': str(content.get('1', '')),
+                'message_type': content.get('2'),
+                'order_id': str(_find_value(body, ('SchwabOrderID', 'OrderID', 'orderId')) or ''),
+                'symbol': _find_value(body, ('Symbol', 'symbol')),
+                'quantity': _as_float(_find_value(body, ('ExecutionQuantity', 'LastFillQuantity', 'Quantity', 'quantity'))),
+                'price': _as_float(_find_value(body, ('ExecutionPrice', 'LastFillPrice', 'Price', 'price'))),
+            })
+    return events
+
+
+class AccountActivityStream:
+    """Pushes order status changes from Schwab's ACCT_ACTIVITY stream to the owning chats"""
+
+    def __init__(self, schwab_manager):
+        self.schwab = schwab_manager
+        self.bot = None
+        self.loop = None
+        self.account_chats = {}  # {account_number: {chat_ids}}
+        self._notified = set()  # {(order_id, kind)} so repeated frames notify once
+        self._notified_order = collections.deque()  # the same keys, oldest first, to bound the set
+        self.events = collections.deque(maxlen=ORDER_EVENT_LIMIT)  # recent order events, oldest first, for /export
+        self._seq = itertools.count(1)  # event 'seq' numbers, so /export can page through a moving log
+        self.session_timer = None
+
+    def watch_account(self, account_number: str, chat_id: int):
+        self.account_chats.setdefault(str(account_number), set()).add(chat_id)
+
+    async def start(self, bot):
+        """Subscribe to account activity; events are delivered from the streamer thread"""
+        self.bot = bot
+        self.loop = asyncio.get_running_loop()
+        stream = self.schwab.client.stream
+        # Building the request fetches streamer info over HTTP, so keep it off the loop
+        request = await asyncio.to_thread(stream.account_activity)
+        await stream.send_async(request)
+        logger.info("Subscribed to account activity stream")
+        self._follow_sessions()
+
+    def _follow_sessions(self):
+        """
+        Keep the streamer connected only while equities trade (extended hours included),
+        checking again at the next session boundary. Subscriptions are kept across stops
+        and replayed by the streamer when it reconnects.
+        """
+        client = self.schwab.client
+        if client is None:
+            return
+        calendar = self.schwab.calendar
+        now = time.time()
+        if calendar.in_session('equity', EXTENDED, now):
+            if not client.stream.active:
+                client.stream.start(receiver=self._receive)
+                logger.info("Account activity stream connected for the session")
+        elif client.stream.active:
+            client.stream.stop(clear_subscriptions=False)
+            logger.info("Account activity stream paused until the next session")
+        self.session_timer = get_scheduler().call_later(
+            calendar.next_change('equity', now) - now, self._follow_sessions
+        )
+
+    def notified(self):
+        """Notified (order_id, kind) keys, oldest first, for snapshots"""
+        return list(self._notified_order)
+
+    def mark_notified(self, key) -> bool:
+        """Remember key; False if it was already notified"""
+        if key in self._notified:
+            return False
+        self._notified.add(key)
+        self._notified_order.append(key)
+        while len(self._notified_order) > NOTIFIED_LIMIT:
+            self._notified.discard(self._notified_order.popleft())
+        return True
+
+    def events_after(self, after: int = 0, limit: int = 500):
+        """Up to limit events with seq greater than after, oldest first"""
+        start = bisect.bisect_right(self.events, after, key=lambda event: event['seq'])
+        return list(itertools.islice(self.events, start, start + limit))
+
+    def restore_events(self, events):
+        """Put snapshotted events ahead of any received since, renumbering them all"""
+        combined = list(events) + list(self.events)
+        self.events = collections.deque(combined, maxlen=ORDER_EVENT_LIMIT)
+        self._seq = itertools.count(1)
+        for event in self.events:
+            event['seq'] = next(self._seq)
+
+    def stop(self):
+        if self.session_timer is not None:
+            self.session_timer.cancel()
+            self.session_timer = None
+        if self.schwab.client is not None and self.schwab.client.stream.active:
+            self.schwab.client.stream.stop()
+
+    def _receive(self, raw):
+        """Streamer thread callback: parse here, then hand events to the event loop"""
+        for event in parse_activity(raw):
+            asyncio.run_coroutine_threadsafe(self._handle_event(event), self.loop)
+
+    async def _handle_event(self, event):
+        event['received_at'] = time.time()
+        event['seq'] = next(self._seq)
+        self.events.append(event)
+        account_hash = await self.schwab.get_account_hash(event['account'])
+        self.schwab.invalidate_account(account_hash)
+
+        if event['order_id'] and event['kind'] != 'partial_fill':
+            if not self.mark_notified((event['order_id'], event['kind'])):
+                return
+
+        chat_ids = self.account_chats.get(event['account'], set())
+        if not chat_ids or self.bot is None:
+            logger.info("Account activity %s with no subscribed chat", event['message_type'])
+            return
+
+        message = f"{EVENT_TITLES[event['kind']]}\n\n"
+        if event['symbol']:
+            message += f"Symbol: {event['symbol']}\n"
+        if event['quantity'] is not None:
+            message += f"Shares: {event['quantity']:g}\n"
+        if event['price'] is not None:
+            message += f"Price: ${event['price']:.2f}\n"
+        if event['order_id']:
+            message += f"Order ID: {event['order_id']}\n"
+
+        for chat_id in chat_ids:
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=message, parse_mode='Markdown')
+            except Exception as e:
+                logger.error("Error sending order notification to %s: %s", chat_id, e)
@@ -0,0 +1,132 @@
+import asyncio
+import csv
+import difflib
+import logging
+import os
+import string
+import numpy as np
+from bot.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+UNINDEXED_PREFIXES = ('$', '/')
+
+
+class SymbolIndex:
+    """
+    In-memory symbol master: tickers sorted in a NumPy array (names aligned with them) for
+    O(log n) membership and prefix lookups, plus name search and typo suggestions.
+    Until something is loaded every symbol is accepted, so the bot still works without it.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("SYMBOL_MASTER_FILE", "data/symbols.csv")
+        self.tickers = np.array([], dtype='<U32')
+        self.names = np.array([], dtype='<U64')
+        self.names_upper = self.names
+        self.refresh_job = None
+
+    @property
+    def loaded(self) -> bool:
+        return len(self.tickers) > 0
+
+    def _set(self, rows):
+        """Replace the index in one assignment so readers never see a half-built index"""
+        rows = sorted({symbol.upper(): name for symbol, name in rows if symbol}.items())
+        tickers = np.array([symbol for symbol, _ in rows], dtype='<U32')
+        names = np.array([name or "" for _, name in rows], dtype='<U64')
+        self.tickers, self.names, self.names_upper = tickers, names, np.char.upper(names)
+
+    def load_file(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, newline='') as f:
+            self._set((row[0], row[1] if len(row) > 1 else "") for row in csv.reader(f) if row)
+        logger.info("Loaded %s symbols from %s", len(self.tickers), self.path)
+        return True
+
+    def save_file(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', newline='') as f:
+            csv.writer(f).writerows(zip(self.tickers.tolist(), self.names.tolist()))
+        os.replace(tmp_path, self.path)
+
+    async def load_from_schwab(self, schwab) -> bool:
+        """
+        Rebuild the index from Schwab instrument searches (one regex query per letter).
+        All or nothing: if any letter fails, the current index and file are kept, since a
+        partial index would reject real tickers.
+        """
+        rows = []
+        for letter in string.ascii_uppercase:
+            data = await schwab.search_instruments(f"{letter}.*", "symbol-regex")
+            if data is None:
+                logger.warning("Symbol master refresh failed at %s; keeping the current index", letter)
+                return False
+            for instrument in data.get('instruments', []):
+                rows.append((instrument.get('symbol'), instrument.get('description', '')))
+        if not rows:
+            return False
+        self._set(rows)
+        await asyncio.to_thread(self.save_file)
+        logger.info("Loaded %s symbols from Schwab instruments", len(self.tickers))
+        return True
+
+    def is_valid(self, symbol: str) -> bool:
+        # Indices ($SPX) and futures (/ES) are not in the instrument search; let Schwab judge them
+        if not self.loaded or symbol.startswith(UNINDEXED_PREFIXES):
+            return True
+        i = np.searchsorted(self.tickers, symbol)
+        return i < len(self.tickers) and self.tickers[i] == symbol
+
+    def name(self, symbol: str) -> str:
+        i = np.searchsorted(self.tickers, symbol)
+        if i < len(self.tickers) and self.tickers[i] == symbol:
+            return str(self.names[i])
+        return ""
+
+    def prefix(self, prefix: str, limit: int = 10):
+        """Tickers starting with prefix, in sorted order"""
+        prefix = prefix.upper()
+        lo = np.searchsorted(self.tickers, prefix, side='left')
+        hi = np.searchsorted(self.tickers, prefix + '\uffff', side='left')
+        return self.tickers[lo:min(hi, lo + limit)].tolist()
+
+    def search(self, query: str, limit: int = 10):
+        """Ticker prefix matches first, then company names containing the query"""
+        query = query.upper().strip()
+        if not query or not self.loaded:
+            return []
+        results = self.prefix(query, limit)
+        if len(results) < limit:
+            hits = np.flatnonzero(np.char.find(self.names_upper, query) >= 0)
+            for i in hits[:limit * 2]:
+                ticker = str(self.tickers[i])
+                if ticker not in results:
+                    results.append(ticker)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def suggest(self, symbol: str, limit: int = 3):
+        """Likely intended tickers for a typo, ranked by similarity"""
+        symbol = symbol.upper()
+        # Compare against tickers sharing the first letter (plus name matches) instead of all
+        candidates = set(self.prefix(symbol[:1], limit=5000)) | set(self.search(symbol, limit=5))
+        return difflib.get_close_matches(symbol, list(candidates), n=limit, cutoff=0.6)
+
+    def rejection(self, symbol: str) -> str:
+        """User-facing reply for an unknown symbol"""
+        suggestions = self.suggest(symbol)
+        message = f"❌ Unknown symbol {symbol}"
+        if suggestions:
+            message += f"\nDid you mean: {', '.join(suggestions)}?"
+        return message
+
+    async def start_refresh(self, schwab, interval: float = 24 * 3600):
+        """Refresh from Schwab once a day in the background"""
+        if self.refresh_job is None:
+            self.refresh_job = get_scheduler().every(
+                "symbol-refresh", interval, lambda: self.load_from_schwab(schwab), kind="prefetch"
+            )
@@ -0,0 +1,213 @@
+import asyncio
+import base64
+import collections
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import requests
+from cryptography.fernet import Fernet, InvalidToken
+from requests.adapters import HTTPAdapter
+from bot.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.schwabapi.com"
+# Schwab's access tokens last 30 minutes and refresh tokens 7 days
+REFRESH_TOKEN_LIFETIME = 7 * 24 * 3600
+LINK_EXPIRED = "Your Schwab link has expired; use /link to reconnect your account"
+
+
+def authorize_url(app_key: str, callback_url: str) -> str:
+    query = urllib.parse.urlencode({'client_id': app_key, 'redirect_uri': callback_url})
+    return f"{API_URL}/v1/oauth/authorize?{query}"
+
+
+def code_from_redirect(url: str) -> str:
+    """The authorization code from the address Schwab redirected the user to"""
+    codes = urllib.parse.parse_qs(urllib.parse.urlparse(url.strip()).query).get('code')
+    if not codes:
+        raise ValueError("That address has no authorization code; paste the full address you were sent to")
+    return codes[0]
+
+
+class TokenVault:
+    """Per-user OAuth tokens on disk, one Fernet-encrypted file each, read only when needed"""
+
+    def __init__(self, directory: str, key: str):
+        if not key:
+            raise ValueError("TOKEN_ENCRYPTION_KEY is required in multi-tenant mode (see Fernet.generate_key())")
+        self.directory = directory
+        self.fernet = Fernet(key)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"{int(user_id)}.token")
+
+    def load(self, user_id: int):
+        try:
+            with open(self._path(user_id), 'rb') as f:
+                return json.loads(self.fernet.decrypt(f.read()))
+        except FileNotFoundError:
+            return None
+        except InvalidToken:
+            logger.error("Stored tokens for user %s could not be decrypted", user_id)
+            return None
+
+    def save(self, user_id: int, tokens: dict):
+        """Write atomically, readable by this user only"""
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.fernet.encrypt(json.dumps(tokens).encode()))
+        os.chmod(path, 0o600)
+        os.replace(path, self._path(user_id))
+
+    def delete(self, user_id: int) -> bool:
+        try:
+            os.remove(self._path(user_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+class TenantClient:
+    """
+    One user's Schwab session: their tokens, a keep-alive connection pool of at most
+    two sockets and their own request rate. Blocking, like schwabdev.Client, whose
+    method names and arguments it mirrors for the account endpoints.
+    """
+
+    def __init__(self, pool, user_id: int, tokens: dict, rate: float, timeout: float = 10):
+        self.pool = pool
+        self.user_id = user_id
+        self.tokens = tokens
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate, max(rate * 5, 1.0))
+        self.last_used = time.monotonic()
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._lock = threading.Lock()
+
+    def _headers(self):
+        with self._lock:
+            if self.tokens['access_expires'] - 60 < time.time():
+                self.tokens = self.pool.refresh_tokens(self.user_id, self.tokens)
+            return {'Authorization': f"Bearer {self.tokens['access_token']}"}
+
+    def account_linked(self) -> requests.Response:
+        return self.session.get(f"{API_URL}/trader/v1/accounts/accountNumbers",
+                                headers=self._headers(), timeout=self.timeout)
+
+    def account_details(self, accountHash: str, fields: str = None) -> requests.Response:
+        return self.session.get(f"{API_URL}/trader/v1/accounts/{accountHash}", headers=self._headers(),
+                                params={'fields': fields} if fields else None, timeout=self.timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class ClientPool:
+    """
+    Per-user clients for multi-tenant mode, created on first use from the vault and
+    kept in LRU order: past max_size the least recently used is closed, and clients
+    idle for idle_ttl are closed by a periodic sweep. Memory and open connections are
+    bounded by max_size however many users have linked accounts.
+    """
+
+    def __init__(self, app_key: str, app_secret: str, callback_url: str, vault: TokenVault = None,
+                 max_size: int = None, idle_ttl: float = None, rate: float = None):
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self.callback_url = callback_url
+        self.vault = vault or TokenVault(os.getenv("TENANT_TOKEN_DIR", "data/tenants"), os.getenv("TOKEN_ENCRYPTION_KEY"))
+        self.max_size = max_size or int(os.getenv("TENANT_POOL_SIZE", "200"))
+        self.idle_ttl = idle_ttl or float(os.getenv("TENANT_IDLE_TTL", "900"))
+        self.rate = rate or float(os.getenv("TENANT_RATE", "2"))
+        self.clients = collections.OrderedDict()  # {user_id: TenantClient}, least recently used first
+        self.evicted = 0
+
+    async def get(self, user_id):
+        """The user's client, or None if they have not linked an account"""
+        if user_id is None:
+            return None
+        client = self.clients.get(user_id)
+        if client is None:
+            tokens = await asyncio.to_thread(self.vault.load, user_id)
+            if tokens is None:
+                return None
+            # Another request may have loaded it while this one read the vault
+            client = self.clients.get(user_id) or TenantClient(self, user_id, tokens, self.rate)
+            self.clients[user_id] = client
+            while len(self.clients) > self.max_size:
+                self._close(*self.clients.popitem(last=False))
+        self.clients.move_to_end(user_id)
+        client.last_used = time.monotonic()
+        return client
+
+    def _close(self, user_id, client):
+        client.close()
+        self.evicted += 1
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self.clients:
+            user_id, client = next(iter(self.clients.items()))
+            if client.last_used > cutoff:
+                break
+            del self.clients[user_id]
+            self._close(user_id, client)
+
+    def _post_token(self, data: dict) -> dict:
+        credentials = base64.b64encode(f"{self.app_key}:{self.app_secret}".encode()).decode()
+        response = requests.post(
+            f"{API_URL}/v1/oauth/token", data=data, timeout=10,
+            headers={'Authorization': f"Basic {credentials}", 'Content-Type': "application/x-www-form-urlencoded"},
+        )
+        if not response.ok:
+            logger.error("Schwab token request failed: %s %s", response.status_code, response.text)
+            return None
+        body = response.json()
+        return {
+            'access_token': body['access_token'],
+            'refresh_token': body.get('refresh_token', data.get('refresh_token')),
+            'access_expires': time.time() + body.get('expires_in', 1800),
+        }
+
+    def link(self, user_id: int, redirect_url: str):
+        """Exchange the code in the redirect address for tokens and store them. Blocking."""
+        tokens = self._post_token({
+            'grant_type': 'authorization_code', 'code': code_from_redirect(redirect_url),
+            'redirect_uri': self.callback_url,
+        })
+        if tokens is None:
+            raise ValueError("Schwab did not accept that code; codes expire quickly, so try /link again")
+        tokens['refresh_expires'] = time.time() + REFRESH_TOKEN_LIFETIME
+        self.vault.save(user_id, tokens)
+
+    def refresh_tokens(self, user_id: int, tokens: dict) -> dict:
+        """A new access token from the refresh token, saved for next time. Blocking."""
+        if tokens.get('refresh_expires', 0) < time.time():
+            raise PermissionError(LINK_EXPIRED)
+        fresh = self._post_token({'grant_type': 'refresh_token', 'refresh_token': tokens['refresh_token']})
+        if fresh is None:
+            raise PermissionError(LINK_EXPIRED)
+        fresh['refresh_expires'] = tokens['refresh_expires']
+        self.vault.save(user_id, fresh)
+        return fresh
+
+    def discard(self, user_id: int):
+        """Close a user's cached client, e.g. after their tokens were replaced"""
+        client = self.clients.pop(user_id, None)
+        if client is not None:
+            self._close(user_id, client)
+
+    def unlink(self, user_id: int) -> bool:
+        self.discard(user_id)
+        return self.vault.delete(user_id)
+
+    def close(self):
+        while self.clients:
+            self._close(*self.clients.popitem(last=False))
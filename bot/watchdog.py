@@ -0,0 +1,112 @@
+import asyncio
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is open-ended
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LoopWatchdog:
+    """
+    Always-on event-loop lag monitor. A task on the loop measures how late its own timer
+    fires (into a histogram); a sampler thread notices when the loop stops ticking for
+    longer than the threshold and logs the loop thread's stack together with the command
+    (or background task) that was running, while it is still blocked.
+    """
+
+    def __init__(self, threshold: float = None, interval: float = 0.1, debug: bool = None):
+        self.threshold = threshold or float(os.getenv("LOOP_LAG_THRESHOLD", "0.25"))
+        self.interval = interval
+        self.debug = debug if debug is not None else os.getenv("LOOP_WATCHDOG_DEBUG") == "1"
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.labels = weakref.WeakKeyDictionary()  # {asyncio.Task: command being handled}
+        self.loop = None
+        self.task = None
+        self._heartbeat = 0.0
+        self._loop_thread_id = None
+        self._reported = None  # heartbeat of the stall already sampled
+
+    def start(self):
+        if self.task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        if self.debug:
+            # asyncio's own report of every callback slower than the threshold
+            self.loop.set_debug(True)
+            self.loop.slow_callback_duration = self.threshold
+        self.task = asyncio.create_task(self._tick(), name="loop-watchdog")
+        threading.Thread(target=self._sample, name="loop-watchdog", daemon=True).start()
+
+    def label(self, text: str):
+        """Name the current task for stall reports (e.g. the command it is handling)"""
+        task = asyncio.current_task()
+        if task is not None:
+            self.labels[task] = text
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.record(max(now - expected, 0.0))
+
+    def record(self, lag: float):
+        self.counts[bisect.bisect_left(LAG_BUCKETS_MS, lag * 1000)] += 1
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.threshold:
+            self.stalls += 1
+            logger.warning("Event loop was blocked for %.0f ms", lag * 1000)
+
+    def _sample(self):
+        """Sampler thread: captures the loop's stack while it is blocked"""
+        while True:
+            time.sleep(self.threshold / 2)
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat
+            if blocked < self.threshold or self._reported == heartbeat:
+                continue
+            self._reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            task = asyncio.current_task(self.loop)
+            where = self.labels.get(task) if task is not None else None
+            if where is None:
+                where = task.get_name() if task is not None else "loop callback"
+            stack = "".join(traceback.format_stack(frame, limit=20))
+            logger.warning("Event loop blocked for %.0f ms in %s:\n%s", blocked * 1000, where, stack)
+
+    def histogram(self):
+        """[(bucket label, count)] of observed lags"""
+        labels = [f"≤{bound}ms" for bound in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}ms"]
+        return list(zip(labels, self.counts))
+
+    def summary(self) -> str:
+        total = sum(self.counts) or 1
+        lines = [f"{label:>9} {count:>8} {count * 100 / total:5.1f}%" for label, count in self.histogram() if count]
+        lines.append(f"max {self.max_lag * 1000:.0f} ms, {self.stalls} stalls over {self.threshold * 1000:.0f} ms")
+        return "\n".join(lines)
+
+
+def describe_update(update) -> str:
+    """Short name for what an update asks the bot to do, for stall reports"""
+    if getattr(update, 'message', None) and update.message.text:
+        return update.message.text.split()[0]
+    if getattr(update, 'callback_query', None):
+        return f"callback {update.callback_query.data}"
+    if getattr(update, 'inline_query', None):
+        return "inline query"
+    return "update"
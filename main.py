@@ -6,9 +6,11 @@ from dotenv import load_dotenv
 
 # Apply nest_asyncio to allow nested event loops
 nest_asyncio.apply()
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+from telegram.ext import (
+    Application, ApplicationHandlerStop, CommandHandler, CallbackQueryHandler, InlineQueryHandler, TypeHandler
+)
 from telegram import Update
-from bot.auth import AuthManager
+from bot.auth import AuthManager, command_class, describe_wait
 from bot.schwab_client import SchwabManager
 from bot.handlers.quotes import QuoteHandler
 from bot.handlers.orders import OrderHandler
@@ -17,42 +19,155 @@ from bot.handlers.movers import MoversHandler
 from bot.handlers.alerts import AlertHandler
 from bot.handlers.watchlist import WatchlistHandler
 from bot.handlers.news import NewsHandler
+from bot.handlers.charts import ChartHandler
+from bot.handlers.options import OptionsHandler
+from bot.handlers.inline import InlineHandler
+from bot.handlers.digest import DigestHandler
+from bot.handlers.risk import RiskHandler
+from bot.handlers.backtest import BacktestHandler
+from bot.handlers.export import ExportHandler
+from bot.handlers.quota import QuotaHandler
+from bot.handlers.live import LiveHandler
+from bot.handlers.link import LinkHandler
 from bot.handlers.base import BaseHandler
+from bot.watchdog import LoopWatchdog, describe_update
+from bot.admission import AdmissionProcessor
+from bot.paper import PaperBroker
+from bot.snapshot import SnapshotStore, dump_state
+from bot.logs import bind_request, configure_logging
+from bot.scheduler import get_scheduler, shutdown as shutdown_scheduler
+from bot.compute import shutdown as shutdown_compute
 
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 
 class TradingBot:
     def __init__(self, telegram_token: str, schwab_app_key: str, schwab_app_secret: str,
-                 schwab_callback_url: str):
+                 schwab_callback_url: str, schwab_manager=None, snapshot_dir: str = None):
         self.telegram_token = telegram_token
+        self.application = None
         self.auth_manager = AuthManager()
-        self.schwab_manager = SchwabManager(schwab_app_key, schwab_app_secret, schwab_callback_url)
+        # Cluster workers pass a RemoteSchwabManager that talks to the market-data process
+        self.schwab_manager = schwab_manager or SchwabManager(schwab_app_key, schwab_app_secret, schwab_callback_url)
 
         # Initialize handlers
         self.quote_handler = QuoteHandler(self.schwab_manager, self.auth_manager)
-        self.order_handler = OrderHandler(self.schwab_manager, self.auth_manager)
-        self.portfolio_handler = PortfolioHandler(self.schwab_manager, self.auth_manager)
+        self.live_handler = LiveHandler(self.schwab_manager, self.auth_manager)
+        # Simulated accounts for /paper, shared by the order and portfolio views
+        self.paper = PaperBroker()
+        self.order_handler = OrderHandler(self.schwab_manager, self.auth_manager, self.paper)
+        self.portfolio_handler = PortfolioHandler(self.schwab_manager, self.auth_manager, self.paper)
         self.movers_handler = MoversHandler(self.schwab_manager, self.auth_manager)
         self.alert_handler = AlertHandler(self.schwab_manager, self.auth_manager)
         self.watchlist_handler = WatchlistHandler(self.schwab_manager, self.auth_manager)
         self.news_handler = NewsHandler(self.schwab_manager, self.auth_manager)
+        self.chart_handler = ChartHandler(self.schwab_manager, self.auth_manager)
+        self.options_handler = OptionsHandler(self.schwab_manager, self.auth_manager)
+        self.inline_handler = InlineHandler(self.schwab_manager, self.auth_manager)
+        self.risk_handler = RiskHandler(self.schwab_manager, self.auth_manager)
+        self.backtest_handler = BacktestHandler(self.schwab_manager, self.auth_manager, self.watchlist_handler.watchlists)
+        self.export_handler = ExportHandler(self.schwab_manager, self.auth_manager, self.paper, self.alert_handler.history)
+        self.digest_handler = DigestHandler(self.schwab_manager, self.auth_manager, self.watchlist_handler.watchlists)
+        self.quota_handler = QuotaHandler(self.schwab_manager, self.auth_manager)
+        self.link_handler = LinkHandler(self.schwab_manager, self.auth_manager)
         self.base_handler = BaseHandler(self.schwab_manager, self.auth_manager)
+        self.watchdog = LoopWatchdog()
+        # Schedules updates: orders first, stale/duplicate read-only requests shed
+        self.admission = AdmissionProcessor()
+        self.snapshots = SnapshotStore(snapshot_dir)
 
     async def initialize(self):
         """Initialize all components"""
+        self.watchdog.start()
         await self.schwab_manager.initialize()
-        await self.alert_handler.start_alert_system()
+        await self.schwab_manager.calendar.start()
+        restored = self.restore_snapshot()
+        await self.schwab_manager.load_symbols()
+        await self.alert_handler.start_alert_system(self.application.bot)
+        await self.schwab_manager.activity.start(self.application.bot)
+        await self.chart_handler.start()
+        await self.news_handler.start_prefetch(self.tracked_symbols)
+        await self.digest_handler.start(self.application.bot)
+        await self.order_handler.start_paper(self.application.bot)
+        await self.live_handler.start(self.application.bot)
+        scheduler = get_scheduler()
+        if restored:
+            rate = float(os.getenv("SNAPSHOT_REVALIDATE_RATE", "2"))
+            scheduler.call_later(0, self.schwab_manager.revalidate, rate)
+        scheduler.every("snapshot", float(os.getenv("SNAPSHOT_INTERVAL", "300")), self._save_snapshot)
+
+    def restore_snapshot(self) -> bool:
+        """Warm start from the last snapshot; cached data comes back marked stale"""
+        state, arrays = self.snapshots.load()
+        if state is None:
+            return False
+        self.schwab_manager.restore_snapshot(state.get('schwab', {}), arrays)
+        self.alert_handler.alerts.update(state.get('alerts', {}))
+        self.alert_handler.history.update(state.get('alert_history', {}))
+        if 'indicators' in state:
+            self.alert_handler.indicators = state['indicators']
+        self.watchlist_handler.watchlists.update(state.get('watchlists', {}))
+        self.order_handler.selected_accounts.update(state.get('selected_accounts', {}))
+        self.order_handler.order_sessions.update(state.get('order_sessions', {}))
+        self.digest_handler.subscriptions.update(state.get('digests', {}))
+        self.auth_manager.restore(state.get('auth', {}))
+        self.live_handler.messages.update(state.get('live', {}))
+        if 'paper' in state:
+            self.paper.restore(state['paper'])
+        self.order_handler.paper_chats.update(state.get('paper_chats', {}))
+        logger.info("Restored snapshot from %s", self.snapshots.directory)
+        return True
+
+    def _snapshot(self):
+        """(pickled state, arrays), taken on the event loop so it is consistent"""
+        schwab_state, arrays = self.schwab_manager.snapshot_state()
+        state = {
+            'schwab': schwab_state,
+            'alerts': self.alert_handler.alerts,
+            'indicators': self.alert_handler.indicators,
+            'alert_history': self.alert_handler.history,
+            'watchlists': self.watchlist_handler.watchlists,
+            'selected_accounts': self.order_handler.selected_accounts,
+            'order_sessions': self.order_handler.order_sessions,
+            'digests': self.digest_handler.subscriptions,
+            'paper': self.paper,
+            'paper_chats': self.order_handler.paper_chats,
+            'auth': self.auth_manager.state(),
+            'live': self.live_handler.messages,
+        }
+        return dump_state(state, arrays), arrays
+
+    async def _save_snapshot(self):
+        await asyncio.to_thread(self.snapshots.save, *self._snapshot())
+
+    async def shutdown(self):
+        """Graceful stop: cancel background jobs, write a final snapshot, release shared resources"""
+        await shutdown_scheduler()
+        self.schwab_manager.activity.stop()
+        try:
+            self.snapshots.save(*self._snapshot())
+            logger.info("Wrote snapshot to %s", self.snapshots.directory)
+        except Exception as e:
+            logger.error("Error writing snapshot: %s", e)
+        self.chart_handler.shutdown()
+        shutdown_compute()
+        self.schwab_manager.close()
+
+    def tracked_symbols(self):
+        """Every symbol that appears in a watchlist or an alert"""
+        symbols = {symbol for watchlist in self.watchlist_handler.watchlists.values() for symbol in watchlist}
+        symbols.update(alert['symbol'] for alerts in self.alert_handler.alerts.values() for alert in alerts)
+        return symbols
 
     def setup_handlers(self, application: Application):
         """Setup all command handlers"""
+        # Runs first for every update so a stall report can name the command being handled
+        application.add_handler(TypeHandler(Update, self.label_update), group=-2)
+        # Then per-user quotas: an over-quota update is answered here and goes no further
+        application.add_handler(TypeHandler(Update, self.enforce_quota), group=-1)
+
         # Base commands
         application.add_handler(CommandHandler("start", self.base_handler.start))
         application.add_handler(CommandHandler("help", self.base_handler.help))
@@ -60,17 +175,29 @@ class TradingBot:
         # Quote handlers
         application.add_handler(CommandHandler("quote", self.quote_handler.get_quote))
         application.add_handler(CommandHandler("q", self.quote_handler.get_quote))
+        application.add_handler(CommandHandler("live", self.live_handler.live))
 
         # Order handlers
         application.add_handler(CommandHandler("order", self.order_handler.place_order_start))
         application.add_handler(CommandHandler("buy", self.order_handler.quick_buy))
         application.add_handler(CommandHandler("sell", self.order_handler.quick_sell))
         application.add_handler(CommandHandler("orders", self.order_handler.get_orders))
+        application.add_handler(CommandHandler("account", self.order_handler.select_account))
+        application.add_handler(CommandHandler("paper", self.order_handler.paper_mode))
+        application.add_handler(CommandHandler("cancel", self.order_handler.cancel_order))
 
         # Portfolio handlers
         application.add_handler(CommandHandler("portfolio", self.portfolio_handler.get_portfolio))
         application.add_handler(CommandHandler("positions", self.portfolio_handler.get_positions))
         application.add_handler(CommandHandler("balance", self.portfolio_handler.get_balance))
+        application.add_handler(CommandHandler("risk", self.risk_handler.get_risk))
+        application.add_handler(CommandHandler("export", self.export_handler.export))
+
+        # Charts
+        application.add_handler(CommandHandler("chart", self.chart_handler.get_chart))
+
+        # Options
+        application.add_handler(CommandHandler("chain", self.options_handler.get_chain))
 
         # Market movers
         application.add_handler(CommandHandler("movers", self.movers_handler.get_market_movers))
@@ -81,6 +208,7 @@ class TradingBot:
         application.add_handler(CommandHandler("alert", self.alert_handler.create_alert))
         application.add_handler(CommandHandler("alerts", self.alert_handler.list_alerts))
         application.add_handler(CommandHandler("delalert", self.alert_handler.delete_alert))
+        application.add_handler(CommandHandler("backtest", self.backtest_handler.run_backtest))
 
         # Watchlist
         application.add_handler(CommandHandler("watchlist", self.watchlist_handler.show_watchlist))
@@ -90,6 +218,18 @@ class TradingBot:
         # News
         application.add_handler(CommandHandler("news", self.news_handler.get_news))
 
+        # Scheduled digests
+        application.add_handler(CommandHandler("digest", self.digest_handler.manage_digest))
+
+        # Inline symbol search (non-blocking so newer keystrokes can cancel older ones)
+        application.add_handler(InlineQueryHandler(self.inline_handler.handle_inline_query, block=False))
+
+        # Diagnostics
+        application.add_handler(CommandHandler("lag", self.lag_status))
+        application.add_handler(CommandHandler("quota", self.quota_handler.quota))
+        application.add_handler(CommandHandler("link", self.link_handler.link))
+        application.add_handler(CommandHandler("unlink", self.link_handler.unlink))
+
         # Callback handlers
         application.add_handler(CallbackQueryHandler(self.handle_callback))
 
@@ -110,6 +250,48 @@ class TradingBot:
             await self.watchlist_handler.handle_callback(update, context)
         elif data.startswith("quote_"):
             await self.quote_handler.handle_callback(update, context)
+        elif data.startswith("live_"):
+            await self.live_handler.handle_callback(update, context)
+
+    async def label_update(self, update: Update, context):
+        label = describe_update(update)
+        self.watchdog.label(label)
+        # Every log line written while serving this update carries its id and command
+        user = update.effective_user
+        bind_request(update.update_id, label, user.id if user else None)
+
+    async def enforce_quota(self, update: Update, context):
+        user = update.effective_user
+        quota_class = command_class(update)
+        if user is None or quota_class is None or not self.auth_manager.is_authorized(user.id):
+            return
+        wait = self.auth_manager.check(user.id, quota_class)
+        if not wait:
+            return
+        text = describe_wait(wait, quota_class)
+        if update.callback_query is not None:
+            await update.callback_query.answer(text)
+        elif update.inline_query is not None:
+            await update.inline_query.answer([], cache_time=0)
+        elif update.effective_message is not None:
+            await update.effective_message.reply_text(text)
+        raise ApplicationHandlerStop
+
+    async def lag_status(self, update: Update, context):
+        """Event-loop lag histogram, admission stats and background job metrics"""
+        user_id = update.effective_user.id
+        if not self.auth_manager.is_authorized(user_id):
+            return
+        text = (
+            f"⏱ *Event loop lag*\n```\n{self.watchdog.summary()}\n```\n"
+            f"🚦 *Admission:* {self.admission.summary()}\n"
+            f"🔴 *Live:* {self.live_handler.summary()}\n"
+            f"🗓 *Jobs*\n```\n{get_scheduler().summary()}\n```"
+        )
+        # Other users' IDs and usage are for admins only, as with /quota top
+        if self.auth_manager.is_admin(user_id):
+            text += f"\n🎟 *Requests by user*\n```\n{self.auth_manager.usage_summary(5)}\n```"
+        await update.message.reply_text(text, parse_mode='Markdown')
 
     async def error_handler(self, update: object, context):
         """Global error handler"""
@@ -117,14 +299,17 @@ class TradingBot:
 
     async def run(self):
         """Run the bot"""
-        # Initialize the bot first
+        # Build the application first so background services can send messages through its bot
+        application = Application.builder().token(self.telegram_token).concurrent_updates(self.admission).build()
+        self.application = application
+
+        # Then initialize and run
         await self.initialize()
-        
-        # Then set up and run the application
-        application = Application.builder().token(self.telegram_token).build()
         self.setup_handlers(application)
         print("🤖 Starting Telegram Stock Bot...")
-        await application.run_polling(allowed_updates=Update.ALL_TYPES)
+        # Returns on SIGINT/SIGTERM; keep the loop open so shutdown() can still use it
+        application.run_polling(allowed_updates=Update.ALL_TYPES, close_loop=False)
+        await self.shutdown()
 
 
 async def async_main():
@@ -147,11 +332,25 @@ async def async_main():
 def main():
     """Main entry point"""
     try:
-        asyncio.run(async_main())
+        workers = int(os.getenv("BOT_WORKERS", "1"))
+        # JSON lines through a queue; the event loop never waits on log I/O
+        configure_logging("front" if workers > 1 else None)
+        if workers > 1:
+            # Front + market-data + N worker processes (see bot/cluster.py)
+            from bot.cluster import run_cluster
+            run_cluster(
+                os.getenv("TELEGRAM_BOT_TOKEN"),
+                os.getenv("SCHWAB_APP_KEY"),
+                os.getenv("SCHWAB_APP_SECRET"),
+                os.getenv("SCHWAB_CALLBACK_URL"),
+                workers,
+            )
+        else:
+            asyncio.run(async_main())
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")
     except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        logger.error("Fatal error: %s", e, exc_info=True)
 
 
 if __name__ == "__main__":
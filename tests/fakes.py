@@ -0,0 +1,77 @@
+"""Minimal stand-ins for Telegram updates and the Schwab manager used by handler tests"""
+from types import SimpleNamespace
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+        self.markups = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+        self.markups.append(kwargs.get('reply_markup'))
+        return SimpleNamespace(chat_id=1, message_id=len(self.replies), photo=None)
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+    async def send_chat_action(self, **kwargs):
+        pass
+
+
+def make_update(user_id=1, chat_id=1):
+    message = FakeMessage()
+    return SimpleNamespace(
+        message=message,
+        effective_user=SimpleNamespace(id=user_id),
+        effective_chat=SimpleNamespace(id=chat_id),
+    )
+
+
+def make_context(*args):
+    return SimpleNamespace(args=list(args), bot=FakeBot())
+
+
+class AllowAll:
+    def is_authorized(self, user_id):
+        return True
+
+
+class OpenCalendar:
+    def symbol_active(self, symbol, now=None):
+        return True
+
+
+class AnySymbol:
+    def is_valid(self, symbol):
+        return True
+
+    def rejection(self, symbol):
+        return f"❌ Unknown symbol {symbol}"
+
+
+class FakeSchwab:
+    """Serves fixed quotes and price history"""
+
+    def __init__(self, quotes=None, history=None):
+        self.quotes = quotes or {}
+        self.history = history or {}
+        self.calendar = OpenCalendar()
+        self.symbols = AnySymbol()
+
+    async def get_quotes(self, symbols):
+        return {symbol: self.quotes[symbol] for symbol in symbols if symbol in self.quotes}
+
+    async def get_cached_quotes(self, symbols, max_age=None):
+        return await self.get_quotes(symbols)
+
+    async def get_quote(self, symbol):
+        return await self.get_quotes([symbol])
+
+    async def get_price_history(self, symbol, start, end=None, frequency="daily"):
+        return self.history.get(symbol)
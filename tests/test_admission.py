@@ -0,0 +1,133 @@
+import asyncio
+import time
+from telegram import Update
+from bot.admission import PRIORITY_ORDER, PRIORITY_READ, PRIORITY_WRITE, SHED_ANSWER, AdmissionProcessor, classify
+
+USER = {'id': 5, 'is_bot': False, 'first_name': 'T'}
+CHAT = {'id': 5, 'type': 'private'}
+_ids = iter(range(1, 10_000))
+
+
+def command(text, age=0.0, user=USER):
+    return Update.de_json({'update_id': next(_ids), 'message': {
+        'message_id': next(_ids), 'date': int(time.time() - age), 'chat': CHAT, 'from': user, 'text': text,
+    }}, None)
+
+
+def button(data, user=USER):
+    return Update.de_json({'update_id': next(_ids), 'callback_query': {
+        'id': str(next(_ids)), 'from': user, 'chat_instance': '1', 'data': data,
+        'message': {'message_id': 7, 'date': int(time.time()), 'chat': CHAT},
+    }}, None)
+
+
+def test_classify():
+    assert classify(command("/quote AAPL"))[:3] == (PRIORITY_READ, (5, "/quote AAPL"), True)
+    assert classify(command("/alert AAPL 10"))[0] == PRIORITY_WRITE
+    assert classify(button("order_confirm_X_1_BUY"))[0] == PRIORITY_ORDER
+    assert classify(button("quote_refresh_AAPL"))[1] == (5, 7, "quote_refresh_AAPL")
+    assert classify(button("quote_refresh_AAPL"))[3] is not None
+    assert classify(button("order_confirm_X_1_BUY"))[3] is None
+
+
+class Harness:
+    def __init__(self, monkeypatch=None, **kwargs):
+        self.processor = AdmissionProcessor(**kwargs)
+        self.ran = []
+        self.answers = []
+        if monkeypatch is not None:
+            async def answer(query, text):
+                self.answers.append(text)
+            monkeypatch.setattr(AdmissionProcessor, '_answer', staticmethod(answer))
+
+    async def job(self, name, release=None):
+        if release is not None:
+            await release.wait()
+        self.ran.append(name)
+
+    def submit(self, update, name, release=None):
+        return asyncio.ensure_future(self.processor.do_process_update(update, self.job(name, release)))
+
+
+def test_orders_run_before_writes_before_reads():
+    async def scenario():
+        harness = Harness(concurrency=1)
+        release = asyncio.Event()
+        tasks = [harness.submit(command("/alert A 1"), 'blocker', release)]
+        await asyncio.sleep(0)
+        tasks += [
+            harness.submit(command("/quote AAPL"), 'read'),
+            harness.submit(command("/alert B 2"), 'write'),
+            harness.submit(button("order_confirm_X_1_BUY"), 'order'),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return harness.ran
+    assert asyncio.run(scenario()) == ['blocker', 'order', 'write', 'read']
+
+
+def test_stale_reads_are_dropped_but_writes_are_not():
+    async def scenario():
+        harness = Harness(concurrency=2, max_age=60)
+        await harness.submit(command("/quote AAPL", age=120), 'stale read')
+        await harness.submit(command("/alert A 1", age=120), 'old write')
+        return harness.ran, harness.processor.shed
+    ran, shed = asyncio.run(scenario())
+    assert ran == ['old write'] and shed['stale'] == 1
+
+
+def test_repeated_reads_collapse_and_shed_buttons_are_answered(monkeypatch):
+    async def scenario():
+        harness = Harness(monkeypatch, concurrency=1)
+        release = asyncio.Event()
+        tasks = [harness.submit(command("/alert A 1"), 'blocker', release)]
+        await asyncio.sleep(0)
+        tasks += [harness.submit(button("quote_refresh_AAPL"), f'tap {i}') for i in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        await asyncio.sleep(0)
+        return harness
+    harness = asyncio.run(scenario())
+    assert harness.ran == ['blocker', 'tap 2']
+    assert harness.processor.shed['duplicate'] == 2
+    assert harness.answers == [None, None]
+
+
+def test_user_limit_under_backlog_answers_busy(monkeypatch):
+    async def scenario():
+        harness = Harness(monkeypatch, concurrency=1, backlog_threshold=1, per_user_limit=1)
+        release = asyncio.Event()
+        tasks = [harness.submit(command("/alert A 1"), 'blocker', release)]
+        await asyncio.sleep(0)
+        tasks.append(harness.submit(command("/alert B 2"), 'queued'))
+        await asyncio.sleep(0)
+        tasks.append(harness.submit(button("watch_refresh"), 'shed'))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        await asyncio.sleep(0)
+        return harness
+    harness = asyncio.run(scenario())
+    assert harness.ran == ['blocker', 'queued']
+    assert harness.processor.shed['user limit'] == 1
+    assert harness.answers == [SHED_ANSWER]
+
+
+def test_queued_taps_age_out(monkeypatch):
+    async def blocker():
+        await asyncio.sleep(0.1)
+
+    async def scenario():
+        harness = Harness(monkeypatch, concurrency=1, max_age=0.05)
+        tasks = [asyncio.ensure_future(harness.processor.do_process_update(command("/alert A 1"), blocker()))]
+        await asyncio.sleep(0)
+        tasks.append(harness.submit(button("quote_refresh_AAPL"), 'tap'))
+        await asyncio.gather(*tasks)
+        await asyncio.sleep(0)
+        return harness
+    harness = asyncio.run(scenario())
+    assert harness.ran == []
+    assert harness.processor.shed['stale'] == 1
+    assert harness.answers == [SHED_ANSWER]
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from bot.alert_rules import MAX_PERIOD, RuleError, describe_rule, parse_rule
+from bot.handlers.alerts import AlertHandler
+from fakes import AllowAll, FakeSchwab, make_context, make_update
+
+
+@pytest.mark.parametrize("args, expected", [
+    (['150'], {'type': 'price', 'target_price': 150.0}),
+    (['sma', '50'], {'type': 'sma', 'period': 50}),
+    (['rsi', '14', '<30'], {'type': 'rsi', 'period': 14, 'above': False, 'level': 30.0}),
+    (['rsi', '14'], {'type': 'rsi', 'above': True, 'level': 70.0}),
+    (['move', '5', '390'], {'type': 'move', 'percent': 5.0, 'period': 390}),
+    (['volume', '3'], {'type': 'volume', 'multiple': 3.0, 'period': 20}),
+])
+def test_parse_rule(args, expected):
+    rule = parse_rule('AAPL', args)
+    assert rule['symbol'] == 'AAPL'
+    assert expected.items() <= rule.items()
+    assert describe_rule(rule)
+
+
+@pytest.mark.parametrize("args", [
+    ['sma', '0'],
+    ['ema', '-3'],
+    ['rsi', '0'],
+    ['volume', '2', '0'],
+    ['sma', str(MAX_PERIOD + 1)],
+    ['rsi', '14', '>150'],
+    ['rsi', '14', '<0'],
+    ['move', '0', '5'],
+    ['move', '5', '0'],
+    ['volume', '0'],
+    ['-5'],
+    ['inf'],
+])
+def test_parse_rule_rejects_out_of_range(args):
+    with pytest.raises(RuleError):
+        parse_rule('AAPL', args)
+
+
+@pytest.mark.parametrize("args", [['sma'], ['sma', 'x'], ['rsi', '14', '=50'], ['abc']])
+def test_parse_rule_rejects_malformed(args):
+    with pytest.raises((ValueError, IndexError)):
+        parse_rule('AAPL', args)
+
+
+def test_alert_reports_range_error():
+    handler = AlertHandler(FakeSchwab(), AllowAll())
+    update = make_update()
+    asyncio.run(handler.create_alert(update, make_context('AAPL', 'sma', '0')))
+    assert update.message.replies == [f"❌ Period must be between 1 and {MAX_PERIOD}"]
+    assert handler.alerts == {}
+
+
+class Broken:
+    value = None
+
+    def update(self, price, volume, timestamp):
+        raise IndexError("broken")
+
+
+def test_failing_indicator_does_not_stop_other_alerts():
+    schwab = FakeSchwab(quotes={
+        'AAA': {'quote': {'lastPrice': 10.0}},
+        'BBB': {'quote': {'lastPrice': 20.0}},
+    })
+    handler = AlertHandler(schwab, AllowAll())
+    for symbol, price in (('AAA', '10'), ('BBB', '20')):
+        asyncio.run(handler.create_alert(make_update(), make_context(symbol, price)))
+    handler.indicators.indicators[('AAA', 'sma', 5)] = Broken()
+    handler.indicators.by_symbol['AAA'] = {('AAA', 'sma', 5)}
+
+    asyncio.run(handler._check_alerts())
+
+    assert sorted(entry['symbol'] for entry in handler.history[1]) == ['AAA', 'BBB']
+    assert handler.alerts[1] == []
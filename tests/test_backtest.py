@@ -0,0 +1,88 @@
+import asyncio
+import numpy as np
+import pytest
+from bot import backtest
+from bot.alert_rules import parse_rule
+from bot.handlers.backtest import BacktestHandler
+from bot.history import BAR_DTYPE, DAY_MS
+from fakes import AllowAll, FakeSchwab, make_context, make_update
+
+
+def make_bars(closes, volumes=None):
+    bars = np.zeros(len(closes), dtype=BAR_DTYPE)
+    bars['datetime'] = np.arange(len(closes)) * DAY_MS
+    bars['open'] = bars['close'] = closes
+    bars['high'] = np.asarray(closes) + 0.5
+    bars['low'] = np.asarray(closes) - 0.5
+    bars['volume'] = 1000 if volumes is None else volumes
+    return bars
+
+
+def test_rolling_mean():
+    np.testing.assert_allclose(backtest.rolling_mean(np.arange(5.0), 2), [np.nan, 0.5, 1.5, 2.5, 3.5])
+    assert np.isnan(backtest.rolling_mean(np.arange(2.0), 3)).all()
+
+
+def test_fire_indices_only_on_rising_edge():
+    condition = np.array([False, True, True, False, True])
+    assert backtest.fire_indices(condition).tolist() == [1, 4]
+
+
+def test_price_rule_fires_when_range_touches_target():
+    bars = make_bars([10.0, 11.0, 12.0, 11.0, 10.0, 12.0])
+    result = backtest.backtest(parse_rule('X', ['12']), bars)
+    assert result['fires'] == 2
+    assert result['dates'] == [2 * DAY_MS, 5 * DAY_MS]
+    assert result['forward'][1] == {'count': 1, 'mean': pytest.approx(11 / 12 - 1), 'median': pytest.approx(11 / 12 - 1),
+                                    'hit_rate': 0.0}
+
+
+def test_sma_rule_fires_on_crosses():
+    closes = [10.0] * 5 + [12.0] * 5 + [8.0] * 5
+    result = backtest.backtest(parse_rule('X', ['sma', '3']), make_bars(closes))
+    assert result['fires'] == 2
+
+
+def test_move_rule_converts_minutes_to_bars():
+    closes = [100.0, 100.0, 106.0, 106.0]
+    # 390 minutes is one daily bar: 6% in one bar
+    assert backtest.backtest(parse_rule('X', ['move', '5', '390']), make_bars(closes))['fires'] == 1
+
+
+def test_volume_rule_compares_to_previous_bars():
+    volumes = [100, 100, 100, 400, 100]
+    result = backtest.backtest(parse_rule('X', ['volume', '3', '3']), make_bars([1.0] * 5, volumes))
+    assert result['dates'] == [3 * DAY_MS]
+
+
+def test_too_few_bars():
+    assert backtest.backtest(parse_rule('X', ['10']), make_bars([10.0]))['fires'] == 0
+
+
+def run_command(schwab, watchlists, monkeypatch, *args):
+    async def inline(fn, *fn_args):
+        return fn(*fn_args)
+    monkeypatch.setattr('bot.handlers.backtest.run_in_pool', inline)
+    handler = BacktestHandler(schwab, AllowAll(), watchlists)
+    update = make_update()
+    asyncio.run(handler.run_backtest(update, make_context(*args)))
+    return update.message.replies
+
+
+def test_one_symbol_watchlist(monkeypatch):
+    schwab = FakeSchwab(history={'AAPL': make_bars([10.0, 11.0, 12.0, 11.0])})
+    replies = run_command(schwab, {1: ['AAPL']}, monkeypatch, 'watchlist', '12')
+    assert len(replies) == 1
+    assert replies[0].startswith("🧪 *Backtest: AAPL*")
+
+
+def test_watchlist_batch(monkeypatch):
+    schwab = FakeSchwab(history={'AAPL': make_bars([10.0, 12.0, 11.0]), 'MSFT': make_bars([12.0, 13.0, 14.0])})
+    replies = run_command(schwab, {1: ['AAPL', 'MSFT', 'NONE']}, monkeypatch, 'watchlist', '12')
+    assert "watchlist" in replies[0]
+    assert "No history for: NONE" in replies[0]
+
+
+def test_invalid_rule_is_reported(monkeypatch):
+    replies = run_command(FakeSchwab(), {}, monkeypatch, 'AAPL', 'rsi', '0')
+    assert replies == ["❌ Period must be between 1 and 1000"]
@@ -0,0 +1,99 @@
+import asyncio
+import concurrent.futures
+import threading
+import numpy as np
+import pytest
+from bot import charts
+from bot.charts import ChartRenderer, render_chart
+from bot.handlers.charts import ChartHandler
+from bot.history import BAR_DTYPE, DAY_MS
+from fakes import AllowAll, FakeSchwab, make_context, make_update
+
+
+def make_bars(n=5):
+    bars = np.zeros(n, dtype=BAR_DTYPE)
+    bars['datetime'] = np.arange(n) * DAY_MS
+    bars['open'], bars['close'] = 10.0, np.linspace(10, 12, n)
+    bars['high'], bars['low'], bars['volume'] = 13.0, 9.0, 1000.0
+    return bars
+
+
+class SlowRender:
+    """Stands in for render_chart in a thread pool; blocks until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, bars, symbol, title, style):
+        self.calls += 1
+        self.release.wait(5)
+        return f"{symbol}-{self.calls}".encode()
+
+
+@pytest.fixture
+def slow(monkeypatch):
+    slow = SlowRender()
+    monkeypatch.setattr(charts, 'render_chart', slow)
+    return slow
+
+
+def make_renderer(**kwargs):
+    renderer = ChartRenderer(max_workers=2, **kwargs)
+    renderer.pool = concurrent.futures.ThreadPoolExecutor(2)
+    return renderer
+
+
+def test_render_chart_returns_png():
+    png = render_chart(make_bars(), "AAPL", "3m · daily", 'candle')
+    assert png.startswith(b'\x89PNG')
+
+
+def test_identical_requests_render_once(slow):
+    async def scenario():
+        renderer = make_renderer()
+        tasks = [asyncio.create_task(renderer.render('k', make_bars(), 'X', 't', 'line')) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        slow.release.set()
+        results = await asyncio.gather(*tasks)
+        return results, renderer.get_cached('k')
+    results, cached = asyncio.run(scenario())
+    assert results == [b'X-1'] * 3 and cached == b'X-1'
+    assert slow.calls == 1
+
+
+def test_waiters_survive_a_cancelled_first_request(slow):
+    async def scenario():
+        renderer = make_renderer()
+        first = asyncio.create_task(renderer.render('k', make_bars(), 'X', 't', 'line'))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(renderer.render('k', make_bars(), 'X', 't', 'line'))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        slow.release.set()
+        result = await asyncio.wait_for(waiter, 2)
+        return result, renderer._pending
+    result, pending = asyncio.run(scenario())
+    assert result.startswith(b'X-') and pending == {}
+
+
+def test_png_cache_is_bounded_by_bytes():
+    renderer = ChartRenderer(max_workers=1, max_cache_bytes=10)
+    for key in ('a', 'b', 'c'):
+        renderer._store(key, b'12345')
+        renderer.file_ids[key] = f"id-{key}"
+    assert renderer.get_cached('a') is None
+    assert renderer.get_cached('c') == b'12345'
+    assert set(renderer.file_ids) == {'b', 'c'}
+
+
+@pytest.mark.parametrize("args, reply", [
+    (('AAPL', '1y', 'minute'), "❌ minute charts go back at most 5 days; use a range up to 5d or a longer interval"),
+    (('AAPL', '1y', '30min'), "❌ 30min charts go back at most 90 days; use a range up to 3m or a longer interval"),
+    (('AAPL', '2w'), "❌ Unknown range."),
+])
+def test_chart_arguments_are_checked(args, reply):
+    handler = ChartHandler(FakeSchwab(), AllowAll())
+    update = make_update()
+    asyncio.run(handler.get_chart(update, make_context(*args)))
+    assert update.message.replies[0].startswith(reply)
@@ -0,0 +1,84 @@
+import asyncio
+import shutil
+import tempfile
+from types import SimpleNamespace
+import pytest
+from bot.cluster import FrontRouter, MarketDataServer, RemoteSchwabManager, open_connection
+from bot.quotetable import QuoteTable
+from fakes import OpenCalendar
+
+
+class MarketSchwab:
+    """The market-data side: every quote fetch lands in the shared table, like SchwabManager's"""
+
+    def __init__(self, table):
+        self.table = table
+        self.calendar = OpenCalendar()
+        self.fetched = []
+
+    async def get_quotes(self, symbols):
+        self.fetched.append(list(symbols))
+        quotes = {symbol: {'quote': {'lastPrice': 100.0, 'bidPrice': 99.9, 'askPrice': 100.1, 'totalVolume': 1}}
+                  for symbol in symbols}
+        self.table.write(quotes)
+        return quotes
+
+    async def get_quote(self, symbol):
+        return {symbol: {'quote': {'lastPrice': 1.0}}}
+
+
+@pytest.fixture
+def socket_dir():
+    # Unix socket paths are short, so stay out of pytest's deep tmp_path
+    path = tempfile.mkdtemp(prefix="cluster-")
+    yield path
+    shutil.rmtree(path)
+
+
+def test_updates_are_sharded_by_chat_then_user():
+    router = FrontRouter(["a", "b", "c"])
+    chat = SimpleNamespace(effective_chat=SimpleNamespace(id=7), effective_user=SimpleNamespace(id=8), update_id=1)
+    inline = SimpleNamespace(effective_chat=None, effective_user=SimpleNamespace(id=8), update_id=1)
+    bare = SimpleNamespace(effective_chat=None, effective_user=None, update_id=5)
+    assert [router.worker_for(update) for update in (chat, inline, bare)] == [1, 2, 2]
+
+
+def test_worker_reads_subscribed_quotes_from_the_shared_table(socket_dir):
+    table = QuoteTable.create(capacity=8)
+    path = f"{socket_dir}/market.sock"
+
+    async def scenario():
+        schwab = MarketSchwab(table)
+        server = MarketDataServer(schwab, path)
+        listener = await asyncio.start_unix_server(server._client, path=path)
+        remote = RemoteSchwabManager(path, table.name, subscription_ttl=60)
+        remote.quote_table = QuoteTable.attach(table.name)
+        remote._reader, remote._writer = await open_connection(path)
+        remote._reader_task = asyncio.create_task(remote._read_loop())
+
+        first = await remote.get_quotes(['AAPL', 'AAPL'])
+        second = await remote.get_quotes(['AAPL'])
+        assert first['AAPL']['quote']['lastPrice'] == second['AAPL']['quote']['lastPrice'] == 100.0
+        assert schwab.fetched == [['AAPL']]
+        assert server.subscribed_symbols() == {'AAPL'}
+
+        # The market-data process keeps subscribed symbols fresh on its own
+        await server._publish()
+        assert schwab.fetched[-1] == ['AAPL']
+
+        assert await remote.get_quote('MSFT') == {'MSFT': {'quote': {'lastPrice': 1.0}}}
+        with pytest.raises(RuntimeError, match="not available remotely"):
+            await remote.call('place_order', 1)
+
+        remote.subscribed['AAPL'] -= 120
+        await remote._expire_subscriptions()
+        await asyncio.sleep(0.01)
+        assert server.subscribed_symbols() == set() and remote.subscribed == {}
+
+        remote._writer.close()
+        listener.close()
+        remote.close()
+    try:
+        asyncio.run(scenario())
+    finally:
+        table.close()
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from telegram.error import Forbidden, NetworkError, RetryAfter
+from bot.digest import FanoutSender, render_digest
+from bot.handlers.digest import DigestHandler
+from bot.logs import request_context
+from fakes import AllowAll, FakeSchwab, make_context, make_update
+
+# retry_seconds reads RetryAfter.retry_after in both its int and timedelta forms
+pytestmark = pytest.mark.filterwarnings("ignore::telegram.warnings.PTBDeprecationWarning")
+
+
+class FlakyBot:
+    """Floods once, and some chats have blocked the bot or fail outright"""
+
+    def __init__(self, blocked=(), broken=()):
+        self.sent = []
+        self.blocked = set(blocked)
+        self.broken = set(broken)
+        self.flooded = False
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if not self.flooded:
+            self.flooded = True
+            raise RetryAfter(0)
+        if chat_id in self.blocked:
+            raise Forbidden("bot was blocked by the user")
+        if chat_id in self.broken:
+            raise NetworkError("timed out")
+        self.sent.append((chat_id, text))
+
+
+class DigestSchwab(FakeSchwab):
+    def __init__(self, quotes, accounts, multi_tenant=False):
+        super().__init__(quotes=quotes)
+        self.calendar.is_trading_day = lambda date: True
+        self.accounts = accounts  # {user_id: [(account, details)]}
+        self.multi_tenant = multi_tenant
+        self.quote_requests = []
+
+    async def get_quotes(self, symbols):
+        self.quote_requests.append(symbols)
+        return await super().get_quotes(symbols)
+
+    async def authorize_url(self):
+        return "https://example.com/authorize" if self.multi_tenant else None
+
+    async def get_all_account_details(self, fields=None):
+        user_id = request_context.get()['user_id']
+        if user_id not in self.accounts:
+            raise PermissionError("not linked")
+        return self.accounts[user_id]
+
+
+def holding(value, quantity):
+    return [({'accountNumber': "1234"}, {'securitiesAccount': {
+        'currentBalances': {'liquidationValue': value},
+        'positions': [{'instrument': {'symbol': 'AAPL'}, 'longQuantity': quantity, 'shortQuantity': 0}],
+    }})]
+
+
+def test_render_digest():
+    quotes = {'AAPL': {'quote': {'lastPrice': 190.0, 'netPercentChangeInDouble': -0.5}}}
+    text = render_digest('close', ['AAPL', 'NONE'], quotes, "💼 line")
+    assert text.splitlines() == ["*🌇 Market close digest*", "", "📉 *AAPL*: $190.00 (-0.50%)",
+                                 "❓ *NONE*: Quote unavailable", "", "💼 line"]
+    assert "Your watchlist is empty" in render_digest('open', [], {})
+
+
+def test_fanout_retries_floods_and_reports_blocked_chats():
+    bot = FlakyBot(blocked={2}, broken={3})
+    sender = FanoutSender(bot, rate=1000.0)
+    blocked = asyncio.run(sender.send_all([(1, "a"), (2, "b"), (3, "c")]))
+    assert blocked == [2] and bot.sent == [(1, "a")]
+
+
+def make_handler(schwab, bot):
+    handler = DigestHandler(schwab, AllowAll(), {1: ['AAPL'], 2: ['MSFT', 'AAPL'], 3: ['TSLA']})
+    handler.sender = FanoutSender(bot, rate=1000.0)
+    for user_id in (1, 2, 3):
+        handler.subscriptions[user_id] = {'chat_id': 10 + user_id, 'kinds': {'open'}}
+    handler.subscriptions[3]['kinds'] = {'close'}
+    return handler
+
+
+def test_one_quote_fetch_serves_every_subscriber_and_blocked_chats_unsubscribe():
+    schwab = DigestSchwab({'AAPL': {'quote': {'lastPrice': 1.0}}}, {None: holding(5000.0, 2)})
+    bot = FlakyBot(blocked={12})
+    handler = make_handler(schwab, bot)
+    asyncio.run(handler.send_digests('open'))
+    assert schwab.quote_requests == [['AAPL', 'MSFT']]
+    ((chat_id, text),) = bot.sent
+    assert chat_id == 11 and "💼 Portfolio: $5,000.00 across 1 positions" in text
+    assert sorted(handler.subscriptions) == [1, 3]
+
+
+def test_each_tenant_sees_only_their_own_portfolio():
+    schwab = DigestSchwab({}, {1: holding(100.0, 1)}, multi_tenant=True)
+    bot = FlakyBot()
+    handler = make_handler(schwab, bot)
+    asyncio.run(handler.send_digests('open'))
+    texts = dict(bot.sent)
+    assert "$100.00" in texts[11] and "Portfolio" not in texts[12]
+
+
+def test_digest_command_subscribes_and_unsubscribes():
+    handler = DigestHandler(FakeSchwab(), AllowAll(), {})
+    update = make_update(chat_id=5)
+    asyncio.run(handler.manage_digest(update, make_context('close')))
+    asyncio.run(handler.manage_digest(update, make_context('OPEN')))
+    assert handler.subscriptions[1] == {'chat_id': 5, 'kinds': {'close', 'open'}}
+    assert "Market open digest at 09:35" in update.message.replies[-1]
+    asyncio.run(handler.manage_digest(update, make_context('off')))
+    assert handler.subscriptions == {} and "no digests" in update.message.replies[-1]
+    asyncio.run(handler.manage_digest(update, make_context('weekly')))
+    assert update.message.replies[-1].startswith("Usage: /digest")
@@ -0,0 +1,69 @@
+import asyncio
+import csv
+import datetime
+import pickle
+from openpyxl import load_workbook
+from bot.export import COLUMNS, utc, write_export
+from bot.handlers import alerts, export
+from bot.handlers.alerts import AlertHandler
+from bot.handlers.export import _activity_rows, _event_pages
+from fakes import AllowAll, FakeSchwab, make_context, make_update
+
+
+def test_utc():
+    assert utc(0) is None and utc(None) is None
+    assert utc(86_400) == datetime.datetime(1970, 1, 2)
+
+
+def test_write_csv(tmp_path):
+    path = tmp_path / "orders.csv"
+    rows = ((i, f"S{i}") for i in range(3))
+    assert write_export(path, 'csv', "Orders", ("ID", "Symbol"), rows) == 3
+    with open(path, newline='') as f:
+        assert list(csv.reader(f)) == [["ID", "Symbol"], ["0", "S0"], ["1", "S1"], ["2", "S2"]]
+
+
+def test_write_xlsx(tmp_path):
+    path = tmp_path / "alerts.xlsx"
+    rows = [(utc(86_400), 1, "AAPL", "above 150", 151.0)]
+    assert write_export(path, 'xlsx', "Alerts", COLUMNS['alerts'], rows) == 1
+    sheet = load_workbook(path)["Alerts"]
+    values = list(sheet.values)
+    assert values[0] == COLUMNS['alerts']
+    assert values[1] == (datetime.datetime(1970, 1, 2), 1, "AAPL", "above 150", 151.0)
+
+
+def event(seq):
+    return {'seq': seq, 'received_at': 1.0, 'order_id': str(seq), 'account': '12345678', 'message_type': 'OrderFill',
+            'symbol': 'X', 'quantity': 1.0, 'price': 2.0, 'kind': 'fill'}
+
+
+def test_order_events_are_paged_in_while_writing(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, 'EVENT_PAGE_SIZE', 2)
+    log = [event(seq) for seq in range(1, 6)]
+    requests = []
+
+    async def fetch(after, limit):
+        requests.append(after)
+        return [e for e in log if e['seq'] > after][:limit]
+
+    async def scenario():
+        page = await fetch(0, 2)
+        rows = _activity_rows(_event_pages(page, asyncio.get_running_loop(), fetch))
+        return await asyncio.to_thread(write_export, tmp_path / "o.csv", 'csv', "Orders", COLUMNS['orders'], rows)
+    assert asyncio.run(scenario()) == 5
+    assert requests == [0, 2, 4]
+
+
+def test_alert_history_is_bounded_across_a_snapshot(monkeypatch):
+    monkeypatch.setattr(alerts, 'ALERT_HISTORY_LIMIT', 2)
+    handler = AlertHandler(FakeSchwab(quotes={'AAA': {'quote': {'lastPrice': 10.0}}}), AllowAll())
+    for _ in range(3):
+        asyncio.run(handler.create_alert(make_update(), make_context('AAA', '10')))
+        asyncio.run(handler._check_alerts())
+    assert len(handler.history[1]) == 2
+
+    restored = AlertHandler(FakeSchwab(), AllowAll())
+    restored.history.update(pickle.loads(pickle.dumps(handler.history)))
+    restored.history[1].append({'id': 'new'})
+    assert len(restored.history[1]) == 2 and restored.history[1][-1] == {'id': 'new'}
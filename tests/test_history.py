@@ -0,0 +1,92 @@
+import asyncio
+import datetime
+import pytest
+from bot.history import DAY_MS, PriceHistoryCache, to_epoch_ms
+
+START = to_epoch_ms(datetime.date(2024, 1, 1))
+
+
+class FakeFetch:
+    """One daily candle per day from START; records every requested range"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, symbol, frequency, start_ms, end_ms):
+        self.calls.append((start_ms, end_ms))
+        await asyncio.sleep(0)
+        if self.fail:
+            return None
+        first = max(start_ms, START)
+        first += -(first - START) % DAY_MS
+        return [{'datetime': t, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': (t - START) / DAY_MS,
+                 'volume': 100.0} for t in range(first, end_ms + 1, DAY_MS)]
+
+
+def day(n):
+    return START + n * DAY_MS
+
+
+@pytest.fixture
+def fetch():
+    return FakeFetch()
+
+
+@pytest.fixture
+def cache(tmp_path, fetch):
+    return PriceHistoryCache(fetch, str(tmp_path))
+
+
+def test_second_read_is_served_from_the_file(cache, fetch):
+    bars = asyncio.run(cache.get('aapl', 'daily', day(0), day(9)))
+    assert bars['close'].tolist() == list(range(10))
+    assert len(fetch.calls) == 1
+    again = asyncio.run(cache.get('AAPL', 'daily', day(2), day(5)))
+    assert again['close'].tolist() == [2, 3, 4, 5]
+    assert len(fetch.calls) == 1
+
+
+def test_only_the_gaps_are_fetched(cache, fetch):
+    asyncio.run(cache.get('AAPL', 'daily', day(10), day(19)))
+    bars = asyncio.run(cache.get('AAPL', 'daily', day(5), day(25)))
+    assert bars['close'].tolist() == list(range(5, 26))
+    # Before the covered range, then from one bar before its end (to refresh a forming bar)
+    assert fetch.calls[1:] == [(day(5), day(10)), (day(19) - DAY_MS, day(25))]
+    assert cache._coverage('AAPL', 'daily') == (day(5), day(25))
+
+
+def test_failed_fetch_is_not_remembered_as_covered(tmp_path):
+    fetch = FakeFetch(fail=True)
+    cache = PriceHistoryCache(fetch, str(tmp_path))
+    assert len(asyncio.run(cache.get('AAPL', 'daily', day(0), day(9)))) == 0
+    assert cache._coverage('AAPL', 'daily') is None
+    fetch.fail = False
+    assert len(asyncio.run(cache.get('AAPL', 'daily', day(0), day(9)))) == 10
+    assert len(fetch.calls) == 2
+
+
+def test_reads_ending_now_use_the_cached_tail(cache, fetch):
+    now = to_epoch_ms(datetime.datetime.now(datetime.timezone.utc))
+    asyncio.run(cache.get('AAPL', 'minute', now - 3_600_000))
+    calls = len(fetch.calls)
+    asyncio.run(cache.get('AAPL', 'minute', now - 3_600_000))
+    assert len(fetch.calls) == calls
+
+
+def test_concurrent_requests_share_one_fetch(cache, fetch):
+    async def scenario():
+        return await asyncio.gather(*(cache.get('AAPL', 'daily', day(0), day(9)) for _ in range(5)))
+    results = asyncio.run(scenario())
+    assert all(len(bars) == 10 for bars in results)
+    assert len(fetch.calls) == 1
+    assert cache._locks == {}
+
+
+def test_open_maps_are_bounded(tmp_path, fetch):
+    cache = PriceHistoryCache(fetch, str(tmp_path), max_maps=2)
+    for symbol in ('A', 'B', 'C'):
+        asyncio.run(cache.get(symbol, 'daily', day(0), day(3)))
+        cache.read(symbol, 'daily', day(0), day(3))
+    assert list(cache._maps) == [('B', 'daily'), ('C', 'daily')]
+    assert cache.read('A', 'daily', day(0), day(3))['close'].tolist() == [0, 1, 2, 3]
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from bot import backtest
+from bot.indicators import EMA, RSI, SMA, IndicatorRegistry, PercentMove, RingBuffer, VolumeSpike
+
+
+def feed(indicator, prices):
+    values = []
+    for i, price in enumerate(prices):
+        indicator.update(price, 0.0, float(i))
+        values.append(indicator.value)
+    return values
+
+
+@pytest.fixture
+def prices():
+    return 100 + np.cumsum(np.random.default_rng(7).normal(0, 1, 300))
+
+
+def test_ring_buffer_evicts_oldest():
+    buffer = RingBuffer(3)
+    assert [buffer.append(v) for v in (1, 2, 3)] == [None, None, None]
+    assert buffer.full
+    assert buffer.append(4) == 1
+    assert (buffer[0], buffer[1], buffer[2]) == (4, 3, 2)
+
+
+def test_sma_matches_rolling_mean(prices):
+    values = feed(SMA(20), prices)
+    assert values[18] is None
+    np.testing.assert_allclose(values[19:], backtest.rolling_mean(prices, 20)[19:])
+
+
+def test_ema_matches_vectorized(prices):
+    values = feed(EMA(10), prices)
+    np.testing.assert_allclose(values[9:], backtest.ema(prices, 10)[9:])
+
+
+def test_rsi_matches_vectorized(prices):
+    values = feed(RSI(14), prices)
+    assert values[13] is None
+    np.testing.assert_allclose(values[14:], backtest.rsi(prices, 14)[14:])
+
+
+def test_rsi_without_losses_is_100():
+    assert feed(RSI(3), [1, 2, 3, 4, 5])[-1] == 100.0
+
+
+def test_percent_move_uses_window_start():
+    move = PercentMove(minutes=1)
+    for t, price in ((0, 100.0), (30, 105.0), (60, 110.0)):
+        move.update(price, 0.0, t)
+    assert move.value == pytest.approx(10.0)
+    # 120 s later the first two samples have left the window
+    move.update(121.0, 0.0, 120)
+    assert move.value == pytest.approx(10.0)
+
+
+def test_percent_move_resets_after_a_gap():
+    move = PercentMove(minutes=5)
+    for t, price in ((0, 100.0), (30, 110.0)):
+        move.update(price, 0.0, t)
+    assert move.value == pytest.approx(10.0)
+    # First check of the next session: yesterday's move must not carry over
+    move.update(110.0, 0.0, 18 * 3600)
+    assert move.value is None
+    move.update(111.1, 0.0, 18 * 3600 + 30)
+    assert move.value == pytest.approx(1.0)
+
+
+def test_percent_move_covers_long_windows():
+    move = PercentMove(minutes=600)
+    for i in range(600 * 2 + 1):
+        move.update(100.0 + i * 0.01, 0.0, i * 30.0)
+    # The reference is the check 600 minutes back, not a truncated one
+    assert move.value == pytest.approx((112.0 - 100.0) / 100.0 * 100.0)
+
+
+def test_volume_spike_uses_per_tick_volume():
+    spike = VolumeSpike(3)
+    for cumulative in (0, 100, 200, 300):
+        spike.update(1.0, cumulative, 0)
+    assert spike.value is None
+    spike.update(1.0, 600, 0)
+    assert spike.value == pytest.approx(3.0)
+    # A drop in cumulative volume is a new session, not a negative tick
+    spike.update(1.0, 50, 0)
+    assert spike.value == pytest.approx(50 / ((100 + 100 + 300) / 3))
+
+
+def test_registry_shares_and_releases():
+    registry = IndicatorRegistry()
+    first = registry.acquire('AAPL', 'sma', 2)
+    second = registry.acquire('AAPL', 'sma', 2)
+    assert first == second and len(registry.indicators) == 1
+    registry.update('AAPL', 10.0, 0, 0)
+    registry.update('AAPL', 20.0, 0, 1)
+    assert registry.get(first) == 15.0
+    registry.release(first)
+    assert registry.symbols() == ['AAPL']
+    registry.release(second)
+    assert registry.symbols() == [] and registry.get(first) is None
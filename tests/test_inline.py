@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from bot.handlers import inline
+from bot.handlers.inline import InlineHandler
+from bot.symbols import SymbolIndex
+from fakes import AllowAll, FakeSchwab
+
+
+class FakeQuery:
+    def __init__(self, text, user_id=1):
+        self.query = text
+        self.from_user = SimpleNamespace(id=user_id)
+        self.answers = []
+
+    async def answer(self, results, **kwargs):
+        self.answers.append(results)
+
+
+class DenyAll:
+    def is_authorized(self, user_id):
+        return False
+
+
+@pytest.fixture(autouse=True)
+def short_debounce(monkeypatch):
+    monkeypatch.setattr(inline, 'DEBOUNCE_SECONDS', 0.02)
+
+
+def make_handler(tmp_path, auth=None):
+    schwab = FakeSchwab(quotes={'AAPL': {'quote': {'lastPrice': 190.5, 'netPercentChangeInDouble': -1.25}}})
+    schwab.symbols = SymbolIndex(str(tmp_path / "symbols.csv"))
+    schwab.symbols._set([("AAPL", "Apple Inc"), ("AMD", "Advanced Micro Devices")])
+    return InlineHandler(schwab, auth or AllowAll())
+
+
+def test_only_the_last_keystroke_is_answered(tmp_path):
+    handler = make_handler(tmp_path)
+    queries = [FakeQuery(text) for text in ("A", "AA", "AAP")]
+
+    async def scenario():
+        for query in queries:
+            await handler.handle_inline_query(SimpleNamespace(inline_query=query), None)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+    asyncio.run(scenario())
+    assert [len(query.answers) for query in queries] == [0, 0, 1]
+    (result,) = queries[-1].answers[0]
+    assert result.title == "AAPL  $190.50  📉 -1.25%" and result.description == "Apple Inc"
+    assert handler.pending == {}
+
+
+def test_symbols_without_a_quote_still_appear(tmp_path):
+    handler = make_handler(tmp_path)
+    query = FakeQuery("AMD")
+    asyncio.run(handler._answer(query))
+    (result,) = query.answers[0]
+    assert result.title == "AMD" and result.input_message_content.message_text == "AMD Advanced Micro Devices"
+
+
+def test_unauthorized_users_get_nothing(tmp_path):
+    handler = make_handler(tmp_path, auth=DenyAll())
+    query = FakeQuery("AAPL")
+    asyncio.run(handler.handle_inline_query(SimpleNamespace(inline_query=query), None))
+    assert query.answers == [[]] and handler.pending == {}
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from telegram.error import BadRequest
+from bot import live
+from bot.handlers.live import LiveHandler
+from bot.live import EditFanout, render_live
+from fakes import AllowAll, FakeSchwab
+
+
+class EditBot:
+    def __init__(self, fail=None):
+        self.edits = []
+        self.fail = fail or {}
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        error = self.fail.get(message_id)
+        if error is not None:
+            raise error
+        self.edits.append((chat_id, message_id, text))
+
+
+@pytest.fixture(autouse=True)
+def fast_pacing(monkeypatch):
+    monkeypatch.setattr(live, 'PRIVATE_CHAT_INTERVAL', 0.02)
+    monkeypatch.setattr(live, 'GROUP_CHAT_INTERVAL', 0.05)
+
+
+async def drain(fanout):
+    while fanout._drainer is not None and not fanout._drainer.done():
+        await fanout._drainer
+    await asyncio.sleep(0.01)
+
+
+def test_render_live_has_no_clock():
+    data = {'quote': {'lastPrice': 10.0, 'netChange': 0.5, 'netPercentChangeInDouble': 5.0,
+                      'bidPrice': 9.9, 'askPrice': 10.1, 'totalVolume': 1234}}
+    text = render_live('X', data, "footer")
+    assert text == render_live('X', data, "footer")
+    assert "📈 *X* 🟢" in text and "$9.90 / $10.10" in text and "1,234" in text
+    assert "Quote unavailable" in render_live('X', None, "footer")
+
+
+def test_newer_render_replaces_the_queued_edit():
+    async def scenario():
+        bot = EditBot()
+        fanout = EditFanout(bot)
+        fanout.submit(1, 10, "first")
+        fanout.submit(1, 11, "other")
+        fanout.submit(1, 10, "second")
+        await drain(fanout)
+        return bot, fanout
+    bot, fanout = asyncio.run(scenario())
+    # Message 10 keeps its place in line but is edited once, with the newest text
+    assert bot.edits == [(1, 10, "second"), (1, 11, "other")]
+    assert fanout.stats['coalesced'] == 1 and fanout.stats['edits'] == 2
+    assert fanout.backlog == 0
+
+
+def test_chats_take_turns():
+    async def scenario():
+        bot = EditBot()
+        fanout = EditFanout(bot)
+        for message_id in (1, 2, 3):
+            fanout.submit(100, message_id, "a")
+        fanout.submit(200, 9, "b")
+        await drain(fanout)
+        return bot
+    bot = asyncio.run(scenario())
+    assert [chat_id for chat_id, _, _ in bot.edits] == [100, 200, 100, 100]
+
+
+def test_discarded_messages_are_not_edited():
+    async def scenario():
+        bot = EditBot()
+        fanout = EditFanout(bot)
+        fanout.submit(1, 10, "a")
+        fanout.submit(1, 11, "b")
+        fanout.discard(1, 11)
+        await drain(fanout)
+        return bot
+    assert asyncio.run(scenario()).edits == [(1, 10, "a")]
+
+
+def test_deleted_messages_are_reported_gone():
+    gone = []
+
+    async def scenario():
+        bot = EditBot(fail={10: BadRequest("Message to edit not found"), 11: BadRequest("Message is not modified")})
+        fanout = EditFanout(bot, on_gone=lambda *key: gone.append(key))
+        fanout.submit(1, 10, "a")
+        fanout.submit(2, 11, "b")
+        await drain(fanout)
+        return fanout
+    fanout = asyncio.run(scenario())
+    assert gone == [(1, 10)]
+    assert fanout.stats['gone'] == 1 and fanout.stats['unchanged'] == 1
+
+
+def test_one_fetch_feeds_every_live_message_and_unchanged_text_is_skipped():
+    async def scenario():
+        schwab = FakeSchwab(quotes={'X': {'quote': {'lastPrice': 1.0}}, 'Y': {'quote': {'lastPrice': 2.0}}})
+        handler = LiveHandler(schwab, AllowAll())
+        handler.editor = EditFanout(EditBot())
+        for key, symbol in (((1, 1), 'X'), ((1, 2), 'X'), ((2, 3), 'Y')):
+            handler.messages[key] = {'user_id': 1, 'symbol': symbol, 'expires': 0.0, 'text': '', 'quote': None}
+        await handler._refresh()
+        await drain(handler.editor)
+        edits = len(handler.editor.bot.edits)
+        schwab.quotes['Y'] = {'quote': {'lastPrice': 3.0}}
+        await handler._refresh()
+        await drain(handler.editor)
+        return handler, edits
+    handler, first_edits = asyncio.run(scenario())
+    assert first_edits == 3 and handler.fetches == 2
+    assert len(handler.editor.bot.edits) == 4
+    assert handler.editor.stats['skipped'] == 2
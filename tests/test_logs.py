@@ -0,0 +1,71 @@
+import json
+import logging
+import queue
+from bot.logs import JsonFormatter, NonBlockingQueueHandler, SamplingFilter, bind_request, request_context
+
+
+def make_record(msg="Quote for %s", args=("AAPL",), level=logging.INFO, lineno=10, **extra):
+    record = logging.LogRecord("bot.test", level, "bot/test.py", lineno, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class Unprintable:
+    """Fails if formatted, to prove the caller's thread never formats the message"""
+
+    def __str__(self):
+        raise AssertionError("formatted on the caller's thread")
+
+
+def test_queue_handler_passes_records_unformatted():
+    log_queue = queue.Queue()
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.emit(make_record(args=(Unprintable(),)))
+    record = log_queue.get_nowait()
+    assert record.msg == "Quote for %s" and isinstance(record.args[0], Unprintable)
+
+
+def test_full_queue_drops_and_reports_the_count():
+    log_queue = queue.Queue(maxsize=1)
+    handler = NonBlockingQueueHandler(log_queue)
+    for _ in range(3):
+        handler.emit(make_record())
+    assert handler.dropped == 2
+    log_queue.get_nowait()
+    handler.emit(make_record())
+    assert log_queue.get_nowait().dropped == 2 and handler.dropped == 0
+
+
+def test_json_formatter():
+    record = make_record(request={'request_id': 7, 'command': 'quote', 'user_id': None}, suppressed=3)
+    entry = json.loads(JsonFormatter("worker-1").format(record))
+    assert entry['msg'] == "Quote for AAPL" and entry['level'] == 'INFO' and entry['logger'] == 'bot.test'
+    assert entry['process'] == "worker-1" and entry['suppressed'] == 3
+    assert entry['request_id'] == 7 and 'user_id' not in entry
+
+
+def test_sampling_filter_limits_each_call_site():
+    sampler = SamplingFilter(info_rate=0.0, burst=2)
+    assert [sampler.filter(make_record()) for _ in range(4)] == [True, True, False, False]
+    # Another call site has its own budget
+    assert sampler.filter(make_record(lineno=11))
+    sampler.sites[("bot/test.py", 10)][0] = 1
+    record = make_record()
+    assert sampler.filter(record) and record.suppressed == 2
+
+
+def test_sampling_filter_attaches_the_request():
+    bind_request(42, 'chart', 5)
+    try:
+        record = make_record()
+        SamplingFilter().filter(record)
+        assert record.request == {'request_id': 42, 'command': 'chart', 'user_id': 5}
+    finally:
+        request_context.set(None)
+
+
+def test_hot_path_sampling():
+    sampler = SamplingFilter(burst=10_000)
+    kept = sum(sampler.filter(make_record(sample=0.0)) for _ in range(100))
+    assert kept == 0
+    assert all(sampler.filter(make_record(sample=1.0)) for _ in range(100))
@@ -0,0 +1,113 @@
+import datetime
+from types import SimpleNamespace
+import pytest
+from bot.market_hours import (
+    CLOSED, MARKET_TZ, MAX_SUSPEND, POST, PRE, REGULAR, MarketCalendar, instrument_market,
+    local_sessions, nyse_early_closes, nyse_holidays,
+)
+
+
+def at(*args):
+    return datetime.datetime(*args, tzinfo=MARKET_TZ).timestamp()
+
+
+def test_2026_holidays():
+    assert sorted(nyse_holidays(2026)) == [datetime.date(2026, month, day) for month, day in (
+        (1, 1), (1, 19), (2, 16), (4, 3), (5, 25), (6, 19), (7, 3), (9, 7), (11, 26), (12, 25),
+    )]
+
+
+def test_2026_early_closes():
+    # July 3rd is the observed Independence Day, so it is closed rather than short
+    assert sorted(nyse_early_closes(2026)) == [datetime.date(2026, 11, 27), datetime.date(2026, 12, 24)]
+
+
+def test_saturday_new_year_is_not_observed_on_friday():
+    assert datetime.date(2021, 12, 31) not in nyse_holidays(2021)
+    assert datetime.date(2022, 1, 1) not in nyse_holidays(2022)
+
+
+def test_sunday_holiday_is_observed_on_monday():
+    assert datetime.date(2022, 12, 26) in nyse_holidays(2022)
+
+
+@pytest.mark.parametrize("date", [datetime.date(2026, 10, 17), datetime.date(2026, 11, 26)])
+def test_no_sessions_on_weekends_and_holidays(date):
+    assert local_sessions('equity', date) == []
+
+
+def test_regular_day_sessions():
+    sessions = local_sessions('equity', datetime.date(2026, 10, 19))
+    assert [(session, start.time(), end.time()) for session, start, end in sessions] == [
+        (PRE, datetime.time(4, 0), datetime.time(9, 30)),
+        (REGULAR, datetime.time(9, 30), datetime.time(16, 0)),
+        (POST, datetime.time(16, 0), datetime.time(20, 0)),
+    ]
+
+
+def test_early_close_sessions():
+    sessions = {session: (start.time(), end.time())
+                for session, start, end in local_sessions('equity', datetime.date(2026, 11, 27))}
+    assert sessions[REGULAR] == (datetime.time(9, 30), datetime.time(13, 0))
+    assert sessions[POST] == (datetime.time(13, 0), datetime.time(17, 0))
+    option = local_sessions('option', datetime.date(2026, 11, 27))
+    assert option[0][2].time() == datetime.time(13, 0)
+
+
+def test_instrument_market():
+    assert instrument_market('/ES') is None
+    assert instrument_market('$SPX') == ('equity', (REGULAR,))
+    assert instrument_market('AAPL  261120C00200000')[0] == 'option'
+    assert instrument_market('AAPL')[0] == 'equity'
+
+
+@pytest.fixture
+def calendar():
+    return MarketCalendar(schwab=None)
+
+
+def test_session_from_local_calendar(calendar):
+    assert calendar.session(now=at(2026, 10, 19, 8, 0)) == PRE
+    assert calendar.session(now=at(2026, 10, 19, 10, 0)) == REGULAR
+    assert calendar.session(now=at(2026, 10, 19, 19, 59)) == POST
+    assert calendar.session(now=at(2026, 10, 19, 20, 0)) == CLOSED
+    assert calendar.session(now=at(2026, 11, 27, 17, 30)) == CLOSED
+    assert not calendar.in_session(now=at(2026, 10, 17, 12, 0))
+    assert not calendar.in_session(sessions=(REGULAR,), now=at(2026, 10, 19, 8, 0))
+    assert calendar.is_trading_day(datetime.date(2026, 10, 19))
+    assert not calendar.is_trading_day(datetime.date(2026, 11, 26))
+
+
+def test_next_open_is_capped(calendar):
+    assert calendar.next_open(now=at(2026, 10, 18, 23, 0)) == at(2026, 10, 19, 4, 0)
+    saturday = at(2026, 10, 17, 12, 0)
+    assert calendar.next_open(now=saturday) == saturday + MAX_SUSPEND
+    assert calendar.next_open(sessions=(REGULAR,), now=at(2026, 10, 19, 8, 0)) == at(2026, 10, 19, 9, 30)
+
+
+def test_next_change(calendar):
+    assert calendar.next_change(now=at(2026, 10, 19, 10, 0)) == at(2026, 10, 19, 16, 0)
+
+
+def test_schwab_hours_take_precedence(calendar):
+    date = datetime.date(2026, 10, 19)
+    calendar.days[('equity', date)] = []
+    assert calendar.session(now=at(2026, 10, 19, 10, 0)) == CLOSED
+
+
+def test_gate(calendar):
+    job = SimpleNamespace(last_run=None)
+    open_, closed = at(2026, 10, 19, 10, 0), at(2026, 10, 18, 23, 0)
+    assert calendar.gate()(job, open_) is None
+    assert calendar.gate()(job, closed) == at(2026, 10, 19, 4, 0)
+    # Futures are never gated; indices wait for the regular session
+    assert calendar.gate(lambda: {'/ES'})(job, closed) is None
+    assert calendar.gate(lambda: {'$SPX'})(job, at(2026, 10, 19, 8, 0)) == at(2026, 10, 19, 9, 30)
+
+
+def test_gate_idle_runs(calendar):
+    closed = at(2026, 10, 18, 23, 0)
+    gate = calendar.gate(idle=600)
+    assert gate(SimpleNamespace(last_run=None), closed) is None
+    assert gate(SimpleNamespace(last_run=closed - 60), closed) == closed + 540
+    assert gate(SimpleNamespace(last_run=closed - 600), closed) is None
@@ -0,0 +1,52 @@
+import asyncio
+import json
+from bot.news import FileNewsProvider, NewsProvider, NewsService
+
+
+class StubProvider(NewsProvider):
+    rate_limit = 1000.0
+
+    def __init__(self, name, items=None, error=None):
+        super().__init__()
+        self.name = name
+        self.items = items or []
+        self.error = error
+        self.calls = 0
+
+    async def fetch(self, symbol):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return list(self.items)
+
+
+def test_headlines_are_merged_deduplicated_and_newest_first():
+    first = StubProvider("a", [{'title': "Old story", 'url': "u1", 'published': "2026-01-01"},
+                               {'title': "Big  News", 'published': "2026-01-03"}])
+    second = StubProvider("b", [{'title': "Same story", 'url': "u1", 'published': "2026-01-01"},
+                                {'title': "big news", 'published': "2026-01-03"},
+                                {'title': "Fresh", 'url': "u2", 'published': "2026-01-05"}])
+    service = NewsService([first, second, StubProvider("broken", error=RuntimeError("down"))])
+    items = asyncio.run(service.get("AAPL"))
+    assert [item['title'] for item in items] == ["Fresh", "Big  News", "Old story"]
+
+
+def test_concurrent_requests_share_one_fetch_and_then_the_cache():
+    provider = StubProvider("a", [{'title': str(i)} for i in range(5)])
+    service = NewsService([provider])
+
+    async def scenario():
+        results = await asyncio.gather(*[service.get("AAPL", limit=2) for _ in range(3)])
+        await service.get("AAPL")
+        return results
+    results = asyncio.run(scenario())
+    assert all(len(result) == 2 for result in results)
+    assert provider.calls == 1 and service._pending == {}
+
+
+def test_file_provider(tmp_path):
+    (tmp_path / "AAPL.json").write_text(json.dumps([{'title': "t", 'source': "wire"}, {'title': "u"}]))
+    provider = FileNewsProvider(str(tmp_path))
+    assert asyncio.run(provider.headlines("AAPL")) == [{'title': "t", 'source': "wire"}, {'title': "u", 'source': "file"}]
+    assert asyncio.run(provider.headlines("MSFT")) == []
@@ -0,0 +1,59 @@
+import numpy as np
+from bot.options import analyze_chain, bs_greeks, bs_price, flatten_chain, implied_vol
+
+S, R, SIGMA, DAYS = 100.0, 0.05, 0.25, 30
+
+
+def contract(strike, is_call, days=DAYS, sigma=SIGMA):
+    T = (days + 0.5) / 365.0
+    mark = float(bs_price(S, np.array([strike]), T, R, sigma, np.array([is_call]))[0])
+    return {'strikePrice': strike, 'putCall': 'CALL' if is_call else 'PUT', 'bid': mark - 0.05, 'ask': mark + 0.05,
+            'mark': mark, 'daysToExpiration': days, 'openInterest': 10}
+
+
+def make_chain(strikes=range(80, 125, 5)):
+    side = lambda is_call: {"2026-11-20:30": {f"{k}.0": [contract(float(k), is_call)] for k in strikes},
+                            "2026-12-18:58": {"100.0": [contract(100.0, is_call, days=58)]}}
+    return {'underlyingPrice': S, 'interestRate': R * 100, 'callExpDateMap': side(True), 'putExpDateMap': side(False)}
+
+
+def test_implied_vol_recovers_the_pricing_vol():
+    K = np.array([70.0, 100.0, 130.0, 100.0])
+    is_call = np.array([True, True, True, False])
+    T = np.full(4, 0.25)
+    prices = bs_price(S, K, T, R, np.array([0.2, 0.4, 1.5, 0.3]), is_call)
+    assert np.allclose(implied_vol(prices, S, K, T, R, is_call), [0.2, 0.4, 1.5, 0.3], atol=1e-3)
+    # Below intrinsic has no implied vol
+    assert np.isnan(implied_vol(np.array([1.0]), S, np.array([80.0]), np.array([0.25]), R, np.array([True])))[0]
+
+
+def test_greeks_obey_put_call_parity():
+    K, T = np.array([100.0, 100.0]), np.array([0.5, 0.5])
+    delta, gamma, theta, vega = bs_greeks(S, K, T, R, 0.3, np.array([True, False]))
+    assert np.isclose(delta[0] - delta[1], 1.0)
+    assert gamma[0] == gamma[1] and vega[0] == vega[1]
+    assert theta[0] < 0
+
+
+def test_flatten_chain_picks_the_nearest_expiry():
+    flat, expirations = flatten_chain(make_chain())
+    assert expirations == ["2026-11-20", "2026-12-18"] and flat['expiry'] == "2026-11-20"
+    assert len(flat['contracts']) == 18
+    assert flatten_chain(make_chain(), "2027-01-15") == (None, expirations)
+
+
+def test_analyze_chain_builds_a_ladder_around_the_money():
+    result = analyze_chain(make_chain(), width=2)
+    assert [row['strike'] for row in result['ladder']] == [90.0, 95.0, 100.0, 105.0, 110.0]
+    atm = result['ladder'][2]
+    assert abs(atm['call']['iv'] - SIGMA) < 1e-3
+    # Early exercise adds value, so the same put price implies no more vol
+    assert atm['put']['iv'] <= SIGMA + 1e-3
+    assert 0 < atm['call']['delta'] < 1 and -1 < atm['put']['delta'] < 0
+    assert result['contracts'] == 18 and result['days'] == DAYS
+
+
+def test_analyze_chain_reports_a_missing_or_empty_expiry():
+    assert analyze_chain(make_chain(), "2027-01-15")['error'] == 'expiry'
+    empty = {'underlyingPrice': S, 'callExpDateMap': {"2026-11-20:30": {}}}
+    assert analyze_chain(empty) == {'error': 'expiry', 'expirations': ["2026-11-20"]}
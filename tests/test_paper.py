@@ -0,0 +1,153 @@
+import asyncio
+import pickle
+from types import SimpleNamespace
+import pytest
+from bot.handlers.orders import NOT_PAPER, OrderHandler
+from bot.paper import BUY, CANCELLED, FILLED, LIMIT, OPEN, REJECTED, SELL, STOP, PaperBroker
+from fakes import AllowAll, FakeSchwab, make_context, make_update
+
+QUOTE = {'lastPrice': 100.0, 'bidPrice': 99.9, 'askPrice': 100.1}
+
+
+@pytest.fixture
+def broker():
+    return PaperBroker(starting_cash=10_000.0)
+
+
+def test_market_buy_and_sell(broker):
+    buy = broker.submit(1, 'X', BUY, 10, quote=QUOTE)
+    assert buy.status == FILLED and buy.fill_price == 100.1
+    sell = broker.submit(1, 'X', SELL, 10, quote={**QUOTE, 'bidPrice': 110.0})
+    assert sell.status == FILLED
+    account = broker.account(1)
+    assert account.realized == pytest.approx(10 * (110.0 - 100.1))
+    assert account.positions == {}
+    assert account.cash == pytest.approx(10_000.0 + 10 * (110.0 - 100.1))
+
+
+def test_rejections(broker):
+    assert broker.submit(1, 'X', BUY, 1000, quote=QUOTE).reason == "Insufficient cash"
+    assert broker.submit(1, 'X', SELL, 1, quote=QUOTE).reason == "Insufficient shares"
+    assert broker.submit(1, 'X', BUY, 1).status == REJECTED
+    with pytest.raises(ValueError):
+        broker.submit(1, 'X', BUY, 1, LIMIT)
+
+
+def test_limit_rests_then_fills_at_limit_or_better(broker):
+    order = broker.submit(1, 'X', BUY, 5, LIMIT, 95.0, quote=QUOTE)
+    assert order.status == OPEN
+    assert broker.resting_symbols() == ['X']
+    assert broker.on_quote('X', {'lastPrice': 96.0, 'askPrice': 96.0}) == []
+    touched = broker.on_quote('X', {'lastPrice': 94.0, 'askPrice': 94.5})
+    assert touched == [order] and order.fill_price == 94.5
+    assert broker.resting_symbols() == []
+
+
+def test_stops_fire_on_last_price(broker):
+    broker.submit(1, 'X', BUY, 10, quote=QUOTE)
+    stop = broker.submit(1, 'X', SELL, 10, STOP, 90.0)
+    broker.on_quote('X', {'lastPrice': 91.0, 'bidPrice': 91.0})
+    assert stop.status == OPEN
+    broker.on_quote('X', {'lastPrice': 89.0, 'bidPrice': 88.9})
+    assert stop.status == FILLED and stop.fill_price == 88.9
+
+
+def test_fills_follow_price_then_submission_order(broker):
+    orders = [broker.submit(1, 'X', BUY, 1, LIMIT, price) for price in (95.0, 97.0, 97.0)]
+    filled = broker.on_quote('X', {'lastPrice': 94.0, 'askPrice': 94.0})
+    assert [order.id for order in filled] == [order.id for order in orders]
+
+
+def test_cancelled_orders_leave_the_book(broker):
+    orders = [broker.submit(1, 'X', BUY, 1, LIMIT, 50.0 + i) for i in range(100)]
+    for order in orders[:99]:
+        assert broker.cancel(1, order.id)
+    assert not broker.cancel(1, orders[0].id)
+    assert not broker.cancel(2, orders[99].id)
+    book = broker.books['X']
+    assert len(book) == 1
+    assert book.entries() < 100  # dead entries were compacted
+    broker.cancel(1, orders[99].id)
+    assert broker.resting_symbols() == [] and 'X' not in broker.books
+
+
+def test_reset_cancels_open_orders(broker):
+    order = broker.submit(1, 'X', BUY, 1, LIMIT, 50.0)
+    broker.reset(1)
+    assert order.status == CANCELLED
+    assert broker.resting_symbols() == []
+    assert broker.account(1).cash == 10_000.0
+
+
+def test_restore_from_a_pickled_snapshot(broker):
+    broker.submit(1, 'X', BUY, 1, LIMIT, 50.0)
+    cancelled = broker.submit(1, 'Y', BUY, 1, LIMIT, 50.0)
+    broker.cancel(1, cancelled.id)
+    restored = PaperBroker()
+    restored.restore(pickle.loads(pickle.dumps(broker)))
+    assert restored.resting_symbols() == ['X'] and len(restored.books['X']) == 1
+    assert restored.on_quote('X', {'askPrice': 49.0})[0].fill_price == 49.0
+
+
+def test_replay_is_deterministic():
+    def run():
+        broker = PaperBroker(starting_cash=10_000.0)
+        broker.submit(1, 'X', BUY, 5, LIMIT, 99.0, quote=QUOTE)
+        broker.submit(2, 'X', BUY, 5, LIMIT, 99.5, quote=QUOTE)
+        fills = broker.on_quote('X', {'lastPrice': 98.0, 'askPrice': 98.5})
+        return [(order.id, order.user_id, order.fill_price) for order in fills]
+    assert run() == run()
+
+
+def test_limit_order_needs_paper_mode():
+    handler = OrderHandler(FakeSchwab(quotes={'X': {'quote': QUOTE}}), AllowAll(), PaperBroker())
+    update = make_update()
+    asyncio.run(handler.quick_buy(update, make_context('X', '10', 'limit', '95')))
+    assert update.message.replies == [NOT_PAPER]
+
+    handler.paper.enabled.add(1)
+    update = make_update()
+    asyncio.run(handler.quick_buy(update, make_context('X', '10', 'limit', '95')))
+    assert "Order Confirmation" in update.message.replies[0]
+
+
+class FakeQuery:
+    def __init__(self, data, user_id=1):
+        self.data = data
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = SimpleNamespace(chat_id=1)
+        self.edits = []
+
+    async def answer(self, text=None):
+        pass
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+def test_limit_confirmation_is_not_placed_outside_paper_mode():
+    handler = OrderHandler(FakeSchwab(quotes={'X': {'quote': QUOTE}}), AllowAll(), PaperBroker())
+    query = FakeQuery("order_confirm_X_10_BUY_LIMIT_95")
+    asyncio.run(handler.handle_callback(SimpleNamespace(callback_query=query), make_context()))
+    assert query.edits == [f"{NOT_PAPER}; the order was not placed"]
+
+
+def test_confirmed_limit_rests_at_the_price_shown():
+    quote = {'lastPrice': 12500.0, 'bidPrice': 12499.9, 'askPrice': 12500.1}
+    handler = OrderHandler(FakeSchwab(quotes={'X': {'quote': quote}}), AllowAll(), PaperBroker(starting_cash=1_000_000.0))
+    handler.paper.enabled.add(1)
+    update = make_update()
+    asyncio.run(handler.quick_buy(update, make_context('X', '1', 'limit', '12345.674')))
+    assert "$12345.67" in update.message.replies[0]
+    query = FakeQuery(update.message.markups[0].inline_keyboard[0][0].callback_data)
+    asyncio.run(handler.handle_callback(SimpleNamespace(callback_query=query), make_context()))
+    assert [order.price for order in handler.paper.open_orders(1)] == [12345.67]
+
+
+@pytest.mark.parametrize("price", ["nan", "inf", "-inf", "0.001"])
+def test_non_finite_or_zero_prices_are_rejected(price):
+    handler = OrderHandler(FakeSchwab(quotes={'X': {'quote': QUOTE}}), AllowAll(), PaperBroker())
+    handler.paper.enabled.add(1)
+    update = make_update()
+    asyncio.run(handler.quick_buy(update, make_context('X', '10', 'limit', price)))
+    assert update.message.replies[0].startswith("❌")
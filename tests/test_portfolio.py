@@ -0,0 +1,29 @@
+from bot.portfolio import account_label, aggregate_accounts
+
+
+def account(number, cash, positions):
+    return ({'accountNumber': number}, {'securitiesAccount': {
+        'type': 'MARGIN',
+        'currentBalances': {'liquidationValue': cash * 2, 'cashBalance': cash},
+        'positions': [{'instrument': {'symbol': symbol}, 'longQuantity': long, 'shortQuantity': short,
+                       'marketValue': value} for symbol, long, short, value in positions],
+    }})
+
+
+def test_account_label_hides_all_but_four_digits():
+    assert account_label(12345678) == "…5678"
+
+
+def test_accounts_are_summed_and_positions_netted():
+    results = [
+        account("11110001", 100.0, [("AAPL", 10, 0, 1500.0), ("TSLA", 0, 2, -400.0)]),
+        account("22220002", 50.0, [("AAPL", 0, 4, -600.0)]),
+        ({'accountNumber': "33330003"}, None),
+    ]
+    view = aggregate_accounts(results)
+    assert view['balances']['cashBalance'] == 150.0 and view['balances']['liquidationValue'] == 300.0
+    assert view['balances']['buyingPower'] == 0.0
+    assert view['positions']['AAPL'] == {'quantity': 6, 'market_value': 900.0,
+                                         'accounts': {"…0001": 10, "…0002": -4}}
+    assert view['positions']['TSLA']['quantity'] == -2
+    assert [a['label'] for a in view['accounts']] == ["…0001", "…0002"]
@@ -0,0 +1,90 @@
+import asyncio
+import math
+from types import SimpleNamespace
+import pytest
+from bot.auth import ADMIN, LIMITED, AuthManager, describe_wait
+from bot.ratelimit import FairLimiter, TokenBucket
+from fakes import make_context, make_update
+import main
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    monkeypatch.setenv("AUTHORIZED_USERS", "1,2")
+    monkeypatch.setenv("ADMIN_USERS", "9")
+    return AuthManager()
+
+
+def test_token_bucket_burst_then_wait():
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0 < bucket.retry_after() <= 1.0
+    assert math.isinf(TokenBucket(rate=0.0, capacity=0).retry_after())
+
+
+def test_role_quotas_and_overrides(auth):
+    assert auth.quota(9, 'heavy') is None
+    assert [auth.check(1, 'heavy') for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert auth.check(1, 'heavy') > 0
+    auth.set_role(2, LIMITED)
+    assert math.isinf(auth.check(2, 'order'))
+    auth.set_quota(2, 'order', 1.0, 2)
+    assert auth.check(2, 'order') == 0.0
+    auth.reset_user(2)
+    assert auth.role(2) == 'user' and auth.throttled[2]['order'] == 1
+    with pytest.raises(ValueError):
+        auth.set_role(2, 'owner')
+
+
+def test_describe_wait():
+    assert describe_wait(math.inf, 'order').startswith("⛔ Order requests")
+    assert describe_wait(2.2, 'quote').endswith("Try again in 3s.")
+
+
+def test_fair_limiter_serves_flows_round_robin():
+    async def scenario():
+        limiter = FairLimiter(rate=200.0, capacity=1)
+        order = []
+
+        async def call(flow):
+            await limiter.acquire(flow)
+            order.append(flow)
+        await limiter.acquire('warm')  # empty the bucket so everyone queues
+        tasks = [asyncio.create_task(call('heavy')) for _ in range(4)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(call('light')) for _ in range(2)]
+        await asyncio.gather(*tasks)
+        return order, limiter
+    order, limiter = asyncio.run(scenario())
+    assert order == ['heavy', 'light', 'heavy', 'light', 'heavy', 'heavy']
+    assert limiter.granted['heavy'] == 4 and limiter.delayed['light'] == 2
+    assert not limiter.saturated
+
+
+def test_fair_limiter_skips_cancelled_waiters():
+    async def scenario():
+        limiter = FairLimiter(rate=100.0, capacity=1)
+        await limiter.acquire('a')
+        gone = asyncio.create_task(limiter.acquire('a'))
+        kept = asyncio.create_task(limiter.acquire('b'))
+        await asyncio.sleep(0)
+        gone.cancel()
+        await asyncio.wait_for(kept, 1)
+        return limiter
+    limiter = asyncio.run(scenario())
+    assert limiter.granted['b'] == 1 and limiter.granted['a'] == 1
+
+
+def lag_bot(auth):
+    summary = SimpleNamespace(summary=lambda: "-")
+    return SimpleNamespace(auth_manager=auth, watchdog=summary, admission=summary, live_handler=summary)
+
+
+@pytest.mark.parametrize("user_id, shown", [(1, False), (9, True)])
+def test_lag_shows_per_user_usage_to_admins_only(auth, user_id, shown):
+    auth.check(2, 'quote')
+    update = make_update(user_id=user_id)
+    asyncio.run(main.TradingBot.lag_status(lag_bot(auth), update, make_context()))
+    assert ("Requests by user" in update.message.replies[0]) == shown
+    assert auth.role(9) == ADMIN
@@ -0,0 +1,78 @@
+import pytest
+from bot.quotetable import QuoteTable, is_quote
+
+
+@pytest.fixture
+def table():
+    table = QuoteTable.create(capacity=4)
+    yield table
+    table.close()
+
+
+def quote(price, volume=100):
+    return {'quote': {'lastPrice': price, 'bidPrice': price - 0.1, 'askPrice': price + 0.1, 'totalVolume': volume}}
+
+
+def test_write_and_read(table):
+    table.write({'AAPL': quote(150.0), 'MSFT': quote(300.0)})
+    quotes, missing = table.get_quotes(['AAPL', 'MSFT', 'NONE'])
+    assert missing == ['NONE']
+    assert quotes['AAPL']['quote']['lastPrice'] == 150.0
+    assert quotes['MSFT']['quote']['askPrice'] == pytest.approx(300.1)
+    assert quotes['MSFT']['quote']['totalVolume'] == 100
+
+
+def test_errors_entry_is_not_a_row(table):
+    assert not is_quote({'invalidSymbols': ['ZZZ']})
+    table.write({'AAPL': quote(1.0), 'errors': {'invalidSymbols': ['ZZZ']}})
+    assert list(table.index) == ['AAPL']
+
+
+def test_option_symbols_are_readable_in_other_processes(table):
+    option = 'AAPL  261120C00200000'
+    reader = QuoteTable.attach(table.name)
+    try:
+        table.write({option: quote(4.5), 'X' * 40: quote(1.0)})
+        assert reader.get_quotes([option])[0][option]['quote']['lastPrice'] == 4.5
+        assert list(reader.index) == [option]
+        assert table.too_long == 1
+    finally:
+        reader.close()
+
+
+def test_max_age(table):
+    table.write({'AAPL': quote(1.0)}, timestamp=1.0)
+    assert table.get_quotes(['AAPL'])[0]
+    assert table.get_quotes(['AAPL'], max_age=60) == ({}, ['AAPL'])
+
+
+def test_reader_sees_rows_added_later(table):
+    reader = QuoteTable.attach(table.name)
+    try:
+        table.write({'AAPL': quote(1.0)})
+        assert reader.get_quotes(['AAPL'])[0]['AAPL']['quote']['lastPrice'] == 1.0
+        table.write({'MSFT': quote(2.0), 'AAPL': quote(3.0)})
+        quotes, _ = reader.get_quotes(['AAPL', 'MSFT'])
+        assert (quotes['AAPL']['quote']['lastPrice'], quotes['MSFT']['quote']['lastPrice']) == (3.0, 2.0)
+    finally:
+        reader.close()
+
+
+def test_full_table_drops_new_symbols(table):
+    table.write({symbol: quote(1.0) for symbol in 'ABCDE'})
+    quotes, missing = table.get_quotes(list('ABCDE'))
+    assert len(quotes) == 4 and missing == ['E']
+
+
+def test_export_restore_keeps_timestamps(table):
+    table.write({'AAPL': quote(5.0)}, timestamp=123.0)
+    exported = table.export()
+    other = QuoteTable.create(capacity=4)
+    try:
+        other.restore(exported)
+        records, found = other.snapshot(['AAPL'])
+        assert found == ['AAPL']
+        assert records['timestamp'][0] == 123.0 and records['last'][0] == 5.0
+        assert records['seq'][0] % 2 == 0
+    finally:
+        other.close()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from bot.risk import align_closes, analyze_risk
+
+
+def series_from_returns(returns, start=100.0):
+    timestamps = np.arange(len(returns) + 1, dtype=np.int64)
+    return timestamps, start * np.cumprod(np.r_[1.0, 1.0 + returns])
+
+
+@pytest.fixture
+def market():
+    return np.random.default_rng(3).normal(0.0005, 0.01, 300)
+
+
+def test_align_closes_keeps_common_dates():
+    a = (np.array([1, 2, 3, 4]), np.array([10.0, 11.0, 12.0, 13.0]))
+    b = (np.array([2, 4, 5]), np.array([20.0, 21.0, 22.0]))
+    common, matrix = align_closes([a, b])
+    assert common.tolist() == [2, 4]
+    assert matrix.tolist() == [[11.0, 20.0], [13.0, 21.0]]
+
+
+def test_leveraged_position_has_double_beta(market):
+    benchmark = series_from_returns(market)
+    result = analyze_risk(['LEV'], [10_000.0], [series_from_returns(2 * market)], benchmark)
+    assert result['beta'] == pytest.approx(2.0)
+    assert result['days'] == 252
+    assert result['hhi'] == pytest.approx(1.0)
+    assert 0 < result['hist_var'] <= result['hist_cvar']
+    assert 0 < result['param_var'] <= result['param_cvar']
+
+
+def test_parametric_var_scales_with_exposure(market):
+    benchmark = series_from_returns(market)
+    small = analyze_risk(['A'], [1_000.0], [benchmark], benchmark)
+    large = analyze_risk(['A'], [5_000.0], [benchmark], benchmark)
+    assert large['param_var'] == pytest.approx(5 * small['param_var'])
+    assert large['hist_var'] == pytest.approx(5 * small['hist_var'])
+
+
+def test_hedged_book_has_little_risk(market):
+    benchmark = series_from_returns(market)
+    result = analyze_risk(['A', 'B'], [10_000.0, -10_000.0], [benchmark, benchmark], benchmark)
+    assert result['net'] == 0.0
+    assert result['volatility'] == pytest.approx(0.0, abs=1e-6)
+    assert result['top_pairs'][0][2] == pytest.approx(1.0)
+
+
+def test_needs_twenty_overlapping_bars(market):
+    benchmark = series_from_returns(market[:10])
+    assert 'error' in analyze_risk(['A'], [1.0], [benchmark], benchmark)
@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+import pytest
+from bot.market_hours import MARKET_TZ
+from bot.scheduler import CronTrigger, Scheduler, Timer, TimerWheel
+
+
+def fired(wheel, ticks):
+    return [timer.args[0] for timer in wheel.advance(ticks)]
+
+
+def test_timers_fire_on_their_tick():
+    wheel = TimerWheel(slots=4, levels=3)
+    for deadline in (1, 3, 4, 5, 17, 63):
+        wheel.add(Timer(deadline, None, (deadline,)))
+    assert fired(wheel, 1) == [1]
+    assert fired(wheel, 2) == [3]
+    assert fired(wheel, 1) == [4]
+    assert fired(wheel, 1) == [5]
+    assert fired(wheel, 11) == []
+    assert fired(wheel, 1) == [17]
+    assert fired(wheel, 46) == [63]
+
+
+def test_every_timer_fires_exactly_once_in_order():
+    wheel = TimerWheel(slots=8, levels=3)
+    deadlines = [7, 8, 9, 64, 65, 100, 200, 511, 3, 64]
+    for deadline in deadlines:
+        wheel.add(Timer(deadline, None, (deadline,)))
+    seen = []
+    for _ in range(511):
+        seen.extend(fired(wheel, 1))
+    assert seen == sorted(deadlines)
+
+
+def test_cancelled_timers_do_not_fire():
+    wheel = TimerWheel(slots=4, levels=2)
+    keep, drop = Timer(6, None, ('keep',)), Timer(6, None, ('drop',))
+    wheel.add(keep)
+    wheel.add(drop)
+    drop.cancel()
+    assert fired(wheel, 6) == ['keep']
+
+
+def test_past_deadline_fires_next_tick():
+    wheel = TimerWheel(slots=4, levels=2)
+    wheel.advance(5)
+    wheel.add(Timer(6, None, ('late',)))
+    assert fired(wheel, 1) == ['late']
+
+
+def test_beyond_horizon_is_an_error():
+    with pytest.raises(ValueError):
+        TimerWheel(slots=4, levels=2).add(Timer(16, None, ()))
+
+
+def test_cron_weekday_close_in_market_time():
+    trigger = CronTrigger("5 16 * * 1-5", tz=MARKET_TZ)
+    friday = datetime.datetime(2026, 10, 16, 17, 0, tzinfo=MARKET_TZ)
+    assert trigger.next_after(friday) == datetime.datetime(2026, 10, 19, 16, 5, tzinfo=MARKET_TZ)
+    # Across the end of daylight saving time the wall-clock time is kept
+    assert trigger.next_after(datetime.datetime(2026, 10, 30, 17, 0, tzinfo=MARKET_TZ)).utcoffset() \
+        == datetime.timedelta(hours=-5)
+
+
+def test_cron_day_of_month_or_weekday():
+    trigger = CronTrigger("0 0 13 * 5")
+    start = datetime.datetime(2026, 11, 1, tzinfo=datetime.timezone.utc)
+    assert trigger.next_after(start).day == 6       # first Friday
+    assert CronTrigger("0 0 13 * *").next_after(start).day == 13
+
+
+def test_kind_limit_caps_concurrent_runs():
+    async def scenario():
+        scheduler = Scheduler(tick=0.01)
+        scheduler.set_limit('prefetch', 1)
+        running, peak, runs = 0, 0, 0
+
+        async def work():
+            nonlocal running, peak, runs
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            runs += 1
+
+        for i in range(3):
+            scheduler.every(f"job-{i}", 0.02, work, kind='prefetch', first=0)
+        await asyncio.sleep(0.3)
+        await scheduler.shutdown()
+        return peak, runs
+    peak, runs = asyncio.run(scenario())
+    assert peak == 1 and runs >= 3
@@ -0,0 +1,66 @@
+import os
+import pickle
+import numpy as np
+import pytest
+from bot.cache import TTLCache
+from bot.quotetable import QuoteTable
+from bot.snapshot import STATE_FILE, SnapshotStore, dump_state
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshot"), max_age=60)
+
+
+def test_round_trip_maps_arrays_from_disk(store):
+    arrays = {'quotes': np.arange(6, dtype=np.float64).reshape(2, 3)}
+    store.save(dump_state({'watchlists': {1: ['AAPL']}}, arrays), arrays)
+    state, loaded = store.load()
+    assert state == {'watchlists': {1: ['AAPL']}}
+    assert isinstance(loaded['quotes'], np.memmap) and np.array_equal(loaded['quotes'], arrays['quotes'])
+    assert not [name for name in os.listdir(store.directory) if name.endswith('.tmp')]
+
+
+def test_missing_old_or_broken_snapshots_are_not_restored(store):
+    assert store.load() == (None, {})
+    snapshot = pickle.loads(dump_state({'x': 1}, []))
+    snapshot['saved_at'] -= 120
+    store.save(pickle.dumps(snapshot), {})
+    assert store.load() == (None, {})
+    # The state file names an array that was never written
+    store.save(dump_state({'x': 1}, ['quotes']), {})
+    assert store.load() == (None, {})
+    with open(os.path.join(store.directory, STATE_FILE), 'wb') as f:
+        f.write(b"truncated")
+    assert store.load() == (None, {})
+
+
+def test_restored_cache_entries_are_stale_until_set():
+    cache = TTLCache(ttl=60)
+    cache.set('AAPL', 1)
+    restored = TTLCache(ttl=60)
+    restored.set('MSFT', 'fresh')
+    restored.restore(cache.items() + [('MSFT', 'old')])
+    assert restored.get('AAPL') is None and restored.get_stale('AAPL') == 1
+    assert restored.stale_keys() == ['AAPL'] and restored.get('MSFT') == 'fresh'
+    restored.set('AAPL', 2)
+    assert restored.stale_keys() == [] and restored.get('AAPL') == 2
+
+
+def test_quote_table_survives_a_snapshot(store):
+    table = QuoteTable.create(capacity=4)
+    table.write({'AAPL': {'quote': {'lastPrice': 150.0, 'bidPrice': 149.9, 'askPrice': 150.1, 'totalVolume': 5}}},
+                timestamp=1.0)
+    arrays = {'quotes': table.export()}
+    store.save(dump_state({}, arrays), arrays)
+    table.close()
+
+    restored = QuoteTable.create(capacity=4)
+    try:
+        restored.restore(store.load()[1]['quotes'])
+        quotes, missing = restored.get_quotes(['AAPL'])
+        assert quotes['AAPL']['quote']['lastPrice'] == 150.0 and missing == []
+        # The original timestamp comes back, so the quote reads as stale
+        assert restored.get_quotes(['AAPL'], max_age=60) == ({}, ['AAPL'])
+    finally:
+        restored.close()
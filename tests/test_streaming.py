@@ -0,0 +1,117 @@
+import asyncio
+import json
+import pytest
+from bot import streaming
+from bot.streaming import AccountActivityStream, classify_activity, parse_activity
+from fakes import FakeBot
+
+
+def frame(*contents, service='ACCT_ACTIVITY'):
+    return json.dumps({'data': [{'service': service, 'content': [
+        {'1': account, '2': message_type, '3': json.dumps(body)} for account, message_type, body in contents
+    ]}]})
+
+
+FILL = {'SchwabOrderID': 42, 'Order': {'Symbol': 'AAPL', 'ExecutionQuantity': '10', 'ExecutionPrice': '150.25'}}
+
+
+@pytest.mark.parametrize("message_type, kind", [
+    ("OrderFill", 'fill'), ("OrderFillCompleted", 'fill'), ("OrderPartialFill", 'partial_fill'),
+    ("OrderRejection", 'reject'), ("UROUT", 'cancel'), ("OrderUROutCompleted", 'cancel'),
+    ("OrderCancelRequest", None), ("CancelReplaceRequest", None), ("OrderCreated", None), (None, None),
+])
+def test_classify_activity(message_type, kind):
+    assert classify_activity(message_type) == kind
+
+
+def test_parse_activity_finds_nested_fields():
+    events = parse_activity(frame(('123', 'OrderFill', FILL)))
+    assert events == [{
+        'kind': 'fill', 'account': '123', 'message_type': 'OrderFill', 'order_id': '42',
+        'symbol': 'AAPL', 'quantity': 10.0, 'price': 150.25,
+    }]
+
+
+def test_parse_activity_skips_requests_other_services_and_bad_frames():
+    assert parse_activity(frame(('123', 'OrderCancelRequest', FILL))) == []
+    assert parse_activity(frame(('123', 'OrderFill', FILL), service='LEVELONE_EQUITIES')) == []
+    assert parse_activity("not json") == []
+    broken = json.dumps({'data': [{'service': 'ACCT_ACTIVITY', 'content': [{'1': '1', '2': 'UROUT', '3': '{'}]}]})
+    assert parse_activity(broken)[0]['order_id'] == ''
+
+
+class FakeManager:
+    def __init__(self):
+        self.invalidated = []
+
+    async def get_account_hash(self, account_number):
+        return f"hash-{account_number}"
+
+    def invalidate_account(self, account_hash):
+        self.invalidated.append(account_hash)
+
+
+def deliver(stream, raw):
+    async def scenario():
+        for event in parse_activity(raw):
+            await stream._handle_event(event)
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def stream():
+    stream = AccountActivityStream(FakeManager())
+    stream.bot = FakeBot()
+    stream.watch_account('123', 7)
+    return stream
+
+
+def test_fill_notifies_watching_chat_once(stream):
+    deliver(stream, frame(('123', 'OrderFill', FILL)))
+    deliver(stream, frame(('123', 'OrderFill', FILL)))
+    assert len(stream.bot.sent) == 1
+    chat_id, text = stream.bot.sent[0]
+    assert chat_id == 7 and "Order Filled" in text and "$150.25" in text
+    assert stream.schwab.invalidated == ['hash-123', 'hash-123']
+    assert [event['seq'] for event in stream.events_after(0)] == [1, 2]
+
+
+def test_partial_fills_always_notify(stream):
+    deliver(stream, frame(('123', 'OrderPartialFill', FILL), ('123', 'OrderPartialFill', FILL)))
+    assert len(stream.bot.sent) == 2
+
+
+def test_notified_keys_are_bounded(stream, monkeypatch):
+    monkeypatch.setattr(streaming, 'NOTIFIED_LIMIT', 3)
+    for order_id in range(5):
+        assert stream.mark_notified((str(order_id), 'fill'))
+    assert stream.notified() == [('2', 'fill'), ('3', 'fill'), ('4', 'fill')]
+    assert len(stream._notified) == 3
+    assert not stream.mark_notified(('4', 'fill'))
+    assert stream.mark_notified(('0', 'fill'))
+
+
+def test_events_after_pages_through_the_log(stream):
+    deliver(stream, frame(*[('999', 'UROUT', {'OrderID': i}) for i in range(5)]))
+    assert [event['order_id'] for event in stream.events_after(2, limit=2)] == ['2', '3']
+    stream.restore_events([{'kind': 'fill', 'order_id': 'old'}])
+    assert [event['seq'] for event in stream.events] == [1, 2, 3, 4, 5, 6]
+    assert stream.events[0]['order_id'] == 'old'
+
+
+def test_unwatched_account_sends_nothing():
+    stream = AccountActivityStream(FakeManager())
+    stream.bot = FakeBot()
+    deliver(stream, frame(('555', 'OrderFill', FILL)))
+    assert stream.bot.sent == [] and len(stream.events) == 1
+
+
+def test_snapshot_keeps_notified_order():
+    stream = AccountActivityStream(FakeManager())
+    for key in (('1', 'fill'), ('2', 'cancel')):
+        stream.mark_notified(key)
+    restored = AccountActivityStream(FakeManager())
+    for key in stream.notified():
+        restored.mark_notified(key)
+    assert restored.notified() == stream.notified()
+    assert not restored.mark_notified(('1', 'fill'))
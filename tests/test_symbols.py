@@ -0,0 +1,90 @@
+import asyncio
+import string
+import pytest
+from bot.symbols import SymbolIndex
+
+ROWS = [("AAPL", "Apple Inc"), ("AMZN", "Amazon.com Inc"), ("AMD", "Advanced Micro Devices"),
+        ("MSFT", "Microsoft Corp"), ("BRK.B", "Berkshire Hathaway Inc Class B")]
+
+
+class FakeInstruments:
+    """search_instruments over a fixed universe; letters in `failing` return None like a failed call"""
+
+    def __init__(self, rows, failing=()):
+        self.rows = rows
+        self.failing = set(failing)
+        self.calls = 0
+
+    async def search_instruments(self, symbol, projection):
+        self.calls += 1
+        letter = symbol[0]
+        if letter in self.failing:
+            return None
+        return {'instruments': [{'symbol': ticker, 'description': name}
+                                for ticker, name in self.rows if ticker.startswith(letter)]}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SymbolIndex(str(tmp_path / "symbols.csv"))
+    index._set(ROWS)
+    return index
+
+
+def test_everything_is_valid_until_loaded(tmp_path):
+    index = SymbolIndex(str(tmp_path / "missing.csv"))
+    assert not index.load_file()
+    assert index.is_valid("ANYTHING")
+
+
+def test_is_valid(index):
+    assert index.is_valid("AAPL")
+    assert index.is_valid("BRK.B")
+    assert not index.is_valid("AAP")
+    assert not index.is_valid("ZZZZ")
+    # Indices and futures are left to Schwab
+    assert index.is_valid("$SPX")
+    assert index.is_valid("/ES")
+
+
+def test_prefix_and_name_search(index):
+    assert index.prefix("am") == ["AMD", "AMZN"]
+    assert index.search("micro") == ["AMD", "MSFT"]
+    # Ticker prefix matches come before name matches
+    assert index.search("a") == ["AAPL", "AMD", "AMZN", "BRK.B"]
+    assert index.name("MSFT") == "Microsoft Corp"
+    assert index.name("NOPE") == ""
+
+
+def test_rejection_suggests_close_tickers(index):
+    assert index.suggest("APPL") == ["AAPL"]
+    assert index.rejection("APPL") == "❌ Unknown symbol APPL\nDid you mean: AAPL?"
+    assert index.rejection("QQQQQ") == "❌ Unknown symbol QQQQQ"
+
+
+def test_file_round_trip(index):
+    index.save_file()
+    reloaded = SymbolIndex(index.path)
+    assert reloaded.load_file()
+    assert reloaded.tickers.tolist() == index.tickers.tolist()
+    assert reloaded.name("AMZN") == "Amazon.com Inc"
+
+
+def test_refresh_from_schwab(tmp_path):
+    index = SymbolIndex(str(tmp_path / "symbols.csv"))
+    schwab = FakeInstruments(ROWS + [("ZM", "Zoom Video")])
+    assert asyncio.run(index.load_from_schwab(schwab))
+    assert schwab.calls == len(string.ascii_uppercase)
+    assert index.is_valid("ZM")
+    assert SymbolIndex(index.path).load_file()
+
+
+def test_partial_refresh_keeps_the_current_index_and_file(index):
+    index.save_file()
+    with open(index.path) as f:
+        saved = f.read()
+    schwab = FakeInstruments([("ZM", "Zoom Video")], failing={"M"})
+    assert not asyncio.run(index.load_from_schwab(schwab))
+    assert index.is_valid("AAPL") and not index.is_valid("ZM")
+    with open(index.path) as f:
+        assert f.read() == saved
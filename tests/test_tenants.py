@@ -0,0 +1,87 @@
+import asyncio
+import os
+import stat
+import time
+import pytest
+from cryptography.fernet import Fernet
+from bot.tenants import LINK_EXPIRED, ClientPool, TokenVault, authorize_url, code_from_redirect
+
+TOKENS = {'access_token': 'a', 'refresh_token': 'r', 'access_expires': 0, 'refresh_expires': 0}
+
+
+@pytest.fixture
+def vault(tmp_path):
+    return TokenVault(str(tmp_path / "tenants"), Fernet.generate_key())
+
+
+def make_pool(vault, **kwargs):
+    return ClientPool("key", "secret", "https://127.0.0.1", vault, **kwargs)
+
+
+def test_vault_round_trip_is_encrypted_and_private(vault):
+    vault.save(7, TOKENS)
+    path = vault._path(7)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path, 'rb') as f:
+        assert b'access_token' not in f.read()
+    assert vault.load(7) == TOKENS
+    assert vault.load(8) is None
+    assert vault.delete(7) and not vault.delete(7)
+
+
+def test_vault_with_another_key_reads_nothing(vault):
+    vault.save(7, TOKENS)
+    assert TokenVault(vault.directory, Fernet.generate_key()).load(7) is None
+
+
+def test_vault_needs_a_key(tmp_path):
+    with pytest.raises(ValueError):
+        TokenVault(str(tmp_path), None)
+
+
+def test_redirect_code():
+    assert code_from_redirect(" https://127.0.0.1/?code=abc%40&session=x ") == "abc@"
+    with pytest.raises(ValueError):
+        code_from_redirect("https://127.0.0.1/?error=denied")
+    assert authorize_url("k", "https://127.0.0.1").endswith("client_id=k&redirect_uri=https%3A%2F%2F127.0.0.1")
+
+
+def test_pool_evicts_least_recently_used(vault):
+    for user_id in (1, 2, 3):
+        vault.save(user_id, TOKENS)
+    pool = make_pool(vault, max_size=2)
+
+    async def scenario():
+        await pool.get(1)
+        await pool.get(2)
+        await pool.get(1)
+        await pool.get(3)
+    asyncio.run(scenario())
+    assert list(pool.clients) == [1, 3] and pool.evicted == 1
+    assert asyncio.run(pool.get(4)) is None and asyncio.run(pool.get(None)) is None
+    pool.close()
+
+
+def test_pool_closes_idle_clients(vault):
+    vault.save(1, TOKENS)
+    vault.save(2, TOKENS)
+    pool = make_pool(vault, idle_ttl=60)
+    asyncio.run(pool.get(1))
+    asyncio.run(pool.get(2))
+    pool.clients[1].last_used = time.monotonic() - 120
+    pool.evict_idle()
+    assert list(pool.clients) == [2] and pool.evicted == 1
+
+
+def test_unlink_drops_client_and_tokens(vault):
+    vault.save(1, TOKENS)
+    pool = make_pool(vault)
+    asyncio.run(pool.get(1))
+    assert pool.unlink(1)
+    assert pool.clients == {} and vault.load(1) is None
+
+
+def test_expired_link_asks_the_user_to_relink(vault):
+    pool = make_pool(vault)
+    with pytest.raises(PermissionError, match=LINK_EXPIRED):
+        pool.refresh_tokens(1, {**TOKENS, 'refresh_expires': time.time() - 1})
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from bot.watchdog import LoopWatchdog, describe_update
+
+
+def test_lags_are_bucketed_and_stalls_counted():
+    watchdog = LoopWatchdog(threshold=0.25)
+    for lag in (0.0005, 0.004, 0.004, 0.3, 5.0):
+        watchdog.record(lag)
+    counts = dict(watchdog.histogram())
+    assert counts["≤1ms"] == 1 and counts["≤5ms"] == 2 and counts["≤500ms"] == 1 and counts[">2500ms"] == 1
+    assert watchdog.stalls == 2 and watchdog.max_lag == 5.0
+    assert watchdog.summary().endswith("max 5000 ms, 2 stalls over 250 ms")
+
+
+def test_describe_update():
+    message = SimpleNamespace(message=SimpleNamespace(text="/chart AAPL 1y"))
+    callback = SimpleNamespace(message=None, callback_query=SimpleNamespace(data="refresh"))
+    assert describe_update(message) == "/chart"
+    assert describe_update(callback) == "callback refresh"
+    assert describe_update(SimpleNamespace()) == "update"
+
+
+def blocking_render():
+    time.sleep(0.3)
+
+
+def test_a_blocked_loop_is_reported_with_its_stack_and_command(caplog):
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02, debug=False)
+
+    async def handler():
+        watchdog.label("/chart")
+        blocking_render()
+
+    async def scenario():
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(handler())
+        await asyncio.sleep(0.05)
+        watchdog.task.cancel()
+    with caplog.at_level(logging.WARNING, logger="bot.watchdog"):
+        try:
+            asyncio.run(scenario())
+        finally:
+            # Park the sampler thread, which outlives the test
+            watchdog._heartbeat = float('inf')
+    sampled = [r.getMessage() for r in caplog.records if "blocked for" in r.getMessage() and " in " in r.getMessage()]
+    assert len(sampled) == 1
+    assert "in /chart:" in sampled[0] and "blocking_render" in sampled[0]
+    assert watchdog.stalls == 1